@@ -0,0 +1,132 @@
+"""
+Shared condition catalog for every scraper.
+
+Parses the "Related Conditions" column of exercises.csv once and keeps the
+deduplicated list in a small binary cache next to the CSV. The cache is keyed
+on the CSV's mtime, size and SHA-1, so scrapers (and their Pool workers) load
+the list without importing pandas or re-splitting ~49k lines.
+
+When a scraper is started by crawl_orchestrator.py, the CRAWL_SHARD
+("index/count") and CRAWL_CONDITIONS_FILE environment variables narrow the list
+down to the slice that worker is responsible for.
+"""
+import csv
+import hashlib
+import os
+import pickle
+import re
+import zlib
+
+CSV_PATH = "exercises.csv"
+CONDITIONS_COLUMN = "Related Conditions"
+CACHE_SUFFIX = ".conditions.cache"
+CACHE_VERSION = 1
+SHARD_ENV = "CRAWL_SHARD"
+CONDITIONS_FILE_ENV = "CRAWL_CONDITIONS_FILE"
+
+
+def _cache_path(csv_path: str) -> str:
+    folder, name = os.path.split(os.path.abspath(csv_path))
+    return os.path.join(folder, f".{name}{CACHE_SUFFIX}")
+
+
+def _file_sha1(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parse_conditions(csv_path: str = CSV_PATH) -> list:
+    """Reads the CSV and returns the sorted, deduplicated list of conditions."""
+    conditions = set()
+    with open(csv_path, encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        if CONDITIONS_COLUMN not in (reader.fieldnames or []):
+            raise KeyError(f"Column '{CONDITIONS_COLUMN}' not found in CSV.")
+        for row in reader:
+            cell = row[CONDITIONS_COLUMN]
+            if not cell:
+                continue
+            conditions.update(c.strip() for c in re.split(r"[/\n]+", cell) if c.strip())
+    return sorted(conditions)
+
+
+def _read_cache(cache_file: str):
+    try:
+        with open(cache_file, "rb") as f:
+            cached = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.get("version") != CACHE_VERSION:
+        return None
+    return cached
+
+
+def _write_cache(cache_file: str, cached: dict) -> None:
+    tmp_file = cache_file + ".tmp"
+    try:
+        with open(tmp_file, "wb") as f:
+            pickle.dump(cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        # A read-only checkout still works, it just re-parses every time
+        pass
+
+
+def in_shard(condition: str, index: int, count: int) -> bool:
+    """Stable split of the conditions across workers (same answer in every process)."""
+    return zlib.crc32(condition.encode("utf-8")) % count == index
+
+
+def _select_for_worker(conditions: list) -> list:
+    conditions_file = os.environ.get(CONDITIONS_FILE_ENV)
+    if conditions_file:
+        with open(conditions_file, encoding="utf-8") as f:
+            wanted = {line.strip() for line in f if line.strip()}
+        conditions = [c for c in conditions if c in wanted]
+
+    shard = os.environ.get(SHARD_ENV)
+    if shard:
+        index, count = (int(x) for x in shard.split("/"))
+        conditions = [c for c in conditions if in_shard(c, index, count)]
+    return conditions
+
+
+def load_conditions(csv_path: str = CSV_PATH) -> list:
+    """
+    Returns the deduplicated condition list, served from the binary cache
+    whenever the CSV has not changed since it was written.
+    """
+    return _select_for_worker(_load_all_conditions(csv_path))
+
+
+def _load_all_conditions(csv_path: str) -> list:
+    stat = os.stat(csv_path)
+    cache_file = _cache_path(csv_path)
+    cached = _read_cache(cache_file)
+
+    if cached and cached["mtime_ns"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+        return list(cached["conditions"])
+
+    # mtime changed: only re-parse if the content really changed
+    sha1 = _file_sha1(csv_path)
+    if cached and cached["sha1"] == sha1:
+        conditions = cached["conditions"]
+    else:
+        conditions = parse_conditions(csv_path)
+
+    _write_cache(cache_file, {
+        "version": CACHE_VERSION,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha1": sha1,
+        "conditions": conditions,
+    })
+    return list(conditions)
+
+
+if __name__ == "__main__":
+    all_conditions = _load_all_conditions(CSV_PATH)
+    print(f"[INFO] {len(all_conditions)} unique conditions cached in '{_cache_path(CSV_PATH)}'")
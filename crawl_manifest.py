@@ -0,0 +1,290 @@
+"""
+Persistent per-(site, condition) crawl manifest, so reruns only touch what is left.
+
+Every scraper records, for each condition it processes, the status (done,
+skipped, failed, escalated to a browser by the HTTP engine, or running if it
+was interrupted), the article URL, a hash of the saved content, start time,
+duration and the error class. The manifest is a SQLite file shared by every
+scraper and worker process.
+
+    manifest = Manifest("nhs")
+    for condition in manifest.select(all_conditions):
+        task = manifest.start(condition)
+        ...
+        task.done(file_path, text, url=driver.current_url)   # or task.skip(...) / task.fail(e)
+
+The CRAWL_MODE environment variable (crawl_orchestrator.py --mode) decides
+which conditions select() keeps:
+
+    resume      everything not done or skipped yet (default)
+    all         every condition, as before
+    failed      only conditions whose last attempt failed, was interrupted or was escalated
+    new         only conditions not present in any earlier run's CSV
+    older:N     only conditions last finished more than N days ago
+
+    python crawl_manifest.py [site ...]      # status summary
+"""
+import atexit
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import crawl_metrics
+import profiling
+import stage_timing
+
+DB_PATH = "crawl_manifest.sqlite"
+MODE_ENV = "CRAWL_MODE"
+DEFAULT_MODE = "resume"
+
+SETTLED = ("done", "skipped")
+FAILED = ("failed", "running")
+# Escalated conditions are not failures: the browser scraper picks them up next
+RETRYABLE = FAILED + ("escalated",)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conditions (
+    site TEXT NOT NULL,
+    condition TEXT NOT NULL,
+    status TEXT NOT NULL,
+    url TEXT,
+    output_path TEXT,
+    content_hash TEXT,
+    started_at REAL,
+    finished_at REAL,
+    duration REAL,
+    error_class TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (site, condition)
+);
+CREATE TABLE IF NOT EXISTS catalog (
+    site TEXT NOT NULL,
+    condition TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    PRIMARY KEY (site, condition)
+);
+"""
+
+
+def parse_mode(value: str = None):
+    """Returns (mode, days); days is only set for "older:N"."""
+    value = (value if value is not None else os.environ.get(MODE_ENV) or DEFAULT_MODE).strip().lower()
+    if value.startswith("older"):
+        _, _, days = value.partition(":")
+        try:
+            return "older", float(days)
+        except ValueError:
+            raise ValueError(f"{MODE_ENV}={value!r}: expected older:N with N in days") from None
+    if value not in ("resume", "all", "failed", "new"):
+        raise ValueError(f"Unknown {MODE_ENV} {value!r}: use resume, all, failed, new or older:N")
+    return value, None
+
+
+def content_hash(content) -> str:
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha256(content).hexdigest()
+
+
+class Task:
+    """One condition of a run; finished by done/skip/fail (the last call wins, e.g. after a retry)."""
+
+    def __init__(self, manifest, condition: str):
+        self.manifest = manifest
+        self.condition = condition
+        self.started = time.time()
+        self.finished = False
+        self.status = "running"
+        self.attempt = None
+        self.profile = None
+
+    def _finish(self, status: str, **fields) -> None:
+        site_name = self.manifest.site
+        if self.finished:
+            crawl_metrics.count(self.status, -1, site_name)
+        elif self in self.manifest._open:
+            crawl_metrics.task_ended(site_name)
+        crawl_metrics.count(status, 1, site_name)
+        self.finished = True
+        self.status = status
+        profiling.end(self)
+        self.manifest._open.discard(self)
+        now = time.time()
+        self.manifest._finish(self.condition, status, finished_at=now, duration=now - self.started, **fields)
+        stage_timing.flush()
+        crawl_metrics.flush()
+
+    def done(self, output_path: str = None, content=None, url: str = None) -> None:
+        self._finish("done", url=url, output_path=output_path,
+                     content_hash=content_hash(content) if content is not None else None)
+
+    def skip(self, reason: str, url: str = None) -> None:
+        """Nothing to save (no results, no matching article...): not retried on resume."""
+        self._finish("skipped", url=url, error=reason)
+
+    def fail(self, error, url: str = None, error_class: str = None) -> None:
+        if error_class is None:
+            error_class = type(error).__name__ if isinstance(error, BaseException) else "Error"
+        self._finish("failed", url=url, error_class=error_class, error=str(error)[:500])
+
+    def escalate(self, reason: str, url: str = None) -> None:
+        """Left for a browser scraper (http_engine.py): neither a failure nor settled."""
+        self._finish("escalated", url=url, error_class="NeedsBrowser", error=reason[:500])
+
+    def recorded_elsewhere(self) -> None:
+        """The worker process the condition ran in (supervisor.py) already recorded its result."""
+        if not self.finished and self in self.manifest._open:
+            crawl_metrics.task_ended(self.manifest.site)
+        profiling.cancel(self)
+        self.finished = True
+        self.manifest._open.discard(self)
+
+
+class Manifest:
+    def __init__(self, site_name: str, db_path: str = DB_PATH):
+        self.site = site_name
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=60, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._open = set()
+        atexit.register(self.close)
+
+    # ---------------------------------------------------------- selection
+
+    def _rows(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT condition, status, finished_at FROM conditions WHERE site = ?", (self.site,)
+            ).fetchall()
+        return {condition: (status, finished_at) for condition, status, finished_at in rows}
+
+    def _known(self) -> set:
+        with self._lock:
+            rows = self._conn.execute("SELECT condition FROM catalog WHERE site = ?", (self.site,)).fetchall()
+        return {condition for (condition,) in rows}
+
+    def select(self, conditions: list, mode: str = None) -> list:
+        """Keeps the conditions this run must process and remembers the catalog for "new"."""
+        mode, days = parse_mode(mode)
+        rows = self._rows()
+
+        if mode == "all":
+            selected = list(conditions)
+        elif mode == "resume":
+            selected = [c for c in conditions if rows.get(c, (None,))[0] not in SETTLED]
+        elif mode == "failed":
+            selected = [c for c in conditions if rows.get(c, (None,))[0] in RETRYABLE]
+        elif mode == "new":
+            known = self._known()
+            selected = [c for c in conditions if c not in known]
+        else:
+            cutoff = time.time() - days * 86400
+            selected = [
+                c for c in conditions
+                if c in rows and rows[c][0] in SETTLED and (rows[c][1] or 0) < cutoff
+            ]
+
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO catalog (site, condition, first_seen) VALUES (?, ?, ?)",
+                [(self.site, c, now) for c in conditions],
+            )
+        crawl_metrics.count("planned", len(selected), self.site)
+        print(f"[MANIFEST] {self.site}: mode={mode}{f':{days:g}' if days is not None else ''} "
+              f"-> {len(selected)} of {len(conditions)} conditions to process.")
+        return selected
+
+    # ---------------------------------------------------------- recording
+
+    def start(self, condition: str) -> Task:
+        """
+        Marks the condition as running; tasks never finished count as failed on close().
+        Stages timed from here on are tagged with the task (stage_timing.py), which is
+        profiled when PROFILE is set (profiling.py).
+        """
+        task = Task(self, condition)
+        with self._lock, self._conn:
+            previous = self._conn.execute(
+                "SELECT status FROM conditions WHERE site = ? AND condition = ?", (self.site, condition)
+            ).fetchone()
+            self._conn.execute(
+                """
+                INSERT INTO conditions (site, condition, status, started_at, attempts)
+                VALUES (?, ?, 'running', ?, 1)
+                ON CONFLICT (site, condition) DO UPDATE SET
+                    status = 'running', started_at = excluded.started_at,
+                    error_class = NULL, error = NULL, attempts = attempts + 1
+                """,
+                (self.site, condition, task.started),
+            )
+        self._open.add(task)
+        crawl_metrics.task_started(self.site)
+        if previous and previous[0] in FAILED:
+            crawl_metrics.count("retries", 1, self.site)
+        self._tag(task)
+        profiling.begin(task)
+        return task
+
+    def _tag(self, task: Task) -> None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT attempts FROM conditions WHERE site = ? AND condition = ?", (self.site, task.condition)
+            ).fetchone()
+        task.attempt = row[0] if row else None
+        stage_timing.begin(self.site, task.condition, task.attempt)
+
+    def attach(self, condition: str, started: float) -> Task:
+        """
+        Task for a condition another process start()ed, to record its result from
+        here; the starting process stays responsible for it if this one dies.
+        """
+        task = Task(self, condition)
+        task.started = started
+        self._tag(task)
+        profiling.begin(task)
+        return task
+
+    def _finish(self, condition: str, status: str, **fields) -> None:
+        columns = ["status"] + list(fields)
+        values = [status] + list(fields.values())
+        if self._conn is None:
+            # A hung worker thread finishing after close()
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE conditions SET {', '.join(f'{c} = ?' for c in columns)} WHERE site = ? AND condition = ?",
+                values + [self.site, condition],
+            )
+
+    def close(self) -> None:
+        if self._conn is None:
+            return
+        for task in list(self._open):
+            task.fail("finished without recording a result")
+        self._conn.close()
+        self._conn = None
+
+
+def summary(site_names: list = None, db_path: str = DB_PATH) -> list:
+    """[(site, status, count)] for the given sites (all when None)."""
+    conn = sqlite3.connect(db_path)
+    try:
+        query = "SELECT site, status, COUNT(*) FROM conditions"
+        params = ()
+        if site_names:
+            query += f" WHERE site IN ({', '.join('?' * len(site_names))})"
+            params = tuple(site_names)
+        return conn.execute(query + " GROUP BY site, status ORDER BY site, status", params).fetchall()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    for site, status, count in summary(sys.argv[1:] or None):
+        print(f"{site:<16} {status:<8} {count:>6}")
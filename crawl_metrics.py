@@ -0,0 +1,355 @@
+"""
+Live metrics of a crawl: throughput, errors and projected completion per site.
+
+Every scraper process (Selenium, Playwright, the HTTP engine and their
+workers) counts what happens to it into a shared SQLite file, in one-minute
+buckets, and reports the conditions it has in flight with a heartbeat every
+FLUSH_SECONDS. Most counts come from the shared modules, so the scrapers do
+not call this directly:
+
+    planned            Manifest.select()       conditions this run must process
+    done/skipped/failed  Task.done/skip/fail()
+    escalated          Task.escalate()         handed from the HTTP engine to a browser (not a failure)
+    retries            Manifest.start()        conditions started again after an earlier attempt
+    captcha, throttled Pacer.throttled()       CAPTCHA/block pages vs. 429s and timeouts
+    browser_restarts   DriverPool, Supervisor, playwright_contexts
+    bytes_fetched      report_blocked(), PlaywrightBlocker.report(), http_engine
+
+A run is everything started with the same CRAWL_RUN id; crawl_orchestrator.py
+sets one for all its workers, a scraper started by hand gets its own.
+Conditions per minute are taken over the last RATE_WINDOW minutes, and the
+ETA is what is left of "planned" at that rate.
+
+    python crawl_metrics.py                  # terminal dashboard of the latest run
+    python crawl_metrics.py --serve 9108     # Prometheus text format on :9108/metrics
+    python crawl_orchestrator.py --metrics-port 9108
+
+METRICS=0 turns recording off.
+"""
+import argparse
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import stage_timing
+
+DB_PATH = "crawl_metrics.sqlite"
+METRICS_ENV = "METRICS"
+RUN_ENV = "CRAWL_RUN"
+FLUSH_SECONDS = 5
+STALE_SECONDS = 3 * FLUSH_SECONDS     # a process silent for longer is gone
+RATE_WINDOW = 10                      # minutes
+REFRESH_SECONDS = 2
+
+# Escalated conditions leave the HTTP engine's plan and are planned again by the browser job
+FINISHED = ("done", "skipped", "failed", "escalated")
+COUNTERS = ("planned",) + FINISHED + ("retries", "captcha", "throttled", "browser_restarts", "bytes_fetched")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    run TEXT NOT NULL,
+    site TEXT NOT NULL,
+    name TEXT NOT NULL,
+    minute INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (run, site, name, minute)
+);
+CREATE TABLE IF NOT EXISTS processes (
+    run TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    site TEXT NOT NULL,
+    engine TEXT,
+    in_flight INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (run, pid, site)
+);
+"""
+
+_lock = threading.Lock()
+_counts = defaultdict(float)          # (site, name, minute) -> value not yet flushed
+_in_flight = defaultdict(int)         # site -> conditions running in this process
+_engine = None
+_flusher = None
+
+
+def enabled() -> bool:
+    return os.environ.get(METRICS_ENV, "1") != "0"
+
+
+def run_id() -> str:
+    # Set in the environment so that worker processes report into the same run
+    return os.environ.setdefault(RUN_ENV, time.strftime("%Y%m%d-%H%M%S"))
+
+
+def set_engine(name: str) -> None:
+    """"selenium", "playwright" or "http": how this process fetches (shown per in-flight row)."""
+    global _engine
+    _engine = name
+
+
+def count(name: str, n: float = 1, site_name: str = None) -> None:
+    """Adds `n` to a counter of the site (by default, the site of the task running here)."""
+    site_name = site_name or stage_timing.current()[0]
+    if not enabled() or site_name is None or not n:
+        return
+    with _lock:
+        _counts[(site_name, name, int(time.time() // 60))] += n
+    _start_flusher()
+
+
+def task_started(site_name: str) -> None:
+    with _lock:
+        _in_flight[site_name] += 1
+    _start_flusher()
+
+
+def task_ended(site_name: str) -> None:
+    with _lock:
+        _in_flight[site_name] = max(0, _in_flight[site_name] - 1)
+
+
+def _start_flusher() -> None:
+    global _flusher
+    if _flusher is not None or not enabled():
+        return
+    with _lock:
+        if _flusher is not None:
+            return
+        _flusher = threading.Thread(target=_flush_loop, name="crawl-metrics", daemon=True)
+        _flusher.start()
+    atexit.register(_exit)
+
+
+def _flush_loop() -> None:
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        flush()
+
+
+def _connect(db_path: str = DB_PATH) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def flush(exiting: bool = False) -> None:
+    """Writes the pending counts and this process's heartbeat."""
+    if not enabled():
+        return
+    with _lock:
+        counts = [(site_name, name, minute, value) for (site_name, name, minute), value in _counts.items()]
+        _counts.clear()
+        in_flight = dict(_in_flight)
+    if not counts and not in_flight:
+        return
+    run, pid, now = run_id(), os.getpid(), time.time()
+    try:
+        _write(run, pid, now, counts, in_flight, exiting)
+    except sqlite3.Error as e:
+        # Metrics must never stop a crawl; these counts are lost
+        print(f"[METRICS] Could not write {DB_PATH}: {e}")
+
+
+def _write(run: str, pid: int, now: float, counts: list, in_flight: dict, exiting: bool) -> None:
+    conn = _connect()
+    try:
+        with conn:
+            conn.executemany(
+                """
+                INSERT INTO counters (run, site, name, minute, value) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (run, site, name, minute) DO UPDATE SET value = value + excluded.value
+                """,
+                [(run, site_name, name, minute, value) for site_name, name, minute, value in counts],
+            )
+            if exiting:
+                conn.execute("DELETE FROM processes WHERE run = ? AND pid = ?", (run, pid))
+            else:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO processes (run, pid, site, engine, in_flight, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(run, pid, site_name, _engine, n, now) for site_name, n in in_flight.items()],
+                )
+    finally:
+        conn.close()
+
+
+def _exit() -> None:
+    flush(exiting=True)
+
+
+# --------------------------------------------------------------- reading
+
+def latest_run(db_path: str = DB_PATH):
+    conn = _connect(db_path)
+    try:
+        row = conn.execute("SELECT run FROM counters GROUP BY run ORDER BY MAX(minute) DESC LIMIT 1").fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def snapshot(run: str = None, db_path: str = DB_PATH) -> dict:
+    """
+    {"run", "started", "sites": {site: {counter totals, "in_flight", "engines",
+    "per_minute", "remaining", "eta"}}} for a run (the latest one by default).
+    """
+    run = run or latest_run(db_path)
+    now = time.time()
+    current = int(now // 60)
+    conn = _connect(db_path)
+    try:
+        counters = conn.execute(
+            "SELECT site, name, minute, value FROM counters WHERE run = ?", (run,)
+        ).fetchall()
+        processes = conn.execute(
+            "SELECT site, engine, in_flight FROM processes WHERE run = ? AND updated_at >= ?",
+            (run, now - STALE_SECONDS),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    sites = defaultdict(lambda: dict({name: 0 for name in COUNTERS}, in_flight=0, engines=set(), recent=0))
+    first_minute = min((minute for _, _, minute, _ in counters), default=current)
+    for site_name, name, minute, value in counters:
+        sites[site_name][name] = sites[site_name].get(name, 0) + value
+        if name in FINISHED and minute > current - RATE_WINDOW:
+            sites[site_name]["recent"] += value
+    for site_name, engine, in_flight in processes:
+        sites[site_name]["in_flight"] += in_flight
+        if engine:
+            sites[site_name]["engines"].add(engine)
+
+    # Fewer minutes than the window at the start of a run (the current minute counts as half)
+    window = max(0.5, min(RATE_WINDOW, current - first_minute + 0.5))
+    for row in sites.values():
+        row["per_minute"] = row.pop("recent") / window
+        row["remaining"] = max(0, row["planned"] - sum(row[name] for name in FINISHED))
+        row["eta"] = row["remaining"] / row["per_minute"] * 60 if row["per_minute"] else None
+    return {"run": run, "started": first_minute * 60, "sites": dict(sorted(sites.items()))}
+
+
+def _total(sites: dict) -> dict:
+    totals = {name: sum(row[name] for row in sites.values()) for name in COUNTERS + ("in_flight", "per_minute",
+                                                                                     "remaining")}
+    # The run ends with its slowest site
+    etas = [row["eta"] for row in sites.values() if row["remaining"]]
+    totals["eta"] = None if None in etas else max(etas, default=0)
+    return totals
+
+
+def _duration(seconds) -> str:
+    if seconds is None:
+        return "?"
+    minutes = int(seconds // 60)
+    return f"{minutes // 60}h{minutes % 60:02d}m" if minutes >= 60 else f"{minutes}m{int(seconds % 60):02d}s"
+
+
+def render_text(snap: dict) -> str:
+    if not snap["run"]:
+        return f"No metrics in {DB_PATH} yet."
+    sites = snap["sites"]
+    lines = [
+        f"Run {snap['run']}  ·  first activity {time.strftime('%H:%M', time.localtime(snap['started']))}"
+        f"  ·  {time.strftime('%H:%M:%S')}",
+        "",
+        f"{'site':<16} {'cond/min':>8} {'done':>6} {'failed':>6} {'left':>6} {'flight':>6} {'retry':>5} "
+        f"{'captcha':>7} {'restart':>7} {'MB':>8} {'ETA':>8}  engine",
+    ]
+    for site_name, row in list(sites.items()) + [("TOTAL", _total(sites))]:
+        if site_name == "TOTAL":
+            lines.append("-" * len(lines[-1]))
+        lines.append(
+            f"{site_name:<16} {row['per_minute']:>8.1f} {row['done'] + row['skipped']:>6.0f} {row['failed']:>6.0f} "
+            f"{row['remaining']:>6.0f} {row['in_flight']:>6} {row['retries']:>5.0f} {row['captcha']:>7.0f} "
+            f"{row['browser_restarts']:>7.0f} {row['bytes_fetched'] / 1e6:>8.1f} {_duration(row['eta']):>8}  "
+            f"{','.join(sorted(row.get('engines', ())))}"
+        )
+    return "\n".join(lines)
+
+
+def render_prometheus(snap: dict) -> str:
+    run = snap["run"] or ""
+    metrics = [
+        ("crawl_conditions_planned", "gauge", "Conditions the run must process", "planned"),
+        ("crawl_conditions_remaining", "gauge", "Planned conditions not finished yet", "remaining"),
+        ("crawl_conditions_per_minute", "gauge", f"Finished conditions per minute over {RATE_WINDOW}m", "per_minute"),
+        ("crawl_in_flight", "gauge", "Conditions being processed right now", "in_flight"),
+        ("crawl_retries_total", "counter", "Conditions started again after an earlier attempt", "retries"),
+        ("crawl_captcha_total", "counter", "CAPTCHA or block pages met", "captcha"),
+        ("crawl_throttled_total", "counter", "429s, 503s and timeouts that slowed a site down", "throttled"),
+        ("crawl_browser_restarts_total", "counter", "Browser sessions replaced or killed", "browser_restarts"),
+        ("crawl_bytes_fetched_total", "counter", "Bytes received from the sites", "bytes_fetched"),
+        ("crawl_eta_seconds", "gauge", "Projected time until the site is finished", "eta"),
+    ]
+    lines = []
+    for metric, kind, help_text, key in metrics:
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        for site_name, row in snap["sites"].items():
+            if row[key] is not None:
+                lines.append(f'{metric}{{run="{run}",site="{site_name}"}} {row[key]:g}')
+    lines += ["# HELP crawl_conditions_finished_total Conditions finished, by status",
+              "# TYPE crawl_conditions_finished_total counter"]
+    for site_name, row in snap["sites"].items():
+        for status in FINISHED:
+            lines.append(f'crawl_conditions_finished_total{{run="{run}",site="{site_name}",status="{status}"}} '
+                         f'{row[status]:g}')
+    return "\n".join(lines) + "\n"
+
+
+def serve(port: int, run: str = None, db_path: str = DB_PATH) -> ThreadingHTTPServer:
+    """Serves /metrics on localhost:`port` from a daemon thread; returns the server."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("", "/metrics"):
+                self.send_error(404)
+                return
+            body = render_prometheus(snapshot(run, db_path)).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, name="crawl-metrics-http", daemon=True).start()
+    print(f"[METRICS] http://127.0.0.1:{port}/metrics")
+    return server
+
+
+def dashboard(run: str = None, db_path: str = DB_PATH, once: bool = False) -> None:
+    while True:
+        text = render_text(snapshot(run, db_path))
+        if once:
+            print(text)
+            return
+        # Clear the screen and redraw from the top
+        print("\x1b[2J\x1b[H" + text + "\n\n(Ctrl+C to quit)", flush=True)
+        time.sleep(REFRESH_SECONDS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live throughput, errors and ETA of a crawl.")
+    parser.add_argument("--run", help="Run id (CRAWL_RUN); default: the latest run")
+    parser.add_argument("--serve", type=int, metavar="PORT", help="Also serve Prometheus metrics on this port")
+    parser.add_argument("--once", action="store_true", help="Print the table once and exit")
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.run, args.db)
+    try:
+        dashboard(args.run, args.db, args.once)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Runs every site adapter from sites.py concurrently in one orchestrator process.
+
+Each site script is started as a worker subprocess on its own slice of the
+condition list (see CRAWL_SHARD in condition_catalog.py). One scheduler hands
+out worker slots under a global budget and a per-host cap, interleaving the
+sites so they all start right away: a full refresh takes about as long as the
+slowest site instead of the sum of all of them.
+
+Sites with an "http" entry in sites.py are first crawled by http_engine.py,
+in a background thread, while the browser sites already run. Only the
+conditions whose content was not in the server HTML are then handed to the
+site's browser scraper (through CRAWL_CONDITIONS_FILE).
+
+Usage:
+    python crawl_orchestrator.py                     # all non-interactive sites
+    python crawl_orchestrator.py --sites nhs pmc --budget 4
+    python crawl_orchestrator.py --no-http           # browsers only
+    python crawl_orchestrator.py --mode failed       # only what failed last time
+    python crawl_orchestrator.py --stage fetch       # raw pages only (see page_cache.py)
+    python crawl_orchestrator.py --stage extract     # re-extract from the cache, no browsers
+    python crawl_orchestrator.py --metrics-port 9108 # live metrics (see crawl_metrics.py)
+"""
+import argparse
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+
+import crawl_metrics
+from condition_catalog import CONDITIONS_FILE_ENV, SHARD_ENV
+from crawl_manifest import MODE_ENV, parse_mode
+from page_cache import STAGE_ENV, STAGES, replay
+from sites import SITES, get_site
+
+LOG_DIR = "crawl_logs"
+POLL_SECONDS = 1.0
+
+
+def build_jobs(site_names: list, shards_override: int = None, env: dict = None) -> list:
+    """
+    Splits every site into as many shards as its host may serve at once and
+    orders the jobs round-robin (shard 0 of every site first), so that no site
+    waits behind another one.
+    """
+    per_site = []
+    for name in site_names:
+        site = get_site(name)
+        count = shards_override or site.get("max_concurrency", 1)
+        per_site.append([
+            {"site": name, "host": site["host"], "script": site["script"], "shard": (i, count), "env": env or {}}
+            for i in range(count)
+        ])
+
+    jobs = []
+    for round_index in range(max((len(s) for s in per_site), default=0)):
+        for site_jobs in per_site:
+            if round_index < len(site_jobs):
+                jobs.append(site_jobs[round_index])
+    return jobs
+
+
+class Scheduler:
+    """Starts queued jobs while the global budget and the job's host cap allow it."""
+
+    def __init__(self, jobs: list, budget: int, host_caps: dict):
+        self.pending = deque(jobs)
+        self.budget = budget
+        self.host_caps = host_caps
+        self.running = []
+        self.finished = []
+        # Jobs added from other threads while running (e.g. HTTP escalations)
+        self.inbox = queue.Queue()
+        self.feeders = []
+
+    def add(self, jobs: list) -> None:
+        for job in jobs:
+            self.inbox.put(job)
+
+    def _feeding(self) -> bool:
+        while not self.inbox.empty():
+            self.pending.append(self.inbox.get())
+        return any(t.is_alive() for t in self.feeders) or not self.inbox.empty()
+
+    def _running_on(self, host: str) -> int:
+        return sum(1 for job in self.running if job["host"] == host)
+
+    def _next_startable(self):
+        for job in self.pending:
+            if self._running_on(job["host"]) < self.host_caps.get(job["host"], 1):
+                return job
+        return None
+
+    def _start(self, job: dict) -> None:
+        index, count = job["shard"]
+        os.makedirs(LOG_DIR, exist_ok=True)
+        log_path = os.path.join(LOG_DIR, f"{job['site']}.{index + 1}of{count}.log")
+        env = dict(os.environ, PYTHONIOENCODING="utf-8", **job["env"])
+        env[SHARD_ENV] = f"{index}/{count}"
+
+        job["log"] = open(log_path, "w", encoding="utf-8")
+        job["started"] = time.time()
+        job["process"] = subprocess.Popen(
+            [sys.executable, job["script"]],
+            env=env,
+            stdout=job["log"],
+            stderr=subprocess.STDOUT,
+        )
+        self.running.append(job)
+        print(f"[START] {job['site']} {index + 1}/{count} -> {log_path}")
+
+    def _reap(self) -> None:
+        for job in list(self.running):
+            code = job["process"].poll()
+            if code is None:
+                continue
+            job["elapsed"] = time.time() - job["started"]
+            job["returncode"] = code
+            job["log"].close()
+            self.running.remove(job)
+            self.finished.append(job)
+            index, count = job["shard"]
+            status = "OK" if code == 0 else f"EXIT {code}"
+            print(f"[{status}] {job['site']} {index + 1}/{count} in {job['elapsed']:.0f}s")
+
+    def run(self) -> list:
+        try:
+            while self._feeding() or self.pending or self.running:
+                self._reap()
+                while len(self.running) < self.budget:
+                    job = self._next_startable()
+                    if job is None:
+                        break
+                    self.pending.remove(job)
+                    self._start(job)
+                time.sleep(POLL_SECONDS)
+        except KeyboardInterrupt:
+            print("\n[INFO] Interrupted, stopping workers...")
+            for job in self.running:
+                job["process"].terminate()
+            raise
+        return self.finished
+
+
+def escalate_http_sites(scheduler: Scheduler, site_names: list, shards_override: int = None) -> None:
+    """Runs the HTTP engine and queues browser jobs for whatever it could not fetch."""
+    import http_engine
+
+    try:
+        escalated = http_engine.crawl(site_names)
+    except Exception as e:
+        print(f"[ERROR] HTTP engine failed ({e}), falling back to browsers for {site_names}")
+        escalated = {name: None for name in site_names}
+
+    for name, conditions in escalated.items():
+        env = {}
+        if conditions is not None:
+            if not conditions:
+                continue
+            os.makedirs(LOG_DIR, exist_ok=True)
+            conditions_file = os.path.abspath(os.path.join(LOG_DIR, f"{name}.escalated.txt"))
+            with open(conditions_file, "w", encoding="utf-8") as f:
+                f.write("\n".join(conditions))
+            env[CONDITIONS_FILE_ENV] = conditions_file
+            # The HTTP stage already applied --mode; the browser takes every escalated condition
+            # that is not done yet
+            env[MODE_ENV] = "resume"
+            print(f"[INFO] {name}: {len(conditions)} conditions escalated to the browser")
+        scheduler.add(build_jobs([name], shards_override, env))
+
+
+def print_summary(finished: list, wall_clock: float) -> None:
+    per_site = {}
+    for job in finished:
+        per_site.setdefault(job["site"], []).append(job)
+
+    print("\n=== Crawl summary ===")
+    for site, jobs in sorted(per_site.items()):
+        slowest = max(job["elapsed"] for job in jobs)
+        failed = sum(1 for job in jobs if job["returncode"] != 0)
+        print(f"{site:<16} workers={len(jobs)} slowest={slowest:.0f}s failed={failed}")
+    serial = sum(job["elapsed"] for job in finished)
+    print(f"Wall clock: {wall_clock:.0f}s (worker time: {serial:.0f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run all site scrapers concurrently.")
+    parser.add_argument("--sites", nargs="+", help="Sites to crawl (default: all non-interactive ones)")
+    parser.add_argument("--budget", type=int, default=os.cpu_count() or 4, help="Global number of workers")
+    parser.add_argument("--shards", type=int, help="Workers per site (overrides max_concurrency)")
+    parser.add_argument("--no-http", action="store_true", help="Do not try plain HTTP before the browser")
+    parser.add_argument("--mode", help="Which conditions to run: resume (default), all, failed, new or older:N "
+                                       "(see crawl_manifest.py)")
+    parser.add_argument("--stage", choices=STAGES, help="fetch: only store raw pages; extract: run the "
+                                                        "extractors over cached pages, offline; all (default)")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics of the run on this port "
+                                                         "(python crawl_metrics.py for the dashboard)")
+    args = parser.parse_args()
+
+    if args.mode:
+        parse_mode(args.mode)
+        # Inherited by the HTTP engine and by every worker process
+        os.environ[MODE_ENV] = args.mode
+
+    site_names = args.sites or [name for name, site in SITES.items() if not site.get("interactive")]
+    if args.stage == "extract":
+        for name in site_names:
+            replay(name)
+        return
+    if args.stage:
+        os.environ[STAGE_ENV] = args.stage
+    http_names = [] if args.no_http else [name for name in site_names if get_site(name).get("http")]
+    browser_names = [name for name in site_names if name not in http_names]
+
+    host_caps = {}
+    for name in site_names:
+        site = get_site(name)
+        host_caps[site["host"]] = max(host_caps.get(site["host"], 0), args.shards or site.get("max_concurrency", 1))
+
+    # Before anything is crawled: the HTTP engine and every worker inherit the run id,
+    # so their metrics add up to this run
+    run = crawl_metrics.run_id()
+    if args.metrics_port:
+        crawl_metrics.serve(args.metrics_port, run)
+
+    jobs = build_jobs(browser_names, args.shards)
+    scheduler = Scheduler(jobs, args.budget, host_caps)
+    if http_names:
+        feeder = threading.Thread(target=escalate_http_sites, args=(scheduler, http_names, args.shards), daemon=True)
+        scheduler.feeders.append(feeder)
+        feeder.start()
+
+    print(f"[INFO] {len(jobs)} browser workers for {len(browser_names)} sites, "
+          f"{len(http_names)} sites over HTTP first, budget {args.budget}")
+    started = time.time()
+    finished = scheduler.run()
+    print_summary(finished, time.time() - started)
+
+
+if __name__ == "__main__":
+    main()
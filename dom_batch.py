@@ -0,0 +1,41 @@
+"""
+Reads a whole list of elements in one WebDriver call.
+
+Every `.text` or `.get_attribute("href")` on a WebElement, and every
+`find_element` under it, is a separate HTTP round trip to chromedriver; ranking
+twenty search results that way costs forty or more. collect_links() runs one
+execute_script that returns, for every element matching a selector, what the
+scrapers read from it:
+
+    results = collect_links(driver, "a.gs-title")
+    for r in results:
+        r["text"]       # visible text, as WebElement.text
+        r["href"]       # resolved URL, as get_attribute("href")
+        r["flag"]       # True if `flag` matches inside the element
+        r["snippet"]    # text of the enclosing `container`, if one is given
+        r["element"]    # the WebElement, to click it
+
+    links = collect_links(driver, "a.dashboard-item__link", flag="i.icon.icon-donut")
+    results = collect_links(driver, "div.gs-title a", container="div.gsc-webResult")
+"""
+from stage_timing import timed
+
+# Hidden elements have no client rects; WebElement.text is empty for them too
+_COLLECT_JS = """
+const flag = arguments[1];
+const container = arguments[2];
+const visibleText = (el) => (el && el.getClientRects().length ? el.innerText.trim() : "");
+return Array.from(document.querySelectorAll(arguments[0]), (el) => ({
+    element: el,
+    text: visibleText(el),
+    href: el.href || el.getAttribute("href"),
+    flag: flag ? el.querySelector(flag) !== null : false,
+    snippet: container ? visibleText(el.closest(container)) : "",
+}));
+"""
+
+
+@timed("collect")
+def collect_links(driver, selector: str, flag: str = None, container: str = None) -> list:
+    """[{"element", "text", "href", "flag", "snippet"}] for every element matching `selector`, in document order."""
+    return driver.execute_script(_COLLECT_JS, selector, flag, container) or []
@@ -0,0 +1,311 @@
+"""
+Warm pool of Selenium Chrome sessions shared by the scrapers.
+
+Launching Chrome (and resolving chromedriver through ChromeDriverManager) costs
+seconds, so workers check a ready, already-consented session out of the pool,
+use it for one condition and give it back. Sessions are quit and replaced
+transparently when they fail a health check or when, at check-in:
+
+    the browser's processes (chromedriver, Chrome and its renderers) use more
+    than max_rss_mb of resident memory (needs psutil),
+    at least max_error_rate of its last ERROR_WINDOW conditions failed, or
+    it has served max_uses conditions (a ceiling; memory usually decides first).
+
+    pool = DriverPool(launch_browser, size=1, warmup=accept_cookies)
+    for condition in conditions:
+        task = manifest.start(condition)
+        driver = pool.checkout()
+        try:
+            ...
+        finally:
+            pool.checkin(driver, failed=task.status == "failed")
+
+Chrome processes left behind by crashed runs (orphaned chromedriver, or an
+automated Chrome whose chromedriver is gone) are reaped when the first pool of
+a process is created, and by hand with `python driver_pool.py [--dry-run]`.
+"""
+import argparse
+import collections
+import functools
+import importlib.util
+import queue
+import threading
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+import crawl_metrics
+from stage_timing import stage
+
+QUIT_TIMEOUT = 10
+MAX_USES = 200
+MAX_RSS_MB = 1500
+MAX_ERROR_RATE = 0.5
+ERROR_WINDOW = 6
+
+HAS_PSUTIL = importlib.util.find_spec("psutil") is not None
+# Parents orphans are re-attached to
+ORPHAN_PARENTS = {"init", "systemd", "launchd"}
+
+_reaped = False
+
+
+@functools.lru_cache(maxsize=1)
+def chromedriver_path() -> str:
+    """Resolves chromedriver once per process instead of once per launch."""
+    return ChromeDriverManager().install()
+
+
+def launch_chrome(options) -> webdriver.Chrome:
+    return webdriver.Chrome(service=Service(chromedriver_path()), options=options)
+
+
+def _service_pid(driver):
+    process = getattr(getattr(driver, "service", None), "process", None)
+    return getattr(process, "pid", None)
+
+
+def kill_session(driver) -> None:
+    """Kills chromedriver and every Chrome process of a session that would not quit."""
+    from supervisor import kill_tree
+    pid = _service_pid(driver)
+    if pid is not None:
+        kill_tree(pid)
+
+
+def quit_quietly(driver, timeout: float = QUIT_TIMEOUT) -> bool:
+    """Quits a driver without letting a hung Chrome block the caller."""
+    def do_quit():
+        try:
+            driver.quit()
+        except Exception:
+            pass
+    t = threading.Thread(target=do_quit, daemon=True)
+    t.start()
+    t.join(timeout)
+    return not t.is_alive()
+
+
+def is_healthy(driver) -> bool:
+    """Cheap round trip to chromedriver: fails if the session or window is gone."""
+    try:
+        driver.execute_script("return 1")
+        return bool(driver.window_handles)
+    except Exception:
+        return False
+
+
+def session_rss_mb(driver):
+    """Resident memory of chromedriver, Chrome and its renderers, in MB (None without psutil)."""
+    pid = _service_pid(driver)
+    if not HAS_PSUTIL or pid is None:
+        return None
+    import psutil
+    total = 0
+    try:
+        procs = psutil.Process(pid).children(recursive=True) + [psutil.Process(pid)]
+    except psutil.NoSuchProcess:
+        return None
+    for proc in procs:
+        try:
+            total += proc.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return total / 2**20
+
+
+def _is_orphan(proc) -> bool:
+    import psutil
+    try:
+        parent = proc.parent()
+        # A parent younger than the process is an unrelated one that reused the PID (Windows)
+        return (parent is None or parent.name().lower() in ORPHAN_PARENTS
+                or parent.create_time() > proc.create_time())
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return False
+
+
+def orphaned_browsers() -> list:
+    """chromedriver processes whose owner is gone, and automated Chrome instances whose chromedriver is gone."""
+    if not HAS_PSUTIL:
+        return []
+    import psutil
+    orphans = []
+    for proc in psutil.process_iter(["name", "cmdline"]):
+        name = (proc.info["name"] or "").lower()
+        cmdline = proc.info["cmdline"] or []
+        if "chromedriver" in name:
+            if _is_orphan(proc):
+                orphans.append(proc)
+        elif ("chrome" in name or "chromium" in name) and "--enable-automation" in cmdline:
+            # Only the browser process: renderers (--type=...) die with it
+            if not any(arg.startswith("--type=") for arg in cmdline) and _is_orphan(proc):
+                orphans.append(proc)
+    return orphans
+
+
+def reap_orphans(dry_run: bool = False) -> int:
+    """Kills the process trees of orphaned_browsers(); returns how many were found."""
+    from supervisor import kill_tree
+    orphans = orphaned_browsers()
+    for proc in orphans:
+        print(f"[REAP] {'found' if dry_run else 'killing'} orphaned {proc.info['name']} (pid {proc.pid})")
+        if not dry_run:
+            kill_tree(proc.pid)
+    return len(orphans)
+
+
+class DriverPool:
+    def __init__(self, factory, size: int = 1, warmup=None, max_uses: int = MAX_USES,
+                 max_rss_mb: float = MAX_RSS_MB, max_error_rate: float = MAX_ERROR_RATE):
+        """
+        factory: callable returning a new driver.
+        warmup:  optional callable(driver) run once per new session, e.g. to
+                 open the homepage and accept the cookie banner.
+        max_uses: recycle a session after this many checkouts (None = never).
+        max_rss_mb: recycle a session whose processes use more memory (None = never).
+        max_error_rate: recycle a session when this share of its last
+                 ERROR_WINDOW conditions failed (None = never).
+        """
+        global _reaped
+        self.factory = factory
+        self.size = size
+        self.warmup = warmup
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self.max_error_rate = max_error_rate
+        self._idle = queue.Queue()
+        self._uses = {}
+        self._outcomes = {}
+        self._created = 0
+        self._lock = threading.Lock()
+        self.launches = 0
+        self.recycles = 0
+        crawl_metrics.set_engine("selenium")
+        if not _reaped:
+            _reaped = True
+            reap_orphans()
+
+    def _new_driver(self):
+        """Launches a session for a slot the caller already counted in _created."""
+        try:
+            with stage("browser_launch"):
+                driver = self.factory()
+        except Exception:
+            # Give the slot back, or a failed launch would shrink the pool for good
+            with self._lock:
+                self._created -= 1
+            raise
+        self.launches += 1
+        if self.warmup:
+            try:
+                with stage("warmup"):
+                    self.warmup(driver)
+            except Exception as e:
+                print(f"[WARN] Warm-up failed, using the session anyway: {e}")
+        self._uses[id(driver)] = 0
+        self._outcomes[id(driver)] = collections.deque(maxlen=ERROR_WINDOW)
+        return driver
+
+    def _discard(self, driver) -> None:
+        self._uses.pop(id(driver), None)
+        self._outcomes.pop(id(driver), None)
+        with self._lock:
+            self._created -= 1
+        if not quit_quietly(driver):
+            print("❌ Chrome did not quit in time, killing its processes.")
+            kill_session(driver)
+
+    def fill(self) -> None:
+        """Launches every session up front so the first conditions do not pay for it."""
+        while True:
+            with self._lock:
+                if self._created >= self.size:
+                    return
+                self._created += 1
+            self._idle.put(self._new_driver())
+
+    def checkout(self, timeout: float = None):
+        with self._lock:
+            can_create = self._idle.empty() and self._created < self.size
+            if can_create:
+                self._created += 1
+        if can_create:
+            driver = self._new_driver()
+        else:
+            driver = self._idle.get(timeout=timeout)
+
+        if not is_healthy(driver):
+            print("[🔁] Unhealthy browser session, relaunching.")
+            self.recycles += 1
+            crawl_metrics.count("browser_restarts")
+            self._discard(driver)
+            with self._lock:
+                self._created += 1
+            driver = self._new_driver()
+
+        self._uses[id(driver)] += 1
+        return driver
+
+    def _recycle_reason(self, driver, failed: bool):
+        outcomes = self._outcomes.get(id(driver))
+        if outcomes is not None:
+            outcomes.append(failed)
+            if (self.max_error_rate is not None and len(outcomes) == outcomes.maxlen
+                    and sum(outcomes) >= self.max_error_rate * len(outcomes)):
+                return f"{sum(outcomes)} of the last {len(outcomes)} conditions failed"
+        if self.max_rss_mb is not None:
+            rss = session_rss_mb(driver)
+            if rss is not None and rss > self.max_rss_mb:
+                return f"{rss:.0f} MB in use"
+        uses = self._uses.get(id(driver), 0)
+        if self.max_uses is not None and uses >= self.max_uses:
+            return f"{uses} conditions served"
+        return None
+
+    def checkin(self, driver, broken: bool = False, failed: bool = False) -> None:
+        """
+        Returns a session after one condition (`failed` if it ended in an error);
+        broken, bloated, failing or worn-out sessions are replaced by a fresh one.
+        """
+        reason = "broken" if broken else self._recycle_reason(driver, failed)
+        if reason:
+            self.recycles += 1
+            crawl_metrics.count("browser_restarts")
+            self._discard(driver)
+            print(f"[🔁] Browser recycled ({reason}).")
+            return
+        self._idle.put(driver)
+
+    @contextmanager
+    def driver(self, timeout: float = None):
+        driver = self.checkout(timeout)
+        broken = failed = False
+        try:
+            yield driver
+        except Exception:
+            failed = True
+            broken = not is_healthy(driver)
+            raise
+        finally:
+            self.checkin(driver, broken=broken, failed=failed)
+
+    def close(self) -> None:
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kill chromedriver/Chrome processes left behind by crashed runs.")
+    parser.add_argument("--dry-run", action="store_true", help="Only list them")
+    args = parser.parse_args()
+    if not HAS_PSUTIL:
+        print("[REAP] psutil is not installed: pip install psutil")
+    elif not reap_orphans(args.dry_run):
+        print("[REAP] No orphaned browser processes.")
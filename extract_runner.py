@@ -0,0 +1,185 @@
+"""
+Parallel offline extraction over saved pages, on every core.
+
+Takes folders or .zip archives of saved HTML pages (hss_html_pages,
+pubmed_html_pages, a zipped crawl...) and runs each site's extractor
+(extractors.py) over them in a ProcessPoolExecutor, instead of parsing one
+page at a time on the scraping thread. Workers read and parse the pages; the
+parent writes the results in batches and reports files/sec.
+
+The site of a source is taken from its name (the site's output_dir or a
+"<site>_" prefix, e.g. hss_html_pages -> hss) or given as site=path. Results
+go where the site's scraper would save them, or under --out/<site>/. A folder
+that is also its site's output folder (healthline_html_pages and
+physiopedia_html_pages hold the raw pages of the legacy scrapers) needs --out,
+so that the extracted pages do not overwrite the raw ones.
+
+    python extract_runner.py hss_html_pages nhs_html_pages
+    python extract_runner.py pubmed=pubmed_pages.zip --out extracted --workers 8
+"""
+import argparse
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from extractors import (EXTRACTORS, conditions_by_filename, extract, extract_pubmed, extract_raw_page,
+                        output_path)
+from sites import SITES
+
+HTML_EXTENSIONS = (".html", ".htm")
+# Extractors that keep the whole page: their output is the saved page itself
+PASS_THROUGH = (extract_raw_page, extract_pubmed)
+BATCH_SIZE = 200
+CHUNK_SIZE = 16
+
+# Archives opened by this worker process, reused across its files
+_archives = {}
+
+
+def infer_site(path: str) -> str:
+    name = os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+    for site_name, site in SITES.items():
+        if site["output_dir"] == name:
+            return site_name
+    prefixed = [site_name for site_name in SITES if name == site_name or name.startswith(f"{site_name}_")]
+    if not prefixed:
+        raise ValueError(f"Cannot tell the site of '{path}': pass it as site=path")
+    return max(prefixed, key=len)
+
+
+def parse_source(spec: str):
+    """"site=path" or "path" -> (site, path)."""
+    site_name, sep, path = spec.partition("=")
+    if not sep:
+        return infer_site(spec), spec
+    if site_name not in EXTRACTORS:
+        raise ValueError(f"No extractor for site '{site_name}'")
+    return site_name, path
+
+
+def list_pages(path: str, extensions=HTML_EXTENSIONS) -> list:
+    """[(source, archive member or None, file stem)] of the pages in a folder or archive."""
+    pages = []
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.namelist():
+                stem, ext = os.path.splitext(os.path.basename(member))
+                if stem and ext.lower() in extensions:
+                    pages.append((path, member, stem))
+    else:
+        for entry in os.scandir(path):
+            stem, ext = os.path.splitext(entry.name)
+            if entry.is_file() and ext.lower() in extensions:
+                pages.append((entry.path, None, stem))
+    return sorted(pages, key=lambda page: page[2])
+
+
+def read_page(source: str, member: str = None) -> str:
+    if member is None:
+        with open(source, encoding="utf-8", errors="replace") as f:
+            return f.read()
+    archive = _archives.get(source)
+    if archive is None:
+        archive = _archives[source] = zipfile.ZipFile(source)
+    return archive.read(member).decode("utf-8", errors="replace")
+
+
+def _extract_page(job):
+    # Runs in a worker process
+    site_name, source, member, condition = job
+    try:
+        return job, extract(site_name, read_page(source, member), condition), None
+    except Exception as e:
+        return job, None, f"{type(e).__name__}: {e}"
+
+
+def _target(site_name: str, condition: str, out_dir: str = None) -> str:
+    file_path = output_path(site_name, condition)
+    if out_dir:
+        file_path = os.path.join(out_dir, site_name, os.path.basename(file_path))
+    return file_path
+
+
+def _passes_through(site_name: str) -> bool:
+    return EXTRACTORS[site_name][0] in PASS_THROUGH
+
+
+def _check_in_place(site_name: str, path: str, out_dir: str = None) -> None:
+    """Refuses a folder that is also the site's output folder unless the extractor keeps the page as is."""
+    if out_dir or zipfile.is_zipfile(path) or _passes_through(site_name):
+        return
+    output_dir = os.path.dirname(_target(site_name, "x"))
+    if os.path.abspath(output_dir) == os.path.abspath(path):
+        raise ValueError(f"'{path}' is also where {site_name}'s extracted pages go and would be "
+                         f"overwritten: pass --out")
+
+
+def _write_batch(batch: list) -> None:
+    for file_path, output in batch:
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(output)
+
+
+def run(sources: list, out_dir: str = None, workers: int = None, batch_size: int = BATCH_SIZE) -> dict:
+    """Extracts every page of the (site, path) sources; returns the counts."""
+    names = conditions_by_filename()
+    jobs = []
+    for site_name, path in sources:
+        _check_in_place(site_name, path, out_dir)
+        pages = list_pages(path)
+        print(f"[EXTRACT] {site_name}: {len(pages)} pages in {path}")
+        jobs += [(site_name, source, member, names.get(stem, stem)) for source, member, stem in pages]
+
+    counts = {"written": 0, "unchanged": 0, "empty": 0, "errors": 0}
+    started = time.perf_counter()
+    batch = []
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for job, output, error in pool.map(_extract_page, jobs, chunksize=CHUNK_SIZE):
+            site_name, source, member, condition = job
+            done += 1
+            if error:
+                counts["errors"] += 1
+                print(f"[EXTRACT ❌] {site_name}: {condition}: {error}")
+            elif not output:
+                counts["empty"] += 1
+            else:
+                file_path = _target(site_name, condition, out_dir)
+                if (member is None and os.path.abspath(file_path) == os.path.abspath(source)
+                        and (_passes_through(site_name) or output == read_page(source))):
+                    # Sites that keep the whole page: the source already is the output
+                    counts["unchanged"] += 1
+                else:
+                    batch.append((file_path, output))
+
+            if done % batch_size == 0:
+                _write_batch(batch)
+                counts["written"] += len(batch)
+                batch = []
+                elapsed = time.perf_counter() - started
+                print(f"[EXTRACT] {done}/{len(jobs)} files, {done / elapsed:.1f} files/s")
+
+    _write_batch(batch)
+    counts["written"] += len(batch)
+    elapsed = time.perf_counter() - started
+    rate = len(jobs) / elapsed if elapsed else 0.0
+    print(f"[EXTRACT] {len(jobs)} files in {elapsed:.1f}s ({rate:.1f} files/s): "
+          + ", ".join(f"{n} {what}" for what, n in counts.items()))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the site extractors over saved pages on every core.")
+    parser.add_argument("sources", nargs="+", help="Folders or .zip archives of HTML pages, optionally as site=path")
+    parser.add_argument("--out", help="Write to OUT/<site>/ instead of each site's output folder")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per core)")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE, help="Results written per batch")
+    args = parser.parse_args()
+
+    run([parse_source(spec) for spec in args.sources], args.out, args.workers, args.batch)
+
+
+if __name__ == "__main__":
+    main()
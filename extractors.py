@@ -0,0 +1,362 @@
+"""
+Site-specific extraction of the saved output from an article page's HTML.
+
+These are the BeautifulSoup cleaning steps of the scrapers, pulled out so the
+same code runs on `driver.page_source` inside a scraper and on HTML fetched
+over plain HTTP by http_engine.py, and on cached pages during an offline
+replay (page_cache.py). Each extractor takes (html, condition) and returns the
+exact content the scraper writes to disk, or None when the page has nothing to
+save. The parser behind the soups is chosen in html_parsing.py (HTML_PARSER);
+extractors that read a single container only parse the site's "content_root".
+"""
+import os
+import re
+
+from html_parsing import make_soup, visible_text
+from ranking import rank
+from sites import get_site
+from stage_timing import timed
+
+# Keywords used by PMC to pick an article and to keep only relevant sections
+PMC_CONTENT_KEYWORDS = [
+    "treatment", "treatments", "rehabilitation", "therapy", "physical therapy",
+    "exercises", "exercise", "routine", "routines", "management", "stretch",
+    "mobility", "home care", "recovery", "relief"
+]
+
+
+def clean_condition_name(name: str) -> str:
+    return re.sub(r'[\\/*?:"<>|]', '_', name)
+
+
+def clean_pmc_filename(name: str) -> str:
+    return re.sub(r'[\\/*?:"<>|]', "_", name.strip().replace(" ", "_"))
+
+
+@timed("extract")
+def extract_nhs(html: str, condition: str) -> str:
+    soup = make_soup(html)
+    for tag in soup(["script", "style", "img", "video", "svg", "iframe", "noscript", "header", "footer", "nav", "aside"]):
+        tag.decompose()
+    return soup.get_text(separator="\n", strip=True)
+
+
+def best_pmc_link(candidates: list, condition: str):
+    """Picks the (title, link) candidate whose title best matches the condition and keywords (ranking.py)."""
+    ranking = rank(condition, [title for title, _ in candidates], keywords=PMC_CONTENT_KEYWORDS)
+    return candidates[ranking[0][0]][1] if ranking else None
+
+
+@timed("extract")
+def extract_pmc(html: str, condition: str):
+    soup = make_soup(html, get_site("pmc")["content_root"])
+    article = soup.find("div", id="maincontent") or soup.body
+    if not article:
+        return None
+
+    relevant_text = []
+    current_heading = ""
+
+    # === Extraer secciones relevantes ===
+    for tag in article.find_all(["h1", "h2", "h3", "h4", "p", "ul", "ol", "figure"]):
+        text = tag.get_text(separator=" ", strip=True).lower()
+
+        if tag.name.startswith("h"):
+            current_heading = tag.get_text(strip=True)
+
+        # Si es párrafo, lista o figura y contiene una keyword, lo guardamos
+        if tag.name in ["p", "ul", "ol", "figure"]:
+            if any(kw in text for kw in PMC_CONTENT_KEYWORDS):
+                relevant_text.append(f"{current_heading}\n{text}\n")
+
+    # === Añadir referencias si existen ===
+    references_section = article.find("section", id=re.compile("references?", re.I))
+    if references_section:
+        refs = references_section.get_text(separator="\n", strip=True)
+        relevant_text.append("\nREFERENCIAS\n" + refs)
+
+    cleaned_output = "\n".join(relevant_text).strip()
+    return cleaned_output or "[NO SE ENCONTRARON SECCIONES RELEVANTES]"
+
+
+@timed("extract")
+def extract_pubmed(html: str, condition: str) -> str:
+    # PubMed keeps the whole article (or free full text) page
+    return html
+
+
+@timed("extract")
+def extract_orthoinfo(html: str, condition: str) -> str:
+    soup = make_soup(html, get_site("orthoinfo")["content_root"])
+    article_col = soup.find("div", class_="article-col")
+
+    if article_col:
+        for tag in article_col(["script", "style", "img", "video", "noscript", "aside", "footer", "header"]):
+            tag.decompose()
+        clean_text = article_col.get_text(separator="\n", strip=True)
+    else:
+        clean_text = "[WARNING] No article content found."
+
+    return f"""
+        <!DOCTYPE html>
+        <html lang="en">
+        <head>
+            <meta charset="UTF-8">
+            <title>{condition}</title>
+        </head>
+        <body>
+        <pre style="font-family:Arial, sans-serif; white-space:pre-wrap;">{clean_text}</pre>
+        </body>
+        </html>
+        """
+
+
+@timed("extract")
+def extract_physiopedia(html: str, condition: str):
+    soup = make_soup(html, get_site("physiopedia")["content_root"])
+    content_div = soup.select_one("div.mw-parser-output")
+    if not content_div:
+        return None
+
+    # Remove junk
+    for selector in [
+        "div.card.card-vertical",
+        "div.pp_related_courses_wrap",
+        "div#pp_content_hidden_msg_new_white_bg",
+        "div#pp_content_hidden_cta_link",
+        "div.st-module:has(.st-module-heading:-soup-contains('Related articles'))",
+        "div.editors.tab-pane.active",
+        "ul.nav.nav-tabs",
+        "div.block-article-meta.block-article-meta-tabs",  # contents module
+    ]:
+        for tag in soup.select(selector):
+            tag.decompose()
+
+    for p in content_div.find_all("p", recursive=False)[:5]:
+        if any(kw in p.text.lower() for kw in ["original editor", "top contributors", "contributors"]):
+            p.decompose()
+
+    for tag in content_div.find_all(["img", "video", "iframe", "figure"]):
+        tag.decompose()
+
+    toc = soup.select_one("div#toc")
+    if toc:
+        toc.decompose()
+
+    # Extract from <h2> onward
+    start = content_div.find("h2")
+    html_content = ""
+    while start:
+        html_content += str(start)
+        start = start.find_next_sibling()
+
+    return f"<html><head><meta charset='utf-8'><title>{condition}</title></head><body>{html_content}</body></html>"
+
+
+@timed("extract")
+def extract_clevelandclinic(html: str, condition: str) -> str:
+    soup = make_soup(html, get_site("clevelandclinic")["content_root"])
+
+    # Remove unnecessary elements
+    for selector in [
+        "header", "footer", "script", "noscript", "aside", "img", "video",
+        "div.article-sidebar",
+        "div[data-identity='inline-cta-panel']",
+        "div.flex-row.gap-x-rem32px",
+        "section.py-rem32px.border-y.border-gray-400.mt-rem32px",
+        "section.contact-ribbon"
+    ]:
+        for el in soup.select(selector):
+            el.decompose()
+
+    # Get the main content
+    main = soup.select_one("div[data-identity='main-article-content']")
+    if main:
+        return f"<html><head><meta charset='utf-8'><title>{condition}</title></head><body>{str(main)}</body></html>"
+    return "<html><body><p>No content found.</p></body></html>"
+
+
+@timed("extract")
+def extract_healthline(html: str, condition: str):
+    soup = make_soup(html)
+    article = soup.select_one("#__next article")
+    if not article:
+        return None
+
+    # Remove images, videos, scripts
+    for tag in article.find_all(["img", "video", "script", "style"]):
+        tag.decompose()
+
+    cleaned_text = article.get_text(separator="\n", strip=True)
+    return f"<html><head><meta charset='utf-8'><title>{condition}</title></head><body><pre>{cleaned_text}</pre></body></html>"
+
+
+@timed("extract")
+def extract_hss(html: str, condition: str) -> str:
+    return visible_text(html, ["script", "style", "img", "svg", "iframe", "noscript", "header", "footer", "nav", "aside"])
+
+
+@timed("extract")
+def extract_mayoclinic(html: str, condition: str):
+    soup = make_soup(html, get_site("mayoclinic")["content_root"])
+    for tag in soup(["script", "style", "img", "iframe", "video", "noscript", "svg"]):
+        tag.decompose()
+
+    main_content = soup.find("article", id="main-content")
+    if not main_content:
+        return None
+    return main_content.prettify()
+
+
+@timed("extract")
+def extract_medscape(html: str, condition: str) -> str:
+    return visible_text(html, ["script", "style", "img", "svg", "iframe", "noscript", "header", "footer", "nav", "aside"])
+
+
+@timed("extract")
+def extract_mnt(html: str, condition: str) -> str:
+    soup = make_soup(html)
+    for tag in soup(["script", "style", "img", "video", "svg", "iframe", "noscript", "header", "footer", "nav", "aside"]):
+        tag.decompose()
+
+    title = soup.find("h1").get_text(strip=True) if soup.find("h1") else condition
+    body = soup.get_text(separator="\n", strip=True)
+    return f"# {title}\n\n{body}"
+
+
+@timed("extract")
+def extract_orthobullets(html: str, condition: str) -> str:
+    return visible_text(html, ["script", "style", "img", "svg", "video", "iframe", "noscript", "header", "footer", "nav", "aside"])
+
+
+@timed("extract")
+def extract_physiotutors(html: str, condition: str):
+    soup = make_soup(html)
+    for tag in soup(["script", "style", "nav", "header", "footer", "aside", "noscript", "svg"]):
+        tag.decompose()
+
+    main = soup.find("main") or soup.find("div", class_="post-content") or soup.body
+    if not main:
+        return None
+
+    title_tag = main.find("h1")
+    title = title_tag.get_text(strip=True) if title_tag else condition
+
+    parts = [f"# {title}"]
+    for el in main.descendants:
+        if el.name == "img" and el.has_attr("src"):
+            parts.append(f"[IMAGE] {el['src']}")
+        elif el.name in ("video", "source", "iframe") and el.has_attr("src"):
+            parts.append(f"[MEDIA] {el['src']}")
+        elif isinstance(el, str):
+            clean = el.strip()
+            if clean:
+                parts.append(clean)
+    return "\n".join(parts)
+
+
+@timed("extract")
+def extract_raw_page(html: str, condition: str) -> str:
+    # Sites whose scraper keeps the whole page (Hopkins, ScienceDirect)
+    return html
+
+
+@timed("extract")
+def extract_spinehealth(html: str, condition: str) -> str:
+    soup = make_soup(html)
+    for tag in soup(["script", "style", "img", "video", "iframe", "header", "footer", "nav"]):
+        tag.decompose()
+
+    main = soup.find("div", class_="main-content")
+    return main.get_text(separator="\n", strip=True) if main else soup.get_text()
+
+
+@timed("extract")
+def extract_sportdoctor(html: str, condition: str) -> str:
+    return visible_text(html, ["script", "style", "img", "video", "iframe", "svg", "header", "footer", "nav", "aside"])
+
+
+@timed("extract")
+def extract_sportsinjury(html: str, condition: str) -> str:
+    return visible_text(html, ["script", "style", "nav", "header", "footer", "aside", "svg", "noscript"], root=("article",))
+
+
+@timed("extract")
+def extract_verywellhealth(html: str, condition: str):
+    soup = make_soup(html)
+    for tag in soup(["script", "style", "nav", "footer", "header", "img", "video", "aside", "svg", "iframe"]):
+        tag.decompose()
+
+    main = soup.find("main") or soup.body
+    if not main:
+        return None
+    return main.get_text(separator="\n", strip=True)
+
+
+@timed("extract")
+def extract_webmd(html: str, condition: str) -> str:
+    soup = make_soup(html)
+    # Same whitespace folding as the rendered text Selenium used to read
+    paragraphs = (" ".join(p.get_text().split()) for p in soup.select("div.article__body section p"))
+    content_html = "\n".join(f"<p>{text}</p>" for text in paragraphs if text)
+
+    html_output = f"""
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <title>{condition}</title>
+</head>
+<body>
+    {content_html}
+</body>
+</html>
+        """
+    return html_output.strip()
+
+
+# site -> (extractor, file name for a condition)
+EXTRACTORS = {
+    "nhs": (extract_nhs, lambda c: f"{clean_condition_name(c)}.txt"),
+    "pmc": (extract_pmc, lambda c: f"{clean_pmc_filename(c)}.txt"),
+    "pubmed": (extract_pubmed, lambda c: f"{clean_condition_name(c)}.html"),
+    "orthoinfo": (extract_orthoinfo, lambda c: f"{clean_condition_name(c)}.html"),
+    "physiopedia": (extract_physiopedia, lambda c: f"{clean_condition_name(c)}.html"),
+    "clevelandclinic": (extract_clevelandclinic, lambda c: f"{clean_condition_name(c)}.html"),
+    "healthline": (extract_healthline, lambda c: f"{clean_condition_name(c).strip()}.html"),
+    "hopkins": (extract_raw_page, lambda c: f"{clean_condition_name(c)}.html"),
+    "hss": (extract_hss, lambda c: f"{clean_condition_name(c.strip())}.txt"),
+    "mayoclinic": (extract_mayoclinic, lambda c: f"{clean_condition_name(c)}.html"),
+    "medscape": (extract_medscape, lambda c: f"{clean_condition_name(c.strip())}.txt"),
+    "mnt": (extract_mnt, lambda c: f"{clean_condition_name(c.strip())}.txt"),
+    "orthobullets": (extract_orthobullets, lambda c: f"{clean_condition_name(c.strip())}.txt"),
+    "physiotutors": (extract_physiotutors, lambda c: f"{clean_condition_name(c)}.txt"),
+    "sciencedirect": (extract_raw_page, lambda c: f"{clean_condition_name(c)}.html"),
+    "spinehealth": (extract_spinehealth, lambda c: f"{clean_condition_name(c)}.txt"),
+    "sportdoctor": (extract_sportdoctor, lambda c: f"{clean_condition_name(c.strip())}.txt"),
+    "sportsinjury": (extract_sportsinjury, lambda c: f"{clean_condition_name(c)}.txt"),
+    "verywellhealth": (extract_verywellhealth, lambda c: f"{clean_condition_name(c)}.txt"),
+    "webmd": (extract_webmd, lambda c: f"{clean_condition_name(c)}.html"),
+}
+
+
+def output_path(site_name: str, condition: str) -> str:
+    """Where the scraper of `site_name` saves the output for `condition`."""
+    _, filename = EXTRACTORS[site_name]
+    return os.path.join(get_site(site_name)["output_dir"], filename(condition))
+
+
+def conditions_by_filename() -> dict:
+    """{saved file name without extension: condition} over the catalog, to map saved pages back."""
+    from condition_catalog import load_conditions
+
+    names = {}
+    for condition in load_conditions():
+        names.setdefault(clean_condition_name(condition), condition)
+        names.setdefault(clean_pmc_filename(condition), condition)
+    return names
+
+
+def extract(site_name: str, html: str, condition: str):
+    extractor, _ = EXTRACTORS[site_name]
+    return extractor(html, condition)
@@ -1,82 +1,109 @@
 import re
-import time
 import os
-import pandas as pd
-from playwright.sync_api import sync_playwright
+from condition_catalog import load_conditions
+from crawl_manifest import Manifest
+from playwright_contexts import run_in_contexts
+from resource_blocking import PlaywrightBlocker
+from readiness import wait_ready_async
+from page_cache import PageCache, replay_if_requested
+from stage_timing import stage
 
 def clean_condition_name(name: str) -> str:
     """Sanitize the condition name to use as a filename."""
     return re.sub(r'[\\/*?:"<>|]', '_', name)
 
 # Load related conditions from CSV
-df = pd.read_csv("exercises.csv", encoding="utf-8")
-all_conditions = []
-for row in df["Related Conditions"].dropna():
-    splitted = re.split(r"[/\n]+", row)
-    splitted = [c.strip() for c in splitted if c.strip()]
-    all_conditions.extend(splitted)
-all_conditions = list(set(all_conditions))  # Remove duplicates
+all_conditions = load_conditions()
+# No browser needed to re-extract from page_cache: CRAWL_REPLAY=1
+replay_if_requested("hopkins", all_conditions)
+# Skip what earlier runs already finished (CRAWL_MODE, see crawl_manifest.py)
+manifest = Manifest("hopkins")
+all_conditions = manifest.select(all_conditions)
+cache = PageCache("hopkins")
 
 # Folder to store the final pages
 os.makedirs("hopkins_html_pages", exist_ok=True)
 
-with sync_playwright() as p:
-    browser = p.chromium.launch(headless=False)  # Set to True later if needed
-    context = browser.new_context(
-        user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/113.0.0.0 Safari/537.36",
-        viewport={'width': 1280, 'height': 800}
-    )
-    page = context.new_page()
+# Isolated browser contexts sharing one Chromium (override with PLAYWRIGHT_CONTEXTS)
+NUM_CONTEXTS = 4
+HEADLESS = True  # Set to False to watch the browser
 
-    for condition in all_conditions:
-        print(f"\n[INFO] Searching for condition: '{condition}'")
+CONTEXT_OPTIONS = {
+    "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/113.0.0.0 Safari/537.36",
+    "viewport": {'width': 1280, 'height': 800},
+}
 
-        try:
-            # 1) Go to the website
-            page.goto("https://www.hopkinsmedicine.org", timeout=60000)
-            time.sleep(2)
+# Images, media, fonts, ads and analytics are aborted before they hit the network
+blocker = PlaywrightBlocker("hopkins")
 
-            # 2) Handle cookie banner if it appears
+async def scrape_condition(page, condition):
+    print(f"\n[INFO] Searching for condition: '{condition}'")
+    task = manifest.start(condition)
+
+    try:
+        # 1) Go to the website
+        with stage("home_load"):
+            await page.goto("https://www.hopkinsmedicine.org", timeout=60000)
+        await wait_ready_async(page, "hopkins", "home", replaces=2)
+
+        # 2) Handle cookie banner if it appears
+        with stage("consent"):
             try:
-                if page.locator("#onetrust-accept-btn-handler").is_visible():
-                    page.click("#onetrust-accept-btn-handler")
+                if await page.locator("#onetrust-accept-btn-handler").is_visible():
+                    await page.click("#onetrust-accept-btn-handler")
                     print("[INFO] Cookie banner accepted.")
             except:
                 print("[INFO] No cookie banner detected.")
 
-            # 3) Click search icon
-            page.click("button.toggle-ent-search.search-icon")
-            page.wait_for_selector("input#header-search")
+        # 3) Click search icon
+        with stage("search_submit"):
+            await page.click("button.toggle-ent-search.search-icon")
+            await page.wait_for_selector("input#header-search")
             print("[INFO] Clicked search icon.")
 
             # 4) Search for the condition
             search_input = page.locator("input#header-search")
-            search_input.fill(condition)
+            await search_input.fill(condition)
             submit_btn = page.locator("button#header-search-submit")
-            page.evaluate("(btn) => btn.click()", submit_btn)
-            print("[INFO] Submitted search form.")
-            page.wait_for_timeout(1500)
-
-            # 5) Click first result
-            first_result = page.wait_for_selector("a.search-results-title", timeout=15000)
-            href = first_result.get_attribute("href")
-            print(f"[INFO] Opening first result: {href}")
-            first_result.click()
-
-            # 6) Wait for the target page and save HTML
-            page.wait_for_selector("h1", timeout=15000)
-            page.wait_for_timeout(1500)
-            page_html = page.content()
-
-            safe_name = clean_condition_name(condition)
-            file_path = os.path.join("hopkins_html_pages", f"{safe_name}.html")
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(page_html)
-            print(f"[INFO] Saved HTML to '{file_path}'")
-
-        except Exception as e:
-            print(f"[ERROR] Failed to process '{condition}': {e}'")
-
-    browser.close()
+            await submit_btn.evaluate("(btn) => btn.click()")
+        print("[INFO] Submitted search form.")
+        await wait_ready_async(page, "hopkins", "results", replaces=1.5)
+
+        # 5) Click first result
+        first_result = await page.wait_for_selector("a.search-results-title", timeout=15000)
+        cache.put(condition, "results", page.url, await page.content())
+        href = await first_result.get_attribute("href")
+        print(f"[INFO] Opening first result: {href}")
+        with stage("article_load"):
+            await first_result.click()
+
+        # 6) Wait for the target page and save HTML
+        await page.wait_for_selector("h1", timeout=15000)
+        await wait_ready_async(page, "hopkins", "article", replaces=1.5)
+        blocker.report(page, condition)
+        page_html = await page.content()
+        cache.put(condition, "article", page.url, page_html)
+        if cache.fetch_only(task, page.url):
+            return
+
+        safe_name = clean_condition_name(condition)
+        file_path = os.path.join("hopkins_html_pages", f"{safe_name}.html")
+        with stage("write"), open(file_path, "w", encoding="utf-8") as f:
+            f.write(page_html)
+        task.done(file_path, page_html, url=page.url)
+        print(f"[INFO] Saved HTML to '{file_path}'")
+
+    except Exception as e:
+        print(f"[ERROR] Failed to process '{condition}': {e}'")
+        task.fail(e)
+
+run_in_contexts(
+    all_conditions,
+    scrape_condition,
+    contexts=NUM_CONTEXTS,
+    headless=HEADLESS,
+    context_kwargs=CONTEXT_OPTIONS,
+    setup_context=blocker.install,
+)
 
 print("\n✅ All done! Check the 'hopkins_html_pages' folder for saved pages.")
@@ -1,7 +1,5 @@
 import re
-import time
 import os
-import pandas as pd
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
@@ -10,6 +8,10 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
+from condition_catalog import load_conditions
+from page_cache import PageCache
+from readiness import wait_ready
+from pacing import Pacer
 
 def clean_condition_name(name: str) -> str:
     """
@@ -18,17 +20,7 @@ def clean_condition_name(name: str) -> str:
     return re.sub(r'[\\/*?:"<>|]', '_', name)
 
 # 1) Read CSV data (exercises.csv)
-df = pd.read_csv("exercises.csv", encoding="utf-8")
-
-all_conditions = []
-for row in df["Related Conditions"].dropna():
-    # Split on slashes or newlines
-    splitted = re.split(r"[/\n]+", row)
-    splitted = [c.strip() for c in splitted if c.strip()]
-    all_conditions.extend(splitted)
-
-# Remove duplicates
-all_conditions = list(set(all_conditions))
+all_conditions = load_conditions()
 
 # 2) Setup Selenium
 options = Options()
@@ -56,14 +48,19 @@ base_url = "https://www.hss.edu/conditions.asp"
 
 # Create a folder to store saved HTML pages
 os.makedirs("hss_html_pages", exist_ok=True)
+# Raw pages also go to the page cache, for the extract stage (see page_cache.py)
+cache = PageCache("hss")
+# Pause between queries, from "min_interval" in sites.py (see pacing.py)
+pacer = Pacer("hss")
 
 for condition in all_conditions:
+    pacer.wait()
     print(f"\n[INFO] Searching for condition: '{condition}'")
 
     try:
         # 4) Go to the HSS conditions page
         driver.get(base_url)
-        time.sleep(2)
+        wait_ready(driver, "hss", "home", replaces=2)
 
         # 5) Find the search box: <input class="st-default-search-input" placeholder="Search Conditions and Treatments">
         search_box = wait.until(
@@ -74,7 +71,7 @@ for condition in all_conditions:
         )
         search_box.clear()
         search_box.send_keys(condition)
-        time.sleep(1)
+        wait_ready(driver, "hss", "typed", replaces=1)
 
         # 6) Press Enter to trigger the search (instead of clicking magnifying glass)
         search_box.send_keys(Keys.ENTER)
@@ -97,7 +94,7 @@ for condition in all_conditions:
 
         # 9) Attempt to click using normal click -> JS click -> direct navigate
         driver.execute_script("arguments[0].scrollIntoView(true);", anchor)
-        time.sleep(1)
+        wait_ready(driver, "hss", "scrolled", replaces=1)
 
         clicked = False
         try:
@@ -123,22 +120,22 @@ for condition in all_conditions:
 
         # 10) Wait for final page to load. Typically, it has <h1>...
         wait.until(EC.visibility_of_element_located((By.TAG_NAME, "h1")))
-        time.sleep(2)
+        wait_ready(driver, "hss", "article", replaces=2)
 
         # 11) Save HTML of the final page
         page_html = driver.page_source
+        cache.put(condition, "article", driver.current_url, page_html)
         safe_name = clean_condition_name(condition)
         file_path = os.path.join("hss_html_pages", f"{safe_name}.html")
         with open(file_path, "w", encoding="utf-8") as f:
             f.write(page_html)
 
+        pacer.success()
         print(f"[INFO] Saved HTML to '{file_path}'")
 
     except Exception as e:
         print(f"[ERROR] Failed to process '{condition}': {e}")
-
-    # 12) Optional pause between queries
-    time.sleep(5)
+        pacer.failed(e)
 
 driver.quit()
 print("\n[INFO] All done! Check the 'hss_html_pages' folder for your saved pages.")
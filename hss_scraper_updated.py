@@ -1,76 +1,87 @@
-import re
-import time
 import os
-import pandas as pd
-from bs4 import BeautifulSoup
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-
-def clean_condition_name(name: str) -> str:
-    return re.sub(r'[\\/*?:"<>|]', '_', name.strip())
+from condition_catalog import load_conditions
+from crawl_manifest import Manifest
+from resource_blocking import block_resources, enable_request_log, report_blocked
+from readiness import wait_ready
+from pacing import Pacer
+from extractors import extract_hss, output_path
+from page_cache import PageCache, replay_if_requested
+from driver_pool import DriverPool, launch_chrome
+from stage_timing import stage
 
 # 1) Load conditions from CSV
-df = pd.read_csv("exercises.csv", encoding="utf-8")
-all_conditions = []
-for row in df["Related Conditions"].dropna():
-    for cond in re.split(r"[/\n]+", row):
-        if cond.strip():
-            all_conditions.append(cond.strip())
-
-# Remove duplicates
-all_conditions = list(set(all_conditions))
+all_conditions = load_conditions()
+# No browser needed to re-extract from page_cache: CRAWL_REPLAY=1
+replay_if_requested("hss", all_conditions)
+# Skip what earlier runs already finished (CRAWL_MODE, see crawl_manifest.py)
+manifest = Manifest("hss")
+all_conditions = manifest.select(all_conditions)
+cache = PageCache("hss")
 
 # 2) Selenium setup
-options = Options()
-# options.add_argument("--headless")  # Uncomment if you don't want to see the browser
-options.add_argument("--disable-gpu")
-options.add_argument("--no-sandbox")
-options.add_argument("--ignore-certificate-errors")
-options.add_argument("--ignore-ssl-errors=yes")
-options.add_argument(
-    '--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
-    'AppleWebKit/537.36 (KHTML, like Gecko) '
-    'Chrome/98.0.4758.102 Safari/537.36'
-)
-
-driver = webdriver.Chrome(
-    service=Service(ChromeDriverManager().install()),
-    options=options
-)
-wait = WebDriverWait(driver, 30)
+def launch_browser():
+    options = Options()
+    # options.add_argument("--headless")  # Uncomment if you don't want to see the browser
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--ignore-certificate-errors")
+    options.add_argument("--ignore-ssl-errors=yes")
+    options.add_argument(
+        '--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
+        'AppleWebKit/537.36 (KHTML, like Gecko) '
+        'Chrome/98.0.4758.102 Safari/537.36'
+    )
+
+    enable_request_log(options)
+    driver = launch_chrome(options)
+    block_resources(driver, "hss")
+    return driver
+
+# Se recicla si crece su memoria o su tasa de errores (driver_pool.py)
+driver_pool = DriverPool(launch_browser)
+driver_pool.fill()
 
 base_url = "https://www.hss.edu/conditions.asp"
 
 # 3) Create output folder
 os.makedirs("hss_text_pages", exist_ok=True)
 
+# Pausa mínima entre condiciones (min_interval en sites.py)
+pacer = Pacer("hss")
+
 for condition in all_conditions:
+    pacer.wait()
     print(f"\n🔍 Buscando: '{condition}'")
+    task = manifest.start(condition)
+    driver = driver_pool.checkout()
+    wait = WebDriverWait(driver, 30)
 
     try:
         # Go to HSS search page
-        driver.get(base_url)
-        time.sleep(2)
+        with stage("home_load"):
+            driver.get(base_url)
+        wait_ready(driver, "hss", "home", replaces=2)
 
         # Wait for and use search box
-        search_box = wait.until(
-            EC.presence_of_element_located((By.CSS_SELECTOR,
-                "input.st-default-search-input[placeholder='Search Conditions and Treatments']"))
-        )
-        search_box.clear()
-        search_box.send_keys(condition)
-        time.sleep(1)
-        search_box.send_keys(Keys.ENTER)
+        with stage("search_submit"):
+            search_box = wait.until(
+                EC.presence_of_element_located((By.CSS_SELECTOR,
+                    "input.st-default-search-input[placeholder='Search Conditions and Treatments']"))
+            )
+            search_box.clear()
+            search_box.send_keys(condition)
+            wait_ready(driver, "hss", "typed", replaces=1)
+            search_box.send_keys(Keys.ENTER)
 
         # Wait for results
         wait.until(EC.presence_of_element_located((By.CLASS_NAME, "st-ui-result")))
-        time.sleep(2)
+        wait_ready(driver, "hss", "results", replaces=2)
+        cache.put(condition, "results", driver.current_url, driver.page_source)
 
         # Click on first search result
         anchor = driver.find_element(
@@ -81,39 +92,48 @@ for condition in all_conditions:
         print(f"[INFO] Opening: {href}")
 
         # Try normal click or JS click or direct nav
-        try:
-            driver.execute_script("arguments[0].scrollIntoView(true);", anchor)
-            time.sleep(1)
-            anchor.click()
-        except:
+        with stage("article_load"):
             try:
-                driver.execute_script("arguments[0].click();", anchor)
+                driver.execute_script("arguments[0].scrollIntoView(true);", anchor)
+                wait_ready(driver, "hss", "scrolled", replaces=1)
+                anchor.click()
             except:
-                driver.get(href)
+                try:
+                    driver.execute_script("arguments[0].click();", anchor)
+                except:
+                    driver.get(href)
 
         # Wait for page to load
         wait.until(EC.visibility_of_element_located((By.TAG_NAME, "h1")))
-        time.sleep(2)
+        wait_ready(driver, "hss", "article", replaces=2)
 
         # Extract visible text only
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        for tag in soup(["script", "style", "img", "svg", "iframe", "noscript", "header", "footer", "nav", "aside"]):
-            tag.decompose()
-
-        main = soup.find("main") or soup.body
-        text = main.get_text(separator="\n", strip=True)
+        report_blocked(driver, condition)
+        html = driver.page_source
+        if pacer.check(html):
+            # CAPTCHA or block page instead of the article: leave it for a later run
+            task.fail("blocked page", url=driver.current_url, error_class="Blocked")
+            continue
+        cache.put(condition, "article", driver.current_url, html)
+        if cache.fetch_only(task, driver.current_url):
+            continue
+        text = extract_hss(html, condition)
 
         # Save text file
-        filename = os.path.join("hss_text_pages", f"{clean_condition_name(condition)}.txt")
-        with open(filename, "w", encoding="utf-8") as f:
+        filename = output_path("hss", condition)
+        with stage("write"), open(filename, "w", encoding="utf-8") as f:
             f.write(text)
 
+        task.done(filename, text, url=driver.current_url)
+        pacer.success()
         print(f"✅ Guardado: {filename}")
 
     except Exception as e:
         print(f"❌ Error con '{condition}': {e}")
+        task.fail(e)
+        pacer.failed(e)
+    finally:
+        driver_pool.checkin(driver, failed=task.status == "failed")
 
-    time.sleep(4)
-
-driver.quit()
+driver_pool.close()
 print("\n🏁 Todo listo. Archivos guardados en 'hss_text_pages'.")
@@ -0,0 +1,267 @@
+"""
+Pluggable HTML parser backend for the extractors.
+
+Every extractor used to build its tree with BeautifulSoup's pure-Python
+"html.parser". The backend is now picked once, with the HTML_PARSER
+environment variable (or use_backend()):
+
+    html.parser   the original, standard library only (default)
+    lxml          same BeautifulSoup API on top of the C lxml parser
+    selectolax    lexbor through selectolax for the "find the container, drop
+                  some tags, get the text" extractors (visible_text); anything
+                  that needs the BeautifulSoup API uses lxml (or html.parser)
+
+A backend whose package is not installed falls back to html.parser with a
+warning, so a plain environment behaves exactly as before.
+
+    soup = make_soup(html)
+    text = visible_text(html, ["script", "style", "nav"], root=("main",))
+
+Extractors that only read one container pass the site's "content_root"
+(sites.py) to make_soup: a SoupStrainer keeps the tree builder from creating
+anything outside that subtree, so a page costs a fraction of the objects and
+time of a full tree. The whole page is parsed when the root is not there.
+
+    soup = make_soup(html, root="article#main-content")
+
+The benchmark times each backend over saved pages and checks that the text
+they extract is the same as html.parser's. Measure before switching: on
+mnt_txt_debug.zip (553 extracted .txt pages, 7.2 MB, little markup) lxml was
+slower than html.parser, and only selectolax was faster.
+
+    python html_parsing.py mnt_txt_debug.zip hss_html_pages nhs_html_pages
+    python html_parsing.py --root "article#main-content" mayo_clean_pages
+"""
+import functools
+import importlib.util
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from stage_timing import timed
+
+PARSER_ENV = "HTML_PARSER"
+BACKENDS = ("html.parser", "lxml", "selectolax")
+DEFAULT_BACKEND = "html.parser"
+
+# Tags dropped by the text benchmark, the usual set of the extractors
+BENCH_REMOVE = ["script", "style", "img", "svg", "iframe", "noscript", "header", "footer", "nav", "aside"]
+BENCH_EXTENSIONS = (".html", ".htm", ".txt")
+
+# "tag", "tag#id", "tag.class" or "tag[attr='value']": what a SoupStrainer can express
+_ROOT_SELECTOR = re.compile(
+    r"^(?P<tag>[\w-]+)?(?:#(?P<id>[\w-]+)|\.(?P<cls>[\w-]+)|\[(?P<attr>[\w-]+)=['\"]?(?P<value>[^'\"\]]*)['\"]?\])?$"
+)
+
+_backend = None
+
+
+def installed(backend: str) -> bool:
+    if backend == "html.parser":
+        return True
+    return importlib.util.find_spec(backend) is not None
+
+
+def use_backend(backend: str = None) -> str:
+    """Selects the backend (HTML_PARSER when None); returns the one actually in use."""
+    global _backend
+    backend = (backend or os.environ.get(PARSER_ENV) or DEFAULT_BACKEND).strip().lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown {PARSER_ENV} {backend!r}: use {', '.join(BACKENDS)}")
+    if not installed(backend):
+        print(f"[WARN] {backend} is not installed, parsing with {DEFAULT_BACKEND}")
+        backend = DEFAULT_BACKEND
+    _backend = backend
+    return backend
+
+
+def backend() -> str:
+    return _backend or use_backend()
+
+
+def tree_builder() -> str:
+    """BeautifulSoup features string for the current backend."""
+    if backend() == "html.parser":
+        return "html.parser"
+    return "lxml" if installed("lxml") else "html.parser"
+
+
+@functools.lru_cache(maxsize=None)
+def root_strainer(selector: str) -> SoupStrainer:
+    """SoupStrainer matching a content_root selector."""
+    match = _ROOT_SELECTOR.match(selector.strip())
+    if not match or not any(match.groupdict().values()):
+        raise ValueError(f"Unsupported content_root {selector!r}: use tag, tag#id, tag.class or tag[attr='value']")
+    attrs = {}
+    if match["id"]:
+        attrs["id"] = match["id"]
+    if match["cls"]:
+        # At parse time the class attribute is still the raw "a b c" string
+        attrs["class"] = re.compile(rf"(?:^|\s){re.escape(match['cls'])}(?:\s|$)")
+    if match["attr"]:
+        attrs[match["attr"]] = match["value"]
+    return SoupStrainer(match["tag"], attrs)
+
+
+@timed("parse")
+def make_soup(html: str, root: str = None) -> BeautifulSoup:
+    """Tree of the page, or only of the `root` subtree(s) when the page has one."""
+    if root:
+        soup = BeautifulSoup(html, tree_builder(), parse_only=root_strainer(root))
+        if soup.find(True) is not None:
+            return soup
+    return BeautifulSoup(html, tree_builder())
+
+
+def _soup_text(html: str, remove: list, root) -> str:
+    soup = make_soup(html)
+    for tag in soup(remove):
+        tag.decompose()
+    main = None
+    for name in root:
+        main = main or soup.find(name)
+    main = main or soup.body or soup
+    return main.get_text(separator="\n", strip=True)
+
+
+@timed("parse")
+def _lexbor_text(html: str, remove: list, root) -> str:
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(remove)
+    main = None
+    for name in root:
+        main = main or tree.css_first(name)
+    main = main or tree.body or tree.root
+    if main is None:
+        return ""
+    # Same output as get_text(separator="\n", strip=True): stripped, non-empty strings
+    return "\n".join(s for s in (t.strip() for t in main.text(deep=True, separator="\0").split("\0")) if s)
+
+
+def visible_text(html: str, remove: list, root=("main",)) -> str:
+    """Text of the first `root` tag (or <body>) after dropping the `remove` tags."""
+    if backend() == "selectolax":
+        return _lexbor_text(html, remove, root)
+    return _soup_text(html, remove, root)
+
+
+# --------------------------------------------------------------- benchmark
+
+def load_documents(paths: list) -> list:
+    """[(name, text)] of the pages in the given folders and .zip archives."""
+    from extract_runner import list_pages, read_page
+
+    documents = []
+    for path in paths:
+        for source, member, stem in list_pages(path, BENCH_EXTENSIONS):
+            documents.append((f"{os.path.basename(path)}/{stem}", read_page(source, member)))
+    return documents
+
+
+def benchmark(documents: list, backends=BACKENDS) -> list:
+    """
+    [(backend, parse seconds, text seconds, mismatched documents)]. The text of
+    each backend must have the same words, in the same order, as html.parser's.
+    """
+    results = []
+    reference = None
+    for name in backends:
+        if not installed(name):
+            print(f"[BENCH] {name}: not installed, skipped")
+            continue
+        use_backend(name)
+        if name == "selectolax":
+            from selectolax.lexbor import LexborHTMLParser as parse
+        else:
+            parse = make_soup
+        started = time.perf_counter()
+        for _, html in documents:
+            parse(html)
+        parse_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        texts = [visible_text(html, BENCH_REMOVE) for _, html in documents]
+        text_seconds = time.perf_counter() - started
+
+        mismatched = []
+        if reference is None:
+            reference = texts
+        else:
+            mismatched = [documents[i][0] for i, (a, b) in enumerate(zip(reference, texts)) if a.split() != b.split()]
+        results.append((name, parse_seconds, text_seconds, mismatched))
+    use_backend()
+    return results
+
+
+def print_benchmark(documents: list, results: list) -> None:
+    size_mb = sum(len(html) for _, html in documents) / 1e6
+    print(f"\n{len(documents)} documents, {size_mb:.1f} MB")
+    print(f"{'backend':<12} {'parse s':>9} {'docs/s':>9} {'text s':>9} {'docs/s':>9} {'MB/s':>7}  text vs html.parser")
+    for name, parse_seconds, text_seconds, mismatched in results:
+        n = len(documents)
+        verdict = "same" if not mismatched else f"{len(mismatched)} differ (e.g. {mismatched[0]})"
+        print(f"{name:<12} {parse_seconds:>9.2f} {n / parse_seconds:>9.1f} {text_seconds:>9.2f} "
+              f"{n / text_seconds:>9.1f} {size_mb / text_seconds:>7.1f}  {verdict}")
+
+
+def _peak_bytes(parse, html: str) -> int:
+    tracemalloc.start()
+    try:
+        parse(html)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark_root(documents: list, root: str, backends=("html.parser", "lxml")) -> list:
+    """[(backend, full parse seconds, root parse seconds, full peak MB, root peak MB)]; peaks are the mean per page."""
+    results = []
+    for name in backends:
+        if not installed(name):
+            continue
+        use_backend(name)
+        timings = []
+        for parse in (make_soup, lambda html: make_soup(html, root)):
+            started = time.perf_counter()
+            for _, html in documents:
+                parse(html)
+            timings.append(time.perf_counter() - started)
+        peaks = [sum(_peak_bytes(parse, html) for _, html in documents) / len(documents) / 1e6
+                 for parse in (make_soup, lambda html: make_soup(html, root))]
+        results.append((name, *timings, *peaks))
+    use_backend()
+    return results
+
+
+def print_benchmark_root(documents: list, root: str, results: list) -> None:
+    print(f"\n{len(documents)} documents, content root {root!r}")
+    print(f"{'backend':<12} {'full s':>8} {'root s':>8} {'speedup':>8} {'full MB':>8} {'root MB':>8}  (mean peak per page)")
+    for name, full_seconds, root_seconds, full_peak, root_peak in results:
+        print(f"{name:<12} {full_seconds:>8.2f} {root_seconds:>8.2f} {full_seconds / root_seconds:>7.1f}x "
+              f"{full_peak:>8.1f} {root_peak:>8.1f}")
+
+
+if __name__ == "__main__":
+    from sites import SITES
+
+    args = sys.argv[1:]
+    root = None
+    if "--root" in args:
+        i = args.index("--root")
+        root = args[i + 1] if i + 1 < len(args) else sys.exit("--root needs a selector")
+        del args[i:i + 2]
+    paths = args or [p for p in ["mnt_txt_debug.zip"] + [s["output_dir"] for s in SITES.values()]
+                             if os.path.exists(p)]
+    if not paths:
+        sys.exit("usage: python html_parsing.py [--root SELECTOR] [folder or .zip ...]")
+    documents = load_documents(paths)
+    if root:
+        print_benchmark_root(documents, root, benchmark_root(documents, root))
+    else:
+        print_benchmark(documents, benchmark(documents))
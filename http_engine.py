@@ -0,0 +1,209 @@
+"""
+Browser-free fetch engine for sites that render their content server-side.
+
+One aiohttp session (connection pooling + keep-alive) fetches the search page
+and the chosen article for every condition, and hands the HTML to the same
+extractors the scrapers use. A condition is "escalated" when its content is
+not in the server HTML (client-side rendering, no results, HTTP errors...);
+crawl_orchestrator.py then runs the site's browser scraper for those only.
+
+If none of the first PROBE_SIZE conditions of a site work over HTTP, the whole
+site is escalated without trying the rest. Fetched pages go to page_cache.py
+like the browser scrapers' do.
+
+    python http_engine.py nhs pmc pubmed
+"""
+import asyncio
+import os
+import sys
+from urllib.parse import quote_plus, urljoin
+
+import aiohttp
+
+import crawl_metrics
+from condition_catalog import load_conditions
+from crawl_manifest import Manifest
+from extractors import best_pmc_link, extract, output_path
+from html_parsing import make_soup
+from page_cache import PageCache
+from pacing import pacer_for
+from search_cache import SearchCache
+from url_index import UrlIndex
+from sites import SITES, get_site
+from stage_timing import stage
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/113.0.0.0 Safari/537.36"
+)
+REQUEST_TIMEOUT = 20
+MAX_CONNECTIONS = 32
+CONNECTIONS_PER_HOST = 4
+PROBE_SIZE = 5
+# Responses that mean "slow down" (pacing.py halves the site's rate)
+THROTTLE_STATUSES = (429, 503)
+
+# Sites that do not simply take the first search result
+PICKERS = {
+    "pmc": best_pmc_link,
+}
+
+
+def http_sites() -> list:
+    return [name for name, site in SITES.items() if site.get("http")]
+
+
+def _links(html: str, base_url: str, selector: str) -> list:
+    soup = make_soup(html)
+    return [
+        (a.get_text(strip=True), urljoin(base_url, a["href"]))
+        for a in soup.select(selector)
+        if a.get("href")
+    ]
+
+
+def _has_content(html: str, selector: str) -> bool:
+    return make_soup(html).select_one(selector) is not None
+
+
+async def fetch(session, url: str):
+    async with session.get(url) as resp:
+        html = await resp.text(errors="replace")
+        crawl_metrics.count("bytes_fetched", resp.content_length or len(html.encode("utf-8")))
+        return resp.status, str(resp.url), html
+
+
+async def scrape_condition(session, site_name: str, condition: str, task=None, cache=None, searches=None, urls=None):
+    """Returns (True, article_url) when saved, or (False, reason) when it needs a browser."""
+    site = get_site(site_name)
+    http = site["http"]
+    template = http.get("search_url") or site["search_url"]
+    pacer = pacer_for(site_name)
+
+    with stage("search_submit"):
+        status, page_url, html = await fetch(session, template.format(query=quote_plus(condition)))
+    if status in THROTTLE_STATUSES:
+        pacer.throttled(f"HTTP {status}")
+    if status != 200:
+        return False, f"HTTP {status} on search page"
+    if cache:
+        await asyncio.to_thread(cache.put, condition, "results", page_url, html)
+
+    candidates = await asyncio.to_thread(_links, html, page_url, http["results"])
+    if searches:
+        await asyncio.to_thread(searches.put, condition, [{"text": t, "href": h} for t, h in candidates])
+    if candidates:
+        pick = PICKERS.get(site_name)
+        href = pick(candidates, condition) if pick else candidates[0][1]
+        if urls and task and await asyncio.to_thread(urls.reuse, task, href):
+            return True, href
+        with stage("article_load"):
+            status, page_url, html = await fetch(session, href)
+        if status in THROTTLE_STATUSES:
+            pacer.throttled(f"HTTP {status}")
+        if status != 200:
+            return False, f"HTTP {status} on article page"
+    elif not await asyncio.to_thread(_has_content, html, http["content"]):
+        # Some searches land directly on the article; anything else has no usable results
+        return False, "no results in server HTML"
+
+    if http.get("follow"):
+        follow = await asyncio.to_thread(_links, html, page_url, http["follow"])
+        if follow:
+            with stage("article_load"):
+                status, follow_url, follow_html = await fetch(session, follow[0][1])
+            if status == 200:
+                page_url, html = follow_url, follow_html
+
+    if not await asyncio.to_thread(_has_content, html, http["content"]):
+        return False, "content not in server HTML"
+    if cache:
+        await asyncio.to_thread(cache.put, condition, "article", page_url, html)
+        if cache.fetch_only(task, page_url):
+            return True, page_url
+
+    output = await asyncio.to_thread(extract, site_name, html, condition)
+    if not output:
+        return False, "extractor found nothing"
+
+    file_path = output_path(site_name, condition)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with stage("write"), open(file_path, "w", encoding="utf-8") as f:
+        f.write(output)
+    if task:
+        task.done(file_path, output, url=page_url)
+    if urls:
+        await asyncio.to_thread(urls.record, condition, href if candidates else None, page_url, file_path)
+    pacer.success()
+    return True, page_url
+
+
+async def _try(session, slots, manifest, cache, searches, urls, condition: str):
+    site_name = manifest.site
+    # Started only once it has a connection slot and its turn, so that the
+    # manifest's "running" rows and durations leave out the time spent queued
+    async with slots:
+        await pacer_for(site_name).wait_async()
+        task = manifest.start(condition)
+        try:
+            ok, detail = await scrape_condition(session, site_name, condition, task, cache, searches, urls)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            pacer_for(site_name).failed(e)
+            ok, detail = False, f"{type(e).__name__}: {e}"
+        except Exception as e:
+            # Extractor, disk or cache errors: only this condition goes to a browser
+            ok, detail = False, f"{type(e).__name__}: {e}"
+        if ok:
+            print(f"[HTTP ✅] {site_name}: {condition} -> {detail}")
+        else:
+            print(f"[HTTP ↪] {site_name}: {condition} needs a browser ({detail})")
+            task.escalate(detail)
+    return condition, ok
+
+
+async def crawl_site(session, site_name: str, conditions: list) -> list:
+    """Scrapes a site over HTTP and returns the conditions that must go to a browser."""
+    manifest = Manifest(site_name)
+    conditions = manifest.select(conditions)
+    cache = PageCache(site_name)
+    searches = SearchCache(site_name)
+    urls = UrlIndex(site_name)
+    slots = asyncio.Semaphore(CONNECTIONS_PER_HOST)
+    probe, rest = conditions[:PROBE_SIZE], conditions[PROBE_SIZE:]
+    probed = await asyncio.gather(*(_try(session, slots, manifest, cache, searches, urls, c) for c in probe))
+    if probe and not any(ok for _, ok in probed):
+        print(f"[HTTP] {site_name}: content not served over plain HTTP, escalating the whole site.")
+        return list(conditions)
+
+    results = probed + await asyncio.gather(*(_try(session, slots, manifest, cache, searches, urls, c) for c in rest))
+    escalated = [c for c, ok in results if not ok]
+    print(f"[HTTP] {site_name}: {len(results) - len(escalated)} saved, {len(escalated)} escalated.")
+    return escalated
+
+
+async def crawl_async(site_names: list, conditions: list) -> dict:
+    crawl_metrics.set_engine("http")
+    connector = aiohttp.TCPConnector(
+        limit=MAX_CONNECTIONS,
+        limit_per_host=CONNECTIONS_PER_HOST,
+        keepalive_timeout=30,
+    )
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    async with aiohttp.ClientSession(
+        connector=connector, timeout=timeout, headers={"User-Agent": USER_AGENT}
+    ) as session:
+        escalated = await asyncio.gather(*(crawl_site(session, name, conditions) for name in site_names))
+    return dict(zip(site_names, escalated))
+
+
+def crawl(site_names: list, conditions: list = None) -> dict:
+    """Runs the HTTP engine; returns {site: [conditions that need a browser]}."""
+    if conditions is None:
+        conditions = load_conditions()
+    return asyncio.run(crawl_async(site_names, conditions))
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or http_sites()
+    for name, pending in crawl(names).items():
+        print(f"{name:<12} escalated: {len(pending)}")
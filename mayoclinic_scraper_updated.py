@@ -1,49 +1,51 @@
-import re
 import os
-import time
-import pandas as pd
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
-
-def clean_condition_name(name: str) -> str:
-    return re.sub(r'[\\/*?:"<>|]', '_', name)
-
-# Palabras clave relevantes (ejercicio, tratamiento, rehabilitación, etc.)
-keywords = [
-    "exercise", "exercises", "routine", "routines", "warm up", "stretch", "stretches",
-    "rehabilitation", "recovery", "treatment", "treatments", "therapy", "physical therapy",
-    "management", "mobility", "relief", "improve", "motion", "strengthen", "strength", "home care"
-]
+from condition_catalog import load_conditions
+from crawl_manifest import Manifest
+from sites import search_url
+from resource_blocking import block_resources, enable_request_log, report_blocked
+from readiness import wait_ready
+from extractors import extract_mayoclinic, output_path
+from page_cache import PageCache, replay_if_requested
+from search_cache import SearchCache
+from url_index import UrlIndex
+from dom_batch import collect_links
+from ranking import rank
+from driver_pool import DriverPool, launch_chrome
+from stage_timing import stage
 
 # Leer CSV
-df = pd.read_csv("exercises.csv", encoding="utf-8")  
-all_conditions = []
-for row in df["Related Conditions"].dropna():
-    splitted = re.split(r"[/\n]+", row)
-    splitted = [c.strip() for c in splitted if c.strip()]
-    all_conditions.extend(splitted)
-all_conditions = list(set(all_conditions))
+all_conditions = load_conditions()
+# Sin navegador: re-extraer desde page_cache con CRAWL_REPLAY=1
+replay_if_requested("mayoclinic", all_conditions)
+# Saltar lo que ya terminaron ejecuciones anteriores (CRAWL_MODE, ver crawl_manifest.py)
+manifest = Manifest("mayoclinic")
+all_conditions = manifest.select(all_conditions)
+cache = PageCache("mayoclinic")
+searches = SearchCache("mayoclinic")
+urls = UrlIndex("mayoclinic")
 
 # Configuración de Selenium
-options = Options()
-options.add_argument("--disable-gpu")
-options.add_argument("--no-sandbox")
-options.add_argument("--disable-software-rasterizer")
-options.add_argument("--disable-accelerated-2d-canvas")
-options.add_argument("--disable-dev-shm-usage")
-options.add_argument("--headless=new")  # Comentarlo para ver el navegador
-
-driver = webdriver.Chrome(
-    service=Service(ChromeDriverManager().install()),
-    options=options
-)
-wait = WebDriverWait(driver, 6)
+def launch_browser():
+    options = Options()
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-software-rasterizer")
+    options.add_argument("--disable-accelerated-2d-canvas")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--headless=new")  # Comentarlo para ver el navegador
+
+    enable_request_log(options)
+    driver = launch_chrome(options)
+    block_resources(driver, "mayoclinic")
+    return driver
+
+# Se recicla si crece su memoria o su tasa de errores (driver_pool.py)
+driver_pool = DriverPool(launch_browser)
+driver_pool.fill()
 
 base_url = "https://www.mayoclinic.org"
 os.makedirs("mayo_clean_pages", exist_ok=True)
@@ -51,57 +53,79 @@ os.makedirs("mayo_clean_pages", exist_ok=True)
 # Loop principal
 for condition in all_conditions:
     print(f"\n🔍 Searching for: '{condition}'")
+    task = manifest.start(condition)
+    driver = driver_pool.checkout()
+    wait = WebDriverWait(driver, 6)
 
     try:
-        driver.get(base_url)
-        wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "div.cmp-search-button button"))).click()
-
-        search_box = wait.until(EC.presence_of_element_located((By.ID, "search-input-globalsearch-773693aac3")))
-        search_box.clear()
-        search_box.send_keys(condition)
-        wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button.search-button.sc-mc-search[type='submit']"))).click()
+        results_url = search_url("mayoclinic", condition)
+        if results_url:
+            # Ir directo a la página de resultados
+            with stage("search_submit"):
+                driver.get(results_url)
+        else:
+            with stage("home_load"):
+                driver.get(base_url)
+            with stage("search_submit"):
+                wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "div.cmp-search-button button"))).click()
+
+                search_box = wait.until(EC.presence_of_element_located((By.ID, "search-input-globalsearch-773693aac3")))
+                search_box.clear()
+                search_box.send_keys(condition)
+                wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button.search-button.sc-mc-search[type='submit']"))).click()
 
         # Esperar a que carguen resultados
-        results = wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "a.azsearchlink")))
+        wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "a.azsearchlink")))
+        results = collect_links(driver, "a.azsearchlink")
+        cache.put(condition, "results", driver.current_url, driver.page_source)
+        searches.put(condition, results)
 
-        selected_result = None
-        for result in results:
-            title = result.text.lower()
-            if any(keyword in title for keyword in keywords):
-                selected_result = result
-                break
+        # Mejor resultado por BM25 (condición + palabras clave de rehabilitación); nada si ninguno puntúa
+        ranking = rank(condition, [result["text"] for result in results])
+        selected_result = results[ranking[0][0]] if ranking and ranking[0][1] > 0 else None
 
         if not selected_result:
-            print("⚠️ No se encontró ningún resultado con palabras clave relevantes.")
+            print("⚠️ No se encontró ningún resultado relevante.")
+            task.skip("no relevant result")
             continue
 
-        result_url = selected_result.get_attribute("href")
+        result_url = selected_result["href"]
+        # Misma página ya guardada para otra condición: se enlaza sin volver a descargarla
+        if urls.reuse(task, result_url):
+            continue
         print(f"➡️ Abriendo: {result_url}")
-        driver.get(result_url)
+        with stage("article_load"):
+            driver.get(result_url)
 
         # Esperar contenido del artículo
         wait.until(EC.presence_of_element_located((By.TAG_NAME, "article")))
-        time.sleep(2)
-
-        soup = BeautifulSoup(driver.page_source, "html.parser")
+        wait_ready(driver, "mayoclinic", "article", replaces=2)
 
-        for tag in soup(["script", "style", "img", "iframe", "video", "noscript", "svg"]):
-            tag.decompose()
+        report_blocked(driver, condition)
+        html = driver.page_source
+        cache.put(condition, "article", driver.current_url, html)
+        if cache.fetch_only(task, driver.current_url):
+            continue
 
-        main_content = soup.find("article", id="main-content")
-        if not main_content:
+        # Solo <article id="main-content">, sin scripts, imágenes ni vídeos
+        clean_html = extract_mayoclinic(html, condition)
+        if not clean_html:
             print(f"[WARN] No se encontró <article id='main-content'> para '{condition}'")
+            task.skip("no main-content article")
             continue
 
-        clean_html = main_content.prettify()
-        safe_name = clean_condition_name(condition)
-        file_path = os.path.join("mayo_clean_pages", f"{safe_name}.html")
-        with open(file_path, "w", encoding="utf-8") as f:
+        file_path = output_path("mayoclinic", condition)
+        with stage("write"), open(file_path, "w", encoding="utf-8") as f:
             f.write(clean_html)
+        task.done(file_path, clean_html, url=driver.current_url)
+        urls.record(condition, result_url, driver.current_url, file_path)
         print(f"✅ Guardado limpio: '{file_path}'")
 
     except Exception as e:
         print(f"❌ Error en '{condition}': {e}")
+        task.fail(e)
+    finally:
+        driver_pool.checkin(driver, failed=task.status == "failed")
 
-driver.quit()
+driver_pool.close()
 print("\n🚀 ¡Listo! Archivos en la carpeta 'mayo_clean_pages'")
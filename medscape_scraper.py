@@ -1,7 +1,6 @@
 import os
 import re
 import time
-import pandas as pd
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
@@ -11,6 +10,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 from credentials import MEDSCAPE_EMAIL, MEDSCAPE_PASSWORD
+from condition_catalog import load_conditions
 
 
 def clean_condition_name(name: str) -> str:
@@ -65,13 +65,7 @@ def handle_login_popup(driver, wait):
 
 
 # Load CSV
-df = pd.read_csv("exercises.csv", encoding="utf-8")
-all_conditions = []
-for row in df["Related Conditions"].dropna():
-    splitted = re.split(r"[/\n]+", row)
-    splitted = [c.strip() for c in splitted if c.strip()]
-    all_conditions.extend(splitted)
-all_conditions = list(set(all_conditions))
+all_conditions = load_conditions()
 
 # Run browser
 driver, wait = init_driver()
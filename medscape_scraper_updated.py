@@ -1,27 +1,30 @@
 import os
-import re
 import time
 import winsound
-import pandas as pd
-from bs4 import BeautifulSoup
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-
-def clean_condition_name(name: str) -> str:
-    return re.sub(r'[\\/*?:"<>|]', '_', name.strip())
+from condition_catalog import load_conditions
+from crawl_manifest import Manifest
+from resource_blocking import block_resources, enable_request_log, report_blocked
+from readiness import wait_ready
+from pacing import Pacer
+from extractors import extract_medscape, output_path
+from page_cache import PageCache, replay_if_requested
+from driver_pool import DriverPool, launch_chrome
+from stage_timing import stage
 
 def init_driver():
     chrome_options = Options()
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--start-maximized")
-    return webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+    enable_request_log(chrome_options)
+    driver = launch_chrome(chrome_options)
+    block_resources(driver, "medscape")
+    return driver
 
 def alert_user_to_login():
     print("\n🔐 Inicia sesión manualmente en Medscape.")
@@ -31,63 +34,73 @@ def alert_user_to_login():
     input("⏳ Pulsa Enter cuando hayas terminado de iniciar sesión...")
 
 # Leer condiciones desde CSV
-df = pd.read_csv("exercises.csv", encoding="utf-8")
-all_conditions = []
-for row in df["Related Conditions"].dropna():
-    for cond in re.split(r"[/\n]+", row):
-        if cond.strip():
-            all_conditions.append(cond.strip())
-
-all_conditions = list(set(all_conditions))
-
-# Inicializar navegador
-driver = init_driver()
-wait = WebDriverWait(driver, 10)
-
-# --- Login manual al principio ---
-driver.get("https://www.medscape.com/")
-time.sleep(2)
-try:
-    cookie_btn = WebDriverWait(driver, 5).until(
-        EC.element_to_be_clickable((By.XPATH, "//button[contains(text(),'I Accept')]"))
-    )
-    cookie_btn.click()
-except:
-    pass
-
-# Click en botón "Log In"
-try:
-    login_button = wait.until(EC.element_to_be_clickable((
-        By.XPATH, "//a[contains(text(), 'Log In')]"
-    )))
-    login_button.click()
-except:
-    print("[⚠️] No se encontró botón de login.")
-
-# Avisar para login manual
-alert_user_to_login()
+all_conditions = load_conditions()
+# Sin navegador: re-extraer desde page_cache con CRAWL_REPLAY=1
+replay_if_requested("medscape", all_conditions)
+# Saltar lo que ya terminaron ejecuciones anteriores (CRAWL_MODE, ver crawl_manifest.py)
+manifest = Manifest("medscape")
+all_conditions = manifest.select(all_conditions)
+cache = PageCache("medscape")
+
+# --- Login manual en cada sesión nueva ---
+def log_in(driver):
+    driver.get("https://www.medscape.com/")
+    wait_ready(driver, "medscape", "home", replaces=2)
+    try:
+        cookie_btn = WebDriverWait(driver, 5).until(
+            EC.element_to_be_clickable((By.XPATH, "//button[contains(text(),'I Accept')]"))
+        )
+        cookie_btn.click()
+    except:
+        pass
+
+    # Click en botón "Log In"
+    try:
+        login_button = WebDriverWait(driver, 10).until(EC.element_to_be_clickable((
+            By.XPATH, "//a[contains(text(), 'Log In')]"
+        )))
+        login_button.click()
+    except:
+        print("[⚠️] No se encontró botón de login.")
+
+    # Avisar para login manual
+    alert_user_to_login()
+
+# Inicializar navegador. Cada sesión nueva pide volver a iniciar sesión, así que solo se
+# recicla si crece su memoria o su tasa de errores, nunca por número de condiciones (driver_pool.py)
+driver_pool = DriverPool(init_driver, warmup=log_in, max_uses=None)
+driver_pool.fill()
 
 # Crear carpeta para guardar .txt
 os.makedirs("medscape_text_pages", exist_ok=True)
 
-# Bucle principal
+# Bucle principal (con pausa mínima entre condiciones, min_interval en sites.py)
+pacer = Pacer("medscape")
 for i, condition in enumerate(all_conditions):
+    pacer.wait()
     print(f"\n🔍 Buscando: '{condition}'")
+    task = manifest.start(condition)
+    driver = driver_pool.checkout()
+    wait = WebDriverWait(driver, 10)
     try:
-        driver.get("https://www.medscape.com/")
-        time.sleep(1.5)
+        with stage("home_load"):
+            driver.get("https://www.medscape.com/")
+        wait_ready(driver, "medscape", "home", replaces=1.5)
 
-        search_box = wait.until(EC.presence_of_element_located((By.ID, "search-input")))
-        search_box.clear()
-        search_box.send_keys(condition)
-        search_box.send_keys(Keys.ENTER)
+        with stage("search_submit"):
+            search_box = wait.until(EC.presence_of_element_located((By.ID, "search-input")))
+            search_box.clear()
+            search_box.send_keys(condition)
+            search_box.send_keys(Keys.ENTER)
 
         # Clic en primer resultado
         result_link = WebDriverWait(driver, 10).until(
             EC.presence_of_element_located((By.CSS_SELECTOR, "p.searchResultTitle a"))
         )
-        result_link.click()
-        time.sleep(3)
+        cache.put(condition, "results", driver.current_url, driver.page_source)
+        with stage("article_load"):
+            result_link.click()
+        wait_ready(driver, "medscape", "article", replaces=3)
 
         # Detectar si nos sacó de la sesión (formulario de login)
         try:
@@ -98,43 +111,54 @@ for i, condition in enumerate(all_conditions):
             alert_user_to_login()
 
             # Volver a buscar la condición después del login
-            driver.get("https://www.medscape.com/")
-            time.sleep(1.5)
-            search_box = wait.until(EC.presence_of_element_located((By.ID, "search-input")))
-            search_box.clear()
-            search_box.send_keys(condition)
-            search_box.send_keys(Keys.ENTER)
+            with stage("home_load"):
+                driver.get("https://www.medscape.com/")
+            wait_ready(driver, "medscape", "home", replaces=1.5)
+            with stage("search_submit"):
+                search_box = wait.until(EC.presence_of_element_located((By.ID, "search-input")))
+                search_box.clear()
+                search_box.send_keys(condition)
+                search_box.send_keys(Keys.ENTER)
 
             result_link = WebDriverWait(driver, 10).until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, "p.searchResultTitle a"))
             )
-            result_link.click()
-            time.sleep(3)
+            with stage("article_load"):
+                result_link.click()
+            wait_ready(driver, "medscape", "article", replaces=3)
 
         except:
             pass
 
         # Extraer texto visible
         WebDriverWait(driver, 6).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+        report_blocked(driver, condition)
         html_content = driver.page_source
+        if pacer.check(html_content):
+            # CAPTCHA o página de bloqueo en vez del artículo: queda para otra ejecución
+            task.fail("blocked page", url=driver.current_url, error_class="Blocked")
+            continue
 
-        soup = BeautifulSoup(html_content, "html.parser")
-        for tag in soup(["script", "style", "img", "svg", "iframe", "noscript", "header", "footer", "nav", "aside"]):
-            tag.decompose()
-
-        main = soup.find("main") or soup.body
-        text = main.get_text(separator="\n", strip=True)
+        cache.put(condition, "article", driver.current_url, html_content)
+        if cache.fetch_only(task, driver.current_url):
+            continue
+        text = extract_medscape(html_content, condition)
 
         # Guardar como .txt
-        file_name = clean_condition_name(condition) + ".txt"
-        with open(os.path.join("medscape_text_pages", file_name), "w", encoding="utf-8") as f:
+        file_path = output_path("medscape", condition)
+        with stage("write"), open(file_path, "w", encoding="utf-8") as f:
             f.write(text)
 
-        print(f"✅ Guardado: '{file_name}'")
-        time.sleep(1)
+        task.done(file_path, text, url=driver.current_url)
+        pacer.success()
+        print(f"✅ Guardado: '{os.path.basename(file_path)}'")
 
     except Exception as e:
         print(f"[ERROR] Falló para '{condition}': {e}")
+        task.fail(e)
+        pacer.failed(e)
+    finally:
+        driver_pool.checkin(driver, failed=task.status == "failed")
 
-driver.quit()
+driver_pool.close()
 print("\n✅ ¡Listo! Archivos guardados en 'medscape_text_pages'.")
@@ -1,40 +1,32 @@
-import re
 import time
 import os
 import random
-import threading
-import pandas as pd
-from bs4 import BeautifulSoup
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
 import winsound
+from condition_catalog import load_conditions
+from crawl_manifest import Manifest
+from driver_pool import DriverPool, launch_chrome
+from sites import search_url
+from resource_blocking import block_resources, enable_request_log, report_blocked
+from readiness import wait_ready
+from extractors import extract_mnt, output_path
+from page_cache import PageCache, replay_if_requested
+from search_cache import SearchCache
+from url_index import UrlIndex
+from pacing import Pacer
+from supervisor import JobTimeout, Supervisor, WorkerError, extend_deadline
+from dom_batch import collect_links
+from ranking import rank
+from stage_timing import stage
 
-RESTART_BROWSER_EVERY = 15
 TIMEOUT_SECONDS = 15
-
-def clean_condition_name(name: str) -> str:
-    return re.sub(r'[\\/*?:"<>|]', '_', name.strip())
-
-keywords = [
-    "exercise", "exercises", "routine", "routines", "warm up", "stretch", "stretches",
-    "rehabilitation", "recovery", "treatment", "treatments", "therapy", "physical therapy",
-    "management", "mobility", "relief", "improve", "motion", "strengthen", "strength", "home care"
-]
-
-df = pd.read_csv("exercises.csv", encoding="utf-8")
-all_conditions = list(set(
-    c.strip() for row in df["Related Conditions"].dropna()
-    for c in re.split(r"[/\n]+", row) if c.strip()
-))
+CAPTCHA_GRACE = 30
 
 output_folder = "mnt_txt_debug"
-os.makedirs(output_folder, exist_ok=True)
 
 def launch_browser():
     options = Options()
@@ -42,127 +34,172 @@ def launch_browser():
     options.add_argument("--no-sandbox")
     options.add_argument("--start-maximized")
     options.add_argument("user-agent=Mozilla/5.0")
-    return webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-
-def safe_restart_browser(timeout=10):
-    result = [None]
-    def do_restart():
-        try: driver.quit()
-        except: pass
-        result[0] = launch_browser()
-    t = threading.Thread(target=do_restart)
-    t.start()
-    t.join(timeout)
-    if t.is_alive():
-        print("❌ Reinicio colgado. Saltando condición.")
-        return None
-    print("[🔁] Navegador reiniciado.")
-    return result[0]
-
-def run_with_timeout(func, timeout):
-    result = [None]
-    def wrapper():
-        try: result[0] = func()
-        except Exception as e: result[0] = e
-    t = threading.Thread(target=wrapper)
-    t.start()
-    t.join(timeout)
-    if t.is_alive():
-        return TimeoutError("Timeout alcanzado")
-    return result[0]
-
-driver = launch_browser()
-wait = WebDriverWait(driver, 10)
-
-for i, condition in enumerate(all_conditions):
-    print(f"\n🔍 [INFO] Buscando: '{condition}'")
-
-    if i > 0 and i % RESTART_BROWSER_EVERY == 0:
-        driver = safe_restart_browser()
-        if driver is None: continue
-        wait = WebDriverWait(driver, 10)
-
-    def scrape():
-        driver.get("https://www.medicalnewstoday.com/")
-        time.sleep(0.5)
-
-        try:
-            for b in driver.find_elements(By.TAG_NAME, "button"):
-                if any(t in b.text.lower() for t in ["accept", "continue"]):
-                    b.click()
-                    time.sleep(0.5)
-                    break
-        except: pass
-
-        for btn in driver.find_elements(By.TAG_NAME, "button"):
-            if "search" in (btn.get_attribute("aria-label") or "").lower():
-                driver.execute_script("arguments[0].click();", btn)
-                time.sleep(0.6)
+    enable_request_log(options)
+    driver = launch_chrome(options)
+    block_resources(driver, "mnt")
+    return driver
+
+def accept_consent(driver):
+    driver.get("https://www.medicalnewstoday.com/")
+    wait_ready(driver, "mnt", "home", replaces=0.5)
+    try:
+        for b in driver.find_elements(By.TAG_NAME, "button"):
+            if any(t in b.text.lower() for t in ["accept", "continue"]):
+                b.click()
+                wait_ready(driver, "mnt", "consent", replaces=0.5)
                 break
-
-        try:
-            for b in driver.find_elements(By.CSS_SELECTOR, "button[aria-label='Close']"):
-                if b.is_displayed():
-                    b.click()
-                    time.sleep(0.3)
+    except: pass
+
+def init_worker():
+    # Corre en cada proceso de trabajo: sus propias conexiones y su propio navegador
+    global manifest, cache, searches, urls
+    manifest = Manifest("mnt")
+    cache = PageCache("mnt")
+    searches = SearchCache("mnt")
+    urls = UrlIndex("mnt")
+    # Sesiones ya lanzadas y con cookies aceptadas; se reciclan si crece su memoria
+    # o su tasa de errores (driver_pool.py)
+    driver_pool = DriverPool(launch_browser, size=1, warmup=accept_consent)
+    driver_pool.fill()
+    return driver_pool
+
+def scrape_condition(driver_pool, job):
+    condition, started = job
+    # El proceso principal ya marcó la condición como "running"
+    task = manifest.attach(condition, started)
+    outcome = {"recorded": False, "captcha": False, "saved": False}
+    driver = driver_pool.checkout()
+    try:
+        scrape(driver, condition, task, outcome)
+    except Exception as e:
+        print(f"[❌ ERROR] '{condition}': {e}")
+        task.fail(e)
+    finally:
+        driver_pool.checkin(driver, failed=task.status == "failed")
+    outcome["recorded"] = task.finished
+    return outcome
+
+def scrape(driver, condition, task, outcome):
+    wait = WebDriverWait(driver, 10)
+
+    results_url = search_url("mnt", condition)
+    if results_url:
+        # Página de resultados directa, sin home ni buscador
+        with stage("search_submit"):
+            driver.get(results_url)
+        print("[OK] Búsqueda enviada (URL directa).")
+    else:
+        with stage("home_load"):
+            driver.get("https://www.medicalnewstoday.com/")
+        wait_ready(driver, "mnt", "home", replaces=0.5)
+
+        with stage("search_submit"):
+            for btn in driver.find_elements(By.TAG_NAME, "button"):
+                if "search" in (btn.get_attribute("aria-label") or "").lower():
+                    driver.execute_script("arguments[0].click();", btn)
+                    wait_ready(driver, "mnt", "search-open", replaces=0.6, timeout=3)
                     break
-        except: pass
-
-        search_input = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "input[name='q']")))
-        search_input.clear()
-        search_input.send_keys(condition)
-        driver.execute_script("""
-            arguments[0].dispatchEvent(new Event('input', { bubbles: true }));
-            arguments[0].dispatchEvent(new Event('change', { bubbles: true }));
-        """, search_input)
-        search_input.send_keys(Keys.ENTER)
+
+            try:
+                for b in driver.find_elements(By.CSS_SELECTOR, "button[aria-label='Close']"):
+                    if b.is_displayed():
+                        b.click()
+                        wait_ready(driver, "mnt", "consent", replaces=0.3)
+                        break
+            except: pass
+
+            search_input = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "input[name='q']")))
+            search_input.clear()
+            search_input.send_keys(condition)
+            driver.execute_script("""
+                arguments[0].dispatchEvent(new Event('input', { bubbles: true }));
+                arguments[0].dispatchEvent(new Event('change', { bubbles: true }));
+            """, search_input)
+            search_input.send_keys(Keys.ENTER)
         print("[OK] Búsqueda enviada.")
-        time.sleep(1.5)
-
-        if "verify that you are not a robot" in driver.page_source.lower():
-            print("🔒 [AVISO] reCAPTCHA detectado. Esperando acción...")
-            for _ in range(5): winsound.Beep(1000, 400); time.sleep(0.3)
-            while "i'm not a robot" in driver.page_source.lower():
-                print("[...] Esperando resolución manual...")
-                time.sleep(2)
-            print("✅ reCAPTCHA resuelto.")
-
-        results = driver.find_elements(By.CSS_SELECTOR, "a.gs-title")
-        if not results:
-            print("❌ Sin resultados.")
-            return
-
-        best = None
-        best_score = 0
-        cl = condition.lower()
-        for r in results:
-            t = r.text.strip().lower()
-            score = 3 if cl in t else 0
-            score += sum(1 for k in keywords if k in t)
-            if score > best_score:
-                best_score = score
-                best = r
-
-        target = best if best else results[0]
-        driver.execute_script("arguments[0].click();", target)
-        time.sleep(1.5)
-
-        wait.until(EC.visibility_of_element_located((By.TAG_NAME, "h1")))
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        for tag in soup(["script", "style", "img", "video", "svg", "iframe", "noscript", "header", "footer", "nav", "aside"]):
-            tag.decompose()
-
-        title = soup.find("h1").get_text(strip=True) if soup.find("h1") else condition
-        body = soup.get_text(separator="\n", strip=True)
-        full_text = f"# {title}\n\n{body}"
-        filename = os.path.join(output_folder, f"{clean_condition_name(condition)}.txt")
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(full_text)
-        print(f"[✅] Guardado: {filename}")
-
-    result = run_with_timeout(scrape, TIMEOUT_SECONDS)
-    if isinstance(result, TimeoutError):
-        print(f"[⏱] Timeout en '{condition}', saltando...")
-
-driver.quit()
-print("\n✅ Scraping terminado. Archivos guardados en 'mnt_txt_debug'")
+    wait_ready(driver, "mnt", "results", replaces=1.5, timeout=5)
+
+    if "verify that you are not a robot" in driver.page_source.lower():
+        print("🔒 [AVISO] reCAPTCHA detectado. Esperando acción...")
+        outcome["captcha"] = True
+        extend_deadline(CAPTCHA_GRACE)
+        for _ in range(5): winsound.Beep(1000, 400); time.sleep(0.3)
+        while "i'm not a robot" in driver.page_source.lower():
+            print("[...] Esperando resolución manual...")
+            # Mientras se resuelve a mano, el supervisor no mata el proceso
+            extend_deadline(CAPTCHA_GRACE)
+            time.sleep(2)
+        print("✅ reCAPTCHA resuelto.")
+
+    results = collect_links(driver, "a.gs-title", container="div.gsc-webResult")
+    cache.put(condition, "results", driver.current_url, driver.page_source)
+    searches.put(condition, results)
+    if not results:
+        print("❌ Sin resultados.")
+        task.skip("no results")
+        return
+
+    target = results[rank(condition, [r["text"] for r in results], [r["snippet"] for r in results])[0][0]]
+    # Misma página ya guardada para otra condición: se enlaza sin volver a descargarla
+    if urls.reuse(task, target["href"]):
+        return
+    with stage("article_load"):
+        driver.execute_script("arguments[0].click();", target["element"])
+    wait_ready(driver, "mnt", "article", replaces=1.5, timeout=5)
+
+    wait.until(EC.visibility_of_element_located((By.TAG_NAME, "h1")))
+    report_blocked(driver, condition)
+    html = driver.page_source
+    cache.put(condition, "article", driver.current_url, html)
+    if cache.fetch_only(task, driver.current_url):
+        return
+    full_text = extract_mnt(html, condition)
+    filename = output_path("mnt", condition)
+    with stage("write"), open(filename, "w", encoding="utf-8") as f:
+        f.write(full_text)
+    task.done(filename, full_text, url=driver.current_url)
+    urls.record(condition, target["href"], driver.current_url, filename)
+    outcome["saved"] = True
+    print(f"[✅] Guardado: {filename}")
+
+
+if __name__ == "__main__":
+    all_conditions = load_conditions()
+    # Sin navegador: re-extraer desde page_cache con CRAWL_REPLAY=1
+    replay_if_requested("mnt", all_conditions)
+    # Saltar lo que ya terminaron ejecuciones anteriores (CRAWL_MODE, ver crawl_manifest.py)
+    manifest = Manifest("mnt")
+    all_conditions = manifest.select(all_conditions)
+    os.makedirs(output_folder, exist_ok=True)
+
+    # Sin pausa mientras el sitio no se queje; frena con reCAPTCHA o timeouts (pacing.py)
+    pacer = Pacer("mnt")
+    # Cada condición corre en un proceso con su propio navegador; si se cuelga, se mata el
+    # proceso con todo su Chrome y sigue uno de reserva ya preparado (supervisor.py)
+    supervisor = Supervisor(init_worker, scrape_condition, TIMEOUT_SECONDS, idle=DriverPool.fill)
+
+    try:
+        for i, condition in enumerate(all_conditions):
+            pacer.wait()
+            print(f"\n🔍 [INFO] Buscando: '{condition}'")
+            task = manifest.start(condition)
+            try:
+                outcome = supervisor.run((condition, task.started))
+            except JobTimeout as e:
+                print(f"[⏱] Timeout en '{condition}', saltando...")
+                task.fail(e)
+                pacer.failed(e)
+                continue
+            except WorkerError as e:
+                print(f"[❌ ERROR] '{condition}': {e}")
+                task.fail(e)
+                continue
+            if outcome["recorded"]:
+                task.recorded_elsewhere()
+            if outcome["captcha"]:
+                pacer.throttled("reCAPTCHA")
+            if outcome["saved"]:
+                pacer.success()
+    finally:
+        supervisor.close()
+    print("\n✅ Scraping terminado. Archivos guardados en 'mnt_txt_debug'")
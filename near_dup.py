@@ -0,0 +1,219 @@
+"""
+Near-duplicate detection over the extracted documents, before they are indexed.
+
+The same article is often saved under several condition names ("AC joint
+sprain (late stage recovery)" / "(late stage rehab)"), and sites syndicate
+each other's text. Feeding all of them to the "Vector Store RAG" flow embeds
+and searches the same chunks many times.
+
+Documents are streamed one at a time from folders or .zip archives (as in
+extract_runner.py); only a MinHash signature (NUM_PERM 32-bit values) of each
+document's word shingles is kept in memory. Locality-sensitive hashing over
+bands of the signature proposes candidate pairs, the estimated Jaccard
+similarity confirms them, and union-find groups them into clusters. The
+longest document of each cluster is its representative.
+
+    python near_dup.py mnt_txt_debug.zip hss_html_pages nhs_html_pages
+    python near_dup.py --threshold 0.9 --out deduped
+
+The clusters go to near_duplicates.jsonl (representative, members, similarity,
+site and condition of each). With --out, only the representatives are copied
+to OUT/<site>/, with OUT/provenance.jsonl linking each one to the documents it
+stands for.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+import zlib
+
+import numpy as np
+
+from extract_runner import list_pages, parse_source, read_page
+from extractors import conditions_by_filename
+from html_parsing import visible_text
+from sites import SITES
+
+TEXT_EXTENSIONS = (".txt", ".html", ".htm")
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+BANDS = 32
+DEFAULT_THRESHOLD = 0.8
+REPORT_PATH = "near_duplicates.jsonl"
+
+# Tags that never hold article text, as in the extractors
+REMOVE_TAGS = ["script", "style", "img", "svg", "iframe", "noscript", "header", "footer", "nav", "aside"]
+
+_MERSENNE = (1 << 61) - 1
+_WORD = re.compile(r"\w+")
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = NUM_PERM, shingle_size: int = SHINGLE_SIZE, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, _MERSENNE, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _MERSENNE, num_perm, dtype=np.uint64)
+        self.shingle_size = shingle_size
+
+    def shingles(self, text: str) -> np.ndarray:
+        words = _WORD.findall(text.lower())
+        n = max(len(words) - self.shingle_size + 1, 1)
+        return np.unique(np.fromiter(
+            (zlib.crc32(" ".join(words[i:i + self.shingle_size]).encode("utf-8")) for i in range(n)),
+            dtype=np.uint64, count=n,
+        ))
+
+    def signature(self, text: str) -> np.ndarray:
+        shingles = self.shingles(text)
+        # (a * x + b) mod p; a * x wraps around 2**64, which still permutes well enough for MinHash
+        hashed = (shingles[:, None] * self.a + self.b) % _MERSENNE
+        return hashed.min(axis=0).astype(np.uint32)
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = []
+
+    def add(self) -> int:
+        self.parent.append(len(self.parent))
+        return len(self.parent) - 1
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int) -> None:
+        self.parent[self.find(i)] = self.find(j)
+
+
+def document_text(name: str, raw: str) -> str:
+    if name.lower().endswith((".html", ".htm")) or raw.lstrip()[:1] == "<":
+        return visible_text(raw, REMOVE_TAGS, root=())
+    return raw
+
+
+def iter_documents(sources: list):
+    """Yields (site, source, member, stem, text) for every document, one at a time."""
+    for site_name, path in sources:
+        for source, member, stem in list_pages(path, TEXT_EXTENSIONS):
+            yield site_name, source, member, stem, document_text(member or source, read_page(source, member))
+
+
+def find_clusters(sources: list, threshold: float = DEFAULT_THRESHOLD, num_perm: int = NUM_PERM,
+                  bands: int = BANDS) -> tuple:
+    """
+    Streams the documents and returns (documents, clusters): documents is
+    [(site, source, member, stem, length)], clusters is [[(index, similarity to
+    the representative)]] with the representative first, for clusters of two or more.
+    """
+    rows = num_perm // bands
+    hasher = MinHasher(num_perm)
+    uf = _UnionFind()
+    buckets = {}
+    signatures = []
+    documents = []
+    started = time.perf_counter()
+
+    for site_name, source, member, stem, text in iter_documents(sources):
+        if not text.strip():
+            continue
+        i = uf.add()
+        signature = hasher.signature(text)
+        signatures.append(signature)
+        documents.append((site_name, source, member, stem, len(text)))
+        for band in range(bands):
+            key = (band, signature[band * rows:(band + 1) * rows].tobytes())
+            bucket = buckets.setdefault(key, [])
+            for j in bucket:
+                if uf.find(i) != uf.find(j) and np.mean(signatures[j] == signature) >= threshold:
+                    uf.union(i, j)
+            bucket.append(i)
+        if (i + 1) % 1000 == 0:
+            print(f"[DEDUP] {i + 1} documents, {(i + 1) / (time.perf_counter() - started):.0f} docs/s")
+
+    groups = {}
+    for i in range(len(documents)):
+        groups.setdefault(uf.find(i), []).append(i)
+    clusters = []
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        representative = max(members, key=lambda i: documents[i][4])
+        ordered = [representative] + [i for i in members if i != representative]
+        clusters.append([(i, float(np.mean(signatures[i] == signatures[representative]))) for i in ordered])
+    return documents, clusters
+
+
+def _describe(document, names: dict, similarity: float = None) -> dict:
+    site_name, source, member, stem, _ = document
+    entry = {"site": site_name, "file": member or source, "condition": names.get(stem, stem)}
+    if similarity is not None:
+        entry["similarity"] = round(similarity, 3)
+    return entry
+
+
+def write_report(documents: list, clusters: list, path: str = REPORT_PATH) -> None:
+    names = conditions_by_filename()
+    with open(path, "w", encoding="utf-8") as f:
+        for cluster in sorted(clusters, key=len, reverse=True):
+            representative = _describe(documents[cluster[0][0]], names)
+            members = [_describe(documents[i], names, similarity) for i, similarity in cluster[1:]]
+            f.write(json.dumps({"representative": representative, "members": members}, ensure_ascii=False) + "\n")
+
+
+def copy_representatives(documents: list, clusters: list, out_dir: str) -> int:
+    """Copies every document except the non-representative cluster members; returns how many."""
+    names = conditions_by_filename()
+    dropped = {i for cluster in clusters for i, _ in cluster[1:]}
+    duplicates = {cluster[0][0]: cluster[1:] for cluster in clusters}
+    copied = 0
+    with open(os.path.join(_makedirs(out_dir), "provenance.jsonl"), "w", encoding="utf-8") as provenance:
+        for i, document in enumerate(documents):
+            if i in dropped:
+                continue
+            site_name, source, member, stem, _ = document
+            target = os.path.join(_makedirs(os.path.join(out_dir, site_name)), os.path.basename(member or source))
+            if member is None:
+                shutil.copyfile(source, target)
+            else:
+                with open(target, "w", encoding="utf-8") as f:
+                    f.write(read_page(source, member))
+            copied += 1
+            provenance.write(json.dumps({
+                "file": os.path.relpath(target, out_dir),
+                **_describe(document, names),
+                "duplicates": [_describe(documents[j], names, similarity) for j, similarity in duplicates.get(i, [])],
+            }, ensure_ascii=False) + "\n")
+    return copied
+
+
+def _makedirs(path: str) -> str:
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cluster near-duplicate extracted documents.")
+    parser.add_argument("sources", nargs="*", help="Folders or .zip archives, optionally as site=path "
+                                                   "(default: every site's output folder)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Estimated Jaccard similarity")
+    parser.add_argument("--out", help="Copy one representative per cluster (and every unique document) here")
+    parser.add_argument("--report", default=REPORT_PATH)
+    args = parser.parse_args()
+
+    specs = args.sources or [site["output_dir"] for site in SITES.values() if os.path.isdir(site["output_dir"])]
+    documents, clusters = find_clusters([parse_source(spec) for spec in specs], args.threshold)
+    write_report(documents, clusters, args.report)
+    removed = sum(len(cluster) - 1 for cluster in clusters)
+    print(f"[DEDUP] {len(documents)} documents, {len(clusters)} clusters of near-duplicates, "
+          f"{removed} redundant ({removed / max(len(documents), 1):.0%}) -> {args.report}")
+    if args.out:
+        print(f"[DEDUP] {copy_representatives(documents, clusters, args.out)} documents copied to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
 import re
 import time
 import os
-import pandas as pd
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
@@ -10,6 +9,8 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
+from condition_catalog import load_conditions
+from page_cache import PageCache
 
 def clean_condition_name(name: str) -> str:
     """
@@ -18,17 +19,7 @@ def clean_condition_name(name: str) -> str:
     return re.sub(r'[\\/*?:"<>|]', '_', name)
 
 # 1) Read CSV data from 'exercises.csv'
-df = pd.read_csv("exercises.csv", encoding="utf-8")  
-
-all_conditions = []
-for row in df["Related Conditions"].dropna():
-    # Split on slashes or newlines
-    splitted = re.split(r"[/\n]+", row)
-    splitted = [c.strip() for c in splitted if c.strip()]
-    all_conditions.extend(splitted)
-
-# Remove duplicates
-all_conditions = list(set(all_conditions))
+all_conditions = load_conditions()
 
 # 2) Setup Selenium
 options = Options()
@@ -46,6 +37,8 @@ base_url = "https://www.nhs.uk"
 
 # Folder to store the final pages 
 os.makedirs("nhs_html_pages", exist_ok=True)
+# Raw pages also go to the page cache, for the extract stage (see page_cache.py)
+cache = PageCache("nhs")
 
 for condition in all_conditions:
     print(f"\n[INFO] Searching for condition: '{condition}'")
@@ -94,6 +87,7 @@ for condition in all_conditions:
         wait.until(EC.visibility_of_element_located((By.TAG_NAME, "h1")))
         time.sleep(2)  
         page_html = driver.page_source
+        cache.put(condition, "article", driver.current_url, page_html)
 
         safe_name = clean_condition_name(condition)
         file_path = os.path.join("nhs_html_pages", f"{safe_name}.html")
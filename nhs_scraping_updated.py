@@ -1,42 +1,43 @@
-import re
-import time
 import os
-import pandas as pd
-from bs4 import BeautifulSoup
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-
-def clean_condition_name(name: str) -> str:
-    return re.sub(r'[\\/*?:"<>|]', '_', name)
+from condition_catalog import load_conditions
+from crawl_manifest import Manifest
+from sites import search_url
+from extractors import extract_nhs, output_path
+from resource_blocking import block_resources, enable_request_log, report_blocked
+from readiness import wait_ready
+from page_cache import PageCache, replay_if_requested
+from driver_pool import DriverPool, launch_chrome
+from stage_timing import stage
 
 # Leer CSV
-df = pd.read_csv("exercises.csv", encoding="utf-8")  
-
-all_conditions = []
-for row in df["Related Conditions"].dropna():
-    splitted = re.split(r"[/\n]+", row)
-    splitted = [c.strip() for c in splitted if c.strip()]
-    all_conditions.extend(splitted)
-
-all_conditions = list(set(all_conditions))
+all_conditions = load_conditions()
+# Sin navegador: re-extraer desde page_cache con CRAWL_REPLAY=1
+replay_if_requested("nhs", all_conditions)
+# Saltar lo que ya terminaron ejecuciones anteriores (CRAWL_MODE, ver crawl_manifest.py)
+manifest = Manifest("nhs")
+all_conditions = manifest.select(all_conditions)
+cache = PageCache("nhs")
 
 # Configurar Selenium
-options = Options()
-# options.add_argument("--headless")  # Activa si no quieres ver el navegador
-options.add_argument("--disable-gpu")
-options.add_argument("--no-sandbox")
+def launch_browser():
+    options = Options()
+    # options.add_argument("--headless")  # Activa si no quieres ver el navegador
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+
+    enable_request_log(options)
+    driver = launch_chrome(options)
+    block_resources(driver, "nhs")
+    return driver
 
-driver = webdriver.Chrome(
-    service=Service(ChromeDriverManager().install()),
-    options=options
-)
-wait = WebDriverWait(driver, 15)
+# Se recicla si crece su memoria o su tasa de errores (driver_pool.py)
+driver_pool = DriverPool(launch_browser)
+driver_pool.fill()
 
 base_url = "https://www.nhs.uk"
 
@@ -46,30 +47,40 @@ os.makedirs(output_folder, exist_ok=True)
 
 for condition in all_conditions:
     print(f"\n[INFO] Searching for condition: '{condition}'")
+    task = manifest.start(condition)
+    driver = driver_pool.checkout()
+    wait = WebDriverWait(driver, 15)
 
     try:
-        driver.get(base_url)
-        time.sleep(2)
+        # Ir directamente a la página de resultados (sin pasar por la home)
+        results_url = search_url("nhs", condition)
+        with stage("search_submit" if results_url else "home_load"):
+            driver.get(results_url or base_url)
+        wait_ready(driver, "nhs", "page", replaces=2)
 
         # Aceptar cookies (nuevo banner superior izquierda)
-        try:
-            accept_cookies_btn = wait.until(
-                EC.element_to_be_clickable((By.ID, "nhsuk-cookie-banner__link_accept_analytics"))
-            )
-            accept_cookies_btn.click()
-            print("[INFO] NHS analytics cookies accepted.")
-            time.sleep(1)
-        except:
-            print("[INFO] No analytics cookie banner found or already accepted.")
+        with stage("consent"):
+            try:
+                accept_cookies_btn = wait.until(
+                    EC.element_to_be_clickable((By.ID, "nhsuk-cookie-banner__link_accept_analytics"))
+                )
+                accept_cookies_btn.click()
+                print("[INFO] NHS analytics cookies accepted.")
+                wait_ready(driver, "nhs", "consent", replaces=1)
+            except:
+                print("[INFO] No analytics cookie banner found or already accepted.")
 
         # Buscar condición
-        search_box = wait.until(EC.presence_of_element_located((By.ID, "search-field")))
-        search_box.clear()
-        search_box.send_keys(condition)
-        search_box.send_keys(Keys.ENTER)
+        if not results_url:
+            with stage("search_submit"):
+                search_box = wait.until(EC.presence_of_element_located((By.ID, "search-field")))
+                search_box.clear()
+                search_box.send_keys(condition)
+                search_box.send_keys(Keys.ENTER)
 
         # Esperar resultados
         wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "ul.nhsuk-list")))
+        cache.put(condition, "results", driver.current_url, driver.page_source)
 
         # Obtener links
         result_links = driver.find_elements(
@@ -78,34 +89,39 @@ for condition in all_conditions:
         )
         if not result_links:
             print(f"[WARNING] No search results found for '{condition}'. Skipping.")
+            task.skip("no results")
             continue
 
         # Clic en el primer resultado
         first_link = result_links[0]
         first_link_href = first_link.get_attribute("href")
         print(f"[INFO] Opening first result: {first_link_href}")
-        first_link.click()
+        with stage("article_load"):
+            first_link.click()
 
         # Esperar a que cargue y extraer texto
         wait.until(EC.visibility_of_element_located((By.TAG_NAME, "h1")))
-        time.sleep(2)
+        wait_ready(driver, "nhs", "article", replaces=2)
 
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-
-        for tag in soup(["script", "style", "img", "video", "svg", "iframe", "noscript", "header", "footer", "nav", "aside"]):
-            tag.decompose()
-
-        text = soup.get_text(separator="\n", strip=True)
+        report_blocked(driver, condition)
+        html = driver.page_source
+        cache.put(condition, "article", driver.current_url, html)
+        if cache.fetch_only(task, driver.current_url):
+            continue
+        text = extract_nhs(html, condition)
 
         # Guardar texto como .txt
-        safe_name = clean_condition_name(condition)
-        file_path = os.path.join(output_folder, f"{safe_name}.txt")
-        with open(file_path, "w", encoding="utf-8") as f:
+        file_path = output_path("nhs", condition)
+        with stage("write"), open(file_path, "w", encoding="utf-8") as f:
             f.write(text)
+        task.done(file_path, text, url=driver.current_url)
         print(f"[INFO] Saved clean text to '{file_path}'")
 
     except Exception as e:
         print(f"[ERROR] Failed to process '{condition}': {e}")
+        task.fail(e)
+    finally:
+        driver_pool.checkin(driver, failed=task.status == "failed")
 
-driver.quit()
+driver_pool.close()
 print("\n✅ All done! Check the 'nhs_text_pages' folder for saved files.")
@@ -1,93 +1,102 @@
-import re
 import os
-import time
-import pandas as pd
-from bs4 import BeautifulSoup
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+from condition_catalog import load_conditions
+from crawl_manifest import Manifest
+from resource_blocking import block_resources, enable_request_log, report_blocked
+from readiness import wait_ready
+from extractors import extract_orthobullets, output_path
+from page_cache import PageCache, replay_if_requested
+from dom_batch import collect_links
+from driver_pool import DriverPool, launch_chrome
+from stage_timing import stage
 
 # Leer condiciones desde CSV
-df = pd.read_csv("exercises.csv", encoding="utf-8")
-conditions = set()
-for row in df["Related Conditions"].dropna():
-    for cond in re.split(r"[/\n]+", row):
-        if cond.strip():
-            conditions.add(cond.strip())
-
-def clean_filename(name: str) -> str:
-    return re.sub(r'[\\/*?:"<>|]', "_", name.strip())
+conditions = load_conditions()
+# Sin navegador: re-extraer desde page_cache con CRAWL_REPLAY=1
+replay_if_requested("orthobullets", conditions)
+# Saltar lo que ya terminaron ejecuciones anteriores (CRAWL_MODE, ver crawl_manifest.py)
+manifest = Manifest("orthobullets")
+conditions = manifest.select(conditions)
+cache = PageCache("orthobullets")
 
 # Configurar navegador
-options = Options()
-options.add_argument("--disable-gpu")
-options.add_argument("--no-sandbox")
-options.add_argument("--disable-dev-shm-usage")
-driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-wait = WebDriverWait(driver, 15)
+def launch_browser():
+    options = Options()
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    enable_request_log(options)
+    driver = launch_chrome(options)
+    block_resources(driver, "orthobullets")
+    return driver
+
+# Se recicla si crece su memoria o su tasa de errores (driver_pool.py)
+driver_pool = DriverPool(launch_browser)
+driver_pool.fill()
 
 output_dir = "orthobullets_txt"
 os.makedirs(output_dir, exist_ok=True)
 
 for condition in conditions:
     print(f"\n🔍 Buscando: {condition}")
+    task = manifest.start(condition)
+    driver = driver_pool.checkout()
+    wait = WebDriverWait(driver, 15)
     try:
-        driver.get("https://www.orthobullets.com/")
-        search_box = wait.until(EC.element_to_be_clickable((By.ID, "searchbox")))
-        search_box.clear()
-        search_box.send_keys(condition)
-        search_box.send_keys(Keys.ENTER)
+        with stage("home_load"):
+            driver.get("https://www.orthobullets.com/")
+        with stage("search_submit"):
+            search_box = wait.until(EC.element_to_be_clickable((By.ID, "searchbox")))
+            search_box.clear()
+            search_box.send_keys(condition)
+            search_box.send_keys(Keys.ENTER)
 
         wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "a.dashboard-item__link")))
-        links = driver.find_elements(By.CSS_SELECTOR, "a.dashboard-item__link")
-
-        target_link = None
+        # Buscar el div que contiene el icono azul, en la misma llamada
+        links = collect_links(
+            driver, "a.dashboard-item__link",
+            flag="div.dashboard-item__image-label.content-type-label--topic i.icon.icon-donut"
+        )
+        cache.put(condition, "results", driver.current_url, driver.page_source)
 
-        for link in links:
-            try:
-                # Buscar div que contiene el icono azul
-                icon_container = link.find_element(
-                    By.CSS_SELECTOR,
-                    "div.dashboard-item__image-label.content-type-label--topic"
-                )
-                donut_icon = icon_container.find_element(By.CSS_SELECTOR, "i.icon.icon-donut")
-                if donut_icon:
-                    target_link = link
-                    break
-            except:
-                continue
+        target_link = next((link["element"] for link in links if link["flag"]), None)
 
         if target_link:
             driver.execute_script("arguments[0].scrollIntoView(true);", target_link)
-            time.sleep(1)
-            driver.execute_script("arguments[0].click();", target_link)
+            wait_ready(driver, "orthobullets", "scrolled", replaces=1)
+            with stage("article_load"):
+                driver.execute_script("arguments[0].click();", target_link)
         else:
             print("⚠️ No se encontró un resultado con el icono donut azul.")
+            task.skip("no topic result")
             continue
 
         wait.until(EC.presence_of_element_located((By.TAG_NAME, "h1")))
-        time.sleep(2)
+        wait_ready(driver, "orthobullets", "article", replaces=2)
 
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        for tag in soup(["script", "style", "img", "svg", "video", "iframe", "noscript", "header", "footer", "nav", "aside"]):
-            tag.decompose()
-
-        main = soup.find("main") or soup.body
-        text = main.get_text(separator="\n", strip=True)
+        report_blocked(driver, condition)
+        html = driver.page_source
+        cache.put(condition, "article", driver.current_url, html)
+        if cache.fetch_only(task, driver.current_url):
+            continue
+        text = extract_orthobullets(html, condition)
 
-        filename = os.path.join(output_dir, f"{clean_filename(condition)}.txt")
-        with open(filename, "w", encoding="utf-8") as f:
+        filename = output_path("orthobullets", condition)
+        with stage("write"), open(filename, "w", encoding="utf-8") as f:
             f.write(text)
 
+        task.done(filename, text, url=driver.current_url)
         print(f"[✅] Guardado: {filename}")
 
     except Exception as e:
         print(f"[❌ ERROR] Para '{condition}': {e}")
+        task.fail(e)
+    finally:
+        driver_pool.checkin(driver, failed=task.status == "failed")
 
-driver.quit()
+driver_pool.close()
 print("\n🏁 Listo. Archivos guardados en la carpeta 'orthobullets_txt'")
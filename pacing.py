@@ -0,0 +1,155 @@
+"""
+Adaptive pacing between conditions: one AIMD token bucket per host.
+
+Some sites throw CAPTCHAs or ban when hit too fast, so their scrapers used to
+end every condition with a fixed (or random) sleep. That delay is a rate limit,
+not a page-load wait, and lives here instead. "min_interval" in sites.py is
+the starting time, in seconds, between the starts of two conditions (a number
+or a (low, high) range for random jitter). Time spent scraping already counts
+towards it, so slow pages are not followed by a full extra pause.
+
+The rate then follows what the host tolerates (additive increase,
+multiplicative decrease):
+
+    every SUCCESS_STREAK saved conditions   rate += ADDITIVE_STEP x starting rate
+                                            (x UNTHROTTLED_RATE on unpaced sites),
+                                            up to MAX_SPEEDUP x the starting rate
+    429, CAPTCHA page or timeout            rate x DECREASE, down to
+                                            1 / MAX_BACKOFF of the starting rate
+
+Sites without a "min_interval" run unthrottled until their first throttling
+signal, start at THROTTLED_RATE from there, and go back to full speed once
+the rate climbs past UNTHROTTLED_RATE.
+
+    pacer = Pacer("spinehealth")
+    for condition in conditions:
+        pacer.wait()
+        ...
+        if pacer.check(html):        # CAPTCHA / block page: slows down
+            ...
+        pacer.success()              # after saving
+        pacer.failed(e)              # in the except: slows down on timeouts
+
+Pacers of the same host are shared inside a process (pacer_for), so threads
+and the HTTP engine's coroutines draw from one bucket.
+"""
+import asyncio
+import random
+import threading
+import time
+
+import crawl_metrics
+import stage_timing
+from sites import get_site
+
+SUCCESS_STREAK = 5
+ADDITIVE_STEP = 0.1
+DECREASE = 0.5
+MAX_SPEEDUP = 4.0
+MAX_BACKOFF = 8.0
+THROTTLED_RATE = 0.2      # conditions per second after the first signal on an unpaced site
+UNTHROTTLED_RATE = 2.0
+
+# Lowercased fragments of the pages hosts serve instead of the content when they throttle
+# (not the reCAPTCHA script itself: plenty of normal pages embed it in their forms)
+BLOCK_MARKERS = (
+    "verify that you are not a robot",
+    "i'm not a robot",
+    "unusual traffic from your computer",
+    "cf-chl-",
+    "too many requests",
+)
+
+_pacers = {}
+_pacers_lock = threading.Lock()
+
+
+def looks_blocked(html: str) -> bool:
+    text = (html or "").lower()
+    return any(marker in text for marker in BLOCK_MARKERS)
+
+
+class Pacer:
+    def __init__(self, site_name: str):
+        self.site = site_name
+        interval = get_site(site_name).get("min_interval", 0)
+        self.low, self.high = interval if isinstance(interval, (tuple, list)) else (interval, interval)
+        mean = (self.low + self.high) / 2
+        self.base_rate = 1 / mean if mean > 0 else None
+        self.rate = self.base_rate
+        self._tokens = 1.0
+        self._stamp = time.monotonic()
+        self._streak = 0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Takes one token (jittered like min_interval); returns how long the caller must sleep first."""
+        with self._lock:
+            if self.rate is None:
+                return 0.0
+            now = time.monotonic()
+            self._tokens = min(1.0, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            mean = (self.low + self.high) / 2
+            self._tokens -= random.uniform(self.low, self.high) / mean if mean > 0 else 1.0
+            return max(0.0, -self._tokens / self.rate)
+
+    def wait(self) -> float:
+        """Sleeps until the bucket allows another condition; returns the time slept."""
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+            stage_timing.record("pace", delay, self.site, tagged=False)
+        return delay
+
+    async def wait_async(self) -> float:
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+            stage_timing.record("pace", delay, self.site, tagged=False)
+        return delay
+
+    def success(self) -> None:
+        with self._lock:
+            self._streak += 1
+            if self.rate is None or self._streak < SUCCESS_STREAK:
+                return
+            self._streak = 0
+            self.rate += ADDITIVE_STEP * (self.base_rate or UNTHROTTLED_RATE)
+            if self.base_rate is None and self.rate >= UNTHROTTLED_RATE:
+                self.rate = None
+                print(f"[PACE] {self.site}: no throttling any more, back to full speed")
+            elif self.base_rate is not None:
+                self.rate = min(self.rate, MAX_SPEEDUP * self.base_rate)
+
+    def throttled(self, reason: str) -> None:
+        """The host pushed back: halve the rate."""
+        with self._lock:
+            self._streak = 0
+            rate = self.rate if self.rate is not None else 2 * THROTTLED_RATE
+            self.rate = max(rate * DECREASE, (self.base_rate or THROTTLED_RATE) / MAX_BACKOFF)
+            self._tokens = min(self._tokens, 0.0)
+            self._stamp = time.monotonic()
+        crawl_metrics.count("captcha" if "captcha" in reason.lower() else "throttled", 1, self.site)
+        print(f"[PACE] {self.site}: {reason}, slowing down to one condition every {1 / self.rate:.1f}s")
+
+    def check(self, html: str) -> bool:
+        """True (and throttled) if the page is a CAPTCHA or block page."""
+        if looks_blocked(html):
+            self.throttled("CAPTCHA or block page")
+            return True
+        return False
+
+    def failed(self, error) -> None:
+        # Timeouts are how most hosts slow a client down; other errors say nothing about the rate
+        if "timeout" in type(error).__name__.lower():
+            self.throttled(type(error).__name__)
+
+
+def pacer_for(site_name: str) -> Pacer:
+    """The process-wide pacer of the site's host."""
+    host = get_site(site_name)["host"]
+    with _pacers_lock:
+        if host not in _pacers:
+            _pacers[host] = Pacer(site_name)
+        return _pacers[host]
@@ -0,0 +1,245 @@
+"""
+Content-addressed, compressed cache of every page the scrapers fetch.
+
+Search-result and article pages are stored once per distinct content under
+page_cache/objects/<sha256[:2]>/<sha256>.html.gz; an SQLite index maps each
+fetch (site, condition, kind, URL, time) to its object, so identical pages
+fetched again cost no extra space.
+
+    cache = PageCache("nhs")
+    cache.put(condition, "results", driver.current_url, driver.page_source)
+    cache.put(condition, "article", driver.current_url, html)
+
+The cache also splits a crawl into two stages (CRAWL_STAGE, or
+crawl_orchestrator.py --stage):
+
+    fetch     scrapers only store the raw pages; no extraction, no output files
+    extract   no browser at all: the site's extractor (extractors.py) runs over
+              the latest cached article of every condition and rewrites the
+              output files (CRAWL_REPLAY=1 does the same)
+    all       both, in the same run (default)
+
+The extract stage needs no network, so changing the cleaning logic only needs
+a local re-extraction instead of a new crawl. Raw pages saved by the original
+scrapers (nhs_html_pages/, hss_html_pages/...) can be imported as the fetch
+stage of their site:
+
+    CRAWL_STAGE=fetch python nhs_scraping_updated.py
+    CRAWL_STAGE=extract python nhs_scraping_updated.py
+    python page_cache.py import nhs nhs_html_pages
+    python page_cache.py replay clevelandclinic physiopedia
+    python page_cache.py stats
+"""
+import gzip
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from stage_timing import timed
+
+CACHE_DIR = os.environ.get("PAGE_CACHE_DIR", "page_cache")
+REPLAY_ENV = "CRAWL_REPLAY"
+STAGE_ENV = "CRAWL_STAGE"
+STAGES = ("all", "fetch", "extract")
+COMPRESS_LEVEL = 6
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fetches (
+    site TEXT NOT NULL,
+    condition TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    url TEXT,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fetches_lookup ON fetches (site, condition, kind, fetched_at);
+CREATE TABLE IF NOT EXISTS objects (
+    sha256 TEXT PRIMARY KEY,
+    stored_size INTEGER NOT NULL
+);
+"""
+
+
+def stage() -> str:
+    value = os.environ.get(STAGE_ENV, "").strip().lower() or "all"
+    if value not in STAGES:
+        raise ValueError(f"Unknown {STAGE_ENV} {value!r}: use {', '.join(STAGES)}")
+    return value
+
+
+def replay_requested() -> bool:
+    if stage() == "extract":
+        return True
+    return os.environ.get(REPLAY_ENV, "").strip().lower() not in ("", "0", "false", "no")
+
+
+def object_path(digest: str, cache_dir: str = CACHE_DIR) -> str:
+    return os.path.join(cache_dir, "objects", digest[:2], f"{digest}.html.gz")
+
+
+class PageCache:
+    def __init__(self, site_name: str, cache_dir: str = CACHE_DIR):
+        self.site = site_name
+        self.cache_dir = cache_dir
+        os.makedirs(os.path.join(cache_dir, "objects"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), timeout=60, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    @timed("cache")
+    def put(self, condition: str, kind: str, url: str, html: str, fetched_at: float = None) -> str:
+        """Stores a fetched page; returns its content hash."""
+        data = html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = object_path(digest, self.cache_dir)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, "wb", compresslevel=COMPRESS_LEVEL) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO objects (sha256, stored_size) VALUES (?, ?)",
+                (digest, os.path.getsize(path)),
+            )
+            self._conn.execute(
+                "INSERT INTO fetches (site, condition, kind, url, sha256, size, fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.site, condition, kind, url, digest, len(data), fetched_at or time.time()),
+            )
+        return digest
+
+    def fetch_only(self, task, url: str) -> bool:
+        """
+        True in the fetch stage: the article is cached, so `task` is recorded as
+        done and the scraper skips extraction (left to the extract stage).
+        """
+        if stage() != "fetch":
+            return False
+        if task:
+            task.done(url=url)
+        print(f"[CACHE] {self.site}: '{task.condition if task else url}' stored for the extract stage")
+        return True
+
+    def get(self, condition: str, kind: str = "article"):
+        """(url, html) of the latest cached fetch, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, sha256 FROM fetches WHERE site = ? AND condition = ? AND kind = ? "
+                "ORDER BY fetched_at DESC LIMIT 1",
+                (self.site, condition, kind),
+            ).fetchone()
+        if row is None:
+            return None
+        url, digest = row
+        with gzip.open(object_path(digest, self.cache_dir), "rb") as f:
+            return url, f.read().decode("utf-8")
+
+    def conditions(self, kind: str = "article") -> list:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT condition FROM fetches WHERE site = ? AND kind = ?", (self.site, kind)
+            ).fetchall()
+        return sorted(condition for (condition,) in rows)
+
+
+def replay(site_name: str, conditions: list = None) -> dict:
+    """Re-extracts the site's outputs from cached article pages, without any network access."""
+    from extractors import extract, output_path
+
+    cache = PageCache(site_name)
+    cached = cache.conditions()
+    if conditions is not None:
+        wanted = set(conditions)
+        cached = [c for c in cached if c in wanted]
+
+    started = time.perf_counter()
+    counts = {"written": 0, "empty": 0, "errors": 0}
+    for condition in cached:
+        _, html = cache.get(condition)
+        try:
+            output = extract(site_name, html, condition)
+        except Exception as e:
+            counts["errors"] += 1
+            print(f"[REPLAY ❌] {site_name}: {condition}: {e}")
+            continue
+        if not output:
+            counts["empty"] += 1
+            continue
+        file_path = output_path(site_name, condition)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(output)
+        counts["written"] += 1
+
+    elapsed = time.perf_counter() - started
+    print(f"[REPLAY] {site_name}: {counts['written']} written, {counts['empty']} empty, "
+          f"{counts['errors']} errors from {len(cached)} cached pages in {elapsed:.1f}s")
+    return counts
+
+
+def replay_if_requested(site_name: str, conditions: list = None) -> None:
+    """Called by every scraper before it launches a browser: replays and exits under CRAWL_REPLAY."""
+    if replay_requested():
+        replay(site_name, conditions)
+        sys.exit(0)
+
+
+def import_pages(site_name: str, folder: str) -> int:
+    """
+    Loads the raw .html pages an original scraper saved in `folder` as the
+    site's cached articles. File names are mapped back to catalog conditions.
+    """
+    from extractors import conditions_by_filename
+
+    names = conditions_by_filename()
+    cache = PageCache(site_name)
+    imported = 0
+    for entry in sorted(os.scandir(folder), key=lambda e: e.name):
+        stem, ext = os.path.splitext(entry.name)
+        if not entry.is_file() or ext.lower() not in (".html", ".htm"):
+            continue
+        with open(entry.path, encoding="utf-8", errors="replace") as f:
+            html = f.read()
+        # The file's mtime stands for the fetch time, so newer crawls still win in get()
+        cache.put(names.get(stem, stem), "article", None, html, fetched_at=entry.stat().st_mtime)
+        imported += 1
+    print(f"[CACHE] {site_name}: imported {imported} pages from {folder}")
+    return imported
+
+
+def stats(cache_dir: str = CACHE_DIR) -> list:
+    """([(site, kind, fetches, distinct pages, raw bytes)], compressed bytes on disk)."""
+    conn = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"))
+    try:
+        rows = conn.execute(
+            "SELECT site, kind, COUNT(*), COUNT(DISTINCT sha256), SUM(size) FROM fetches "
+            "GROUP BY site, kind ORDER BY site, kind"
+        ).fetchall()
+        stored = conn.execute("SELECT COALESCE(SUM(stored_size), 0) FROM objects").fetchone()[0]
+    finally:
+        conn.close()
+    return rows, stored
+
+
+if __name__ == "__main__":
+    command, names = (sys.argv[1], sys.argv[2:]) if len(sys.argv) > 1 else ("stats", [])
+    if command == "import" and len(names) >= 2:
+        for folder in names[1:]:
+            import_pages(names[0], folder)
+    elif command == "replay":
+        from sites import SITES
+        for name in names or sorted(SITES):
+            replay(name)
+    elif command == "stats":
+        rows, stored = stats()
+        for site, kind, fetches, distinct, raw in rows:
+            print(f"{site:<16} {kind:<8} {fetches:>7} fetches {distinct:>7} distinct {raw / 1e6:>9.1f} MB raw")
+        print(f"On disk (compressed, deduplicated): {stored / 1e6:.1f} MB")
+    else:
+        sys.exit("usage: python page_cache.py [stats | replay [site ...] | import site folder ...]")
@@ -2,7 +2,6 @@ import os
 import re
 import time
 import random
-import pandas as pd
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
@@ -11,23 +10,14 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
+from condition_catalog import load_conditions
 
 def clean_condition_name(name: str) -> str:
     """Creates a file-friendly string for saving HTML files."""
     return re.sub(r'[\\/*?:"<>|]', '_', name)
 
 # 1) Read CSV data
-df = pd.read_csv("exercises.csv", encoding="utf-8")  
-
-# Extract all conditions
-all_conditions = []
-for row in df["Related Conditions"].dropna():
-    splitted = re.split(r"[/\n]+", row)
-    splitted = [c.strip() for c in splitted if c.strip()]
-    all_conditions.extend(splitted)
-
-# Remove duplicates
-all_conditions = list(set(all_conditions))
+all_conditions = load_conditions()
 
 # 2) Setup Selenium
 options = Options()
@@ -1,85 +1,98 @@
 
 import re
 import os
-import time
-import pandas as pd
-from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright
+from condition_catalog import load_conditions
+from crawl_manifest import Manifest
+from sites import search_url
+from playwright_contexts import run_in_contexts
+from resource_blocking import PlaywrightBlocker
+from readiness import wait_ready_async
+from extractors import extract_physiotutors, output_path
+from page_cache import PageCache, replay_if_requested
+from stage_timing import stage
 
 BASE_URL = "https://www.physiotutors.com/"
 OUTPUT_DIR = "physiotutors_txt_playwright"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-def clean_filename(name: str) -> str:
-    return re.sub(r'[\\/*?:"<>|]', "_", name)
+# Contextos aislados dentro de un solo Chromium (PLAYWRIGHT_CONTEXTS para cambiarlo)
+NUM_CONTEXTS = 4
+HEADLESS = True  # False para ver el navegador
 
-# Leer condiciones desde CSV
-df = pd.read_csv("exercises.csv", encoding="utf-8")
-conditions = list(set(
-    c.strip() for r in df["Related Conditions"].dropna()
-    for c in re.split(r"[/\n]+", r) if c.strip()
-))
-
-with sync_playwright() as p:
-    browser = p.chromium.launch(headless=False)
-    context = browser.new_context()
-    page = context.new_page()
+# Imágenes, vídeo, fuentes, anuncios y analítica se cortan antes de salir a la red
+blocker = PlaywrightBlocker("physiotutors")
 
-    for condition in conditions:
-        print(f"\n🔍 Buscando: {condition}")
-        try:
-            page.goto(BASE_URL, timeout=15000)
-            time.sleep(1)
-
-            # Aceptar cookies
+# Leer condiciones desde CSV
+conditions = load_conditions()
+# Sin navegador: re-extraer desde page_cache con CRAWL_REPLAY=1
+replay_if_requested("physiotutors", conditions)
+# Saltar lo que ya terminaron ejecuciones anteriores (CRAWL_MODE, ver crawl_manifest.py)
+manifest = Manifest("physiotutors")
+conditions = manifest.select(conditions)
+cache = PageCache("physiotutors")
+
+async def setup_context(context):
+    await blocker.install(context)
+    # Aceptar cookies una vez por contexto: la cookie vale para todas sus condiciones
+    page = await context.new_page()
+    try:
+        with stage("consent", "physiotutors"):
+            await page.goto(BASE_URL, timeout=15000)
             try:
-                page.click("button.cmplz-btn.cmplz-accept", timeout=3000)
+                await page.click("button.cmplz-btn.cmplz-accept", timeout=3000)
                 print("[OK] Cookies aceptadas.")
             except:
                 print("[INFO] No cookies visibles.")
-
-            # Abrir buscador
-            page.click("div.site-header__search-toggle", timeout=4000)
-            page.fill("input.c-search-bar__form-input", re.sub(r"[^\w\s\-]", "", condition))
-            page.keyboard.press("Enter")
+    except Exception as e:
+        print(f"[WARN] No se pudo abrir la home para aceptar cookies: {e}")
+    finally:
+        await page.close()
+
+async def scrape_condition(page, condition):
+    print(f"\n🔍 Buscando: {condition}")
+    task = manifest.start(condition)
+    try:
+        query = re.sub(r"[^\w\s\-]", "", condition)
+        results_url = search_url("physiotutors", query)
+        with stage("search_submit" if results_url else "home_load"):
+            await page.goto(results_url or BASE_URL, timeout=15000)
+        await wait_ready_async(page, "physiotutors", "page", replaces=1)
+
+        # Abrir buscador (solo si no hay URL de resultados directa)
+        if not results_url:
+            with stage("search_submit"):
+                await page.click("div.site-header__search-toggle", timeout=4000)
+                await page.fill("input.c-search-bar__form-input", query)
+                await page.keyboard.press("Enter")
             print("[OK] Búsqueda enviada.")
-            page.wait_for_timeout(1200)
-
-            # Clic en primer resultado
-            page.click("a.s-site-search__post-link", timeout=5000)
-            page.wait_for_timeout(1500)
-
-            html = page.content()
-            soup = BeautifulSoup(html, "html.parser")
-            for tag in soup(["script", "style", "nav", "header", "footer", "aside", "noscript", "svg"]):
-                tag.decompose()
-
-            main = soup.find("main") or soup.find("div", class_="post-content") or soup.body
-            if not main:
-                print("[❌] No se pudo extraer el contenido.")
-                continue
-
-            title_tag = main.find("h1")
-            title = title_tag.get_text(strip=True) if title_tag else condition
-
-            parts = [f"# {title}"]
-            for el in main.descendants:
-                if el.name == "img" and el.has_attr("src"):
-                    parts.append(f"[IMAGE] {el['src']}")
-                elif el.name in ("video", "source", "iframe") and el.has_attr("src"):
-                    parts.append(f"[MEDIA] {el['src']}")
-                elif isinstance(el, str):
-                    clean = el.strip()
-                    if clean:
-                        parts.append(clean)
-
-            filename = os.path.join(OUTPUT_DIR, f"{clean_filename(condition)}.txt")
-            with open(filename, "w", encoding="utf-8") as f:
-                f.write("\n".join(parts))
-
-            print(f"[✅] Guardado en '{filename}'")
-        except Exception as e:
-            print(f"[❌ ERROR en '{condition}']: {e}")
-            continue
-
-    browser.close()
+            await wait_ready_async(page, "physiotutors", "results", replaces=1.2)
+
+        cache.put(condition, "results", page.url, await page.content())
+        # Clic en primer resultado
+        with stage("article_load"):
+            await page.click("a.s-site-search__post-link", timeout=5000)
+        await wait_ready_async(page, "physiotutors", "article", replaces=1.5)
+        blocker.report(page, condition)
+
+        html = await page.content()
+        cache.put(condition, "article", page.url, html)
+        if cache.fetch_only(task, page.url):
+            return
+        text = extract_physiotutors(html, condition)
+        if text is None:
+            print("[❌] No se pudo extraer el contenido.")
+            task.skip("no content")
+            return
+
+        filename = output_path("physiotutors", condition)
+        with stage("write"), open(filename, "w", encoding="utf-8") as f:
+            f.write(text)
+
+        task.done(filename, text, url=page.url)
+        print(f"[✅] Guardado en '{filename}'")
+    except Exception as e:
+        print(f"[❌ ERROR en '{condition}']: {e}")
+        task.fail(e)
+
+run_in_contexts(conditions, scrape_condition, contexts=NUM_CONTEXTS, headless=HEADLESS,
+                setup_context=setup_context)
@@ -0,0 +1,75 @@
+"""
+Async Playwright runner: N isolated browser contexts inside one Chromium.
+
+Each context (own cookies, cache and storage) gets one page and keeps pulling
+conditions from a shared queue until it is empty, so throughput scales with
+the number of contexts without paying for extra browser processes.
+
+    async def scrape_condition(page, condition): ...
+    run_in_contexts(conditions, scrape_condition, contexts=4)
+
+The number of contexts can be overridden with the PLAYWRIGHT_CONTEXTS env var.
+"""
+import asyncio
+import os
+
+from playwright.async_api import async_playwright
+
+import crawl_metrics
+
+DEFAULT_CONTEXTS = min(8, os.cpu_count() or 4)
+
+
+def context_count(default: int = None) -> int:
+    return int(os.environ.get("PLAYWRIGHT_CONTEXTS") or default or DEFAULT_CONTEXTS)
+
+
+async def _worker(browser, queue, scrape_condition, context_kwargs, setup_context, worker_id):
+    context = await browser.new_context(**(context_kwargs or {}))
+    if setup_context:
+        await setup_context(context)
+    page = await context.new_page()
+    try:
+        while True:
+            try:
+                condition = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            try:
+                await scrape_condition(page, condition)
+            except Exception as e:
+                print(f"[ERROR] [ctx {worker_id}] Failed to process '{condition}': {e}")
+            if page.is_closed():
+                crawl_metrics.count("browser_restarts")
+                page = await context.new_page()
+    finally:
+        await context.close()
+
+
+async def run_in_contexts_async(conditions, scrape_condition, contexts: int = None,
+                                headless: bool = True, context_kwargs: dict = None,
+                                setup_context=None, launch_kwargs: dict = None):
+    """
+    scrape_condition: async callable(page, condition).
+    setup_context:    optional async callable(context) run once per context
+                      (routes, cookies...).
+    """
+    crawl_metrics.set_engine("playwright")
+    queue = asyncio.Queue()
+    for condition in conditions:
+        queue.put_nowait(condition)
+
+    contexts = max(1, min(context_count(contexts), queue.qsize() or 1))
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=headless, **(launch_kwargs or {}))
+        try:
+            await asyncio.gather(*(
+                _worker(browser, queue, scrape_condition, context_kwargs, setup_context, i + 1)
+                for i in range(contexts)
+            ))
+        finally:
+            await browser.close()
+
+
+def run_in_contexts(conditions, scrape_condition, **kwargs):
+    asyncio.run(run_in_contexts_async(conditions, scrape_condition, **kwargs))
@@ -1,42 +1,47 @@
 import os
-import re
-import time
-import pandas as pd
-from bs4 import BeautifulSoup
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-
-# === Keywords relevantes para filtrar contenido ===
-content_keywords = [
-    "treatment", "treatments", "rehabilitation", "therapy", "physical therapy",
-    "exercises", "exercise", "routine", "routines", "management", "stretch",
-    "mobility", "home care", "recovery", "relief"
-]
+from condition_catalog import load_conditions
+from crawl_manifest import Manifest
+from sites import search_url
+from extractors import best_pmc_link, extract_pmc, output_path
+from resource_blocking import block_resources, enable_request_log, report_blocked
+from readiness import wait_ready
+from page_cache import PageCache, replay_if_requested
+from search_cache import SearchCache
+from url_index import UrlIndex
+from dom_batch import collect_links
+from driver_pool import DriverPool, launch_chrome
+from stage_timing import stage
 
 # === Leer condiciones desde el CSV ===
-df = pd.read_csv("exercises.csv", encoding="utf-8")
-conditions = set()
-for row in df["Related Conditions"].dropna():
-    for cond in re.split(r"[/\n]+", row):
-        if cond.strip():
-            conditions.add(cond.strip())
-
-def clean_filename(name):
-    return re.sub(r'[\\/*?:"<>|]', "_", name.strip().replace(" ", "_"))
+conditions = load_conditions()
+# Sin navegador: re-extraer desde page_cache con CRAWL_REPLAY=1
+replay_if_requested("pmc", conditions)
+# Saltar lo que ya terminaron ejecuciones anteriores (CRAWL_MODE, ver crawl_manifest.py)
+manifest = Manifest("pmc")
+conditions = manifest.select(conditions)
+cache = PageCache("pmc")
+searches = SearchCache("pmc")
+urls = UrlIndex("pmc")
 
 # === Configurar navegador ===
-options = Options()
-# options.add_argument("--headless")  # Comenta esta línea si quieres ver el navegador
-options.add_argument("--disable-gpu")
-options.add_argument("--no-sandbox")
-driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-wait = WebDriverWait(driver, 15)
+def launch_browser():
+    options = Options()
+    # options.add_argument("--headless")  # Comenta esta línea si quieres ver el navegador
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    enable_request_log(options)
+    driver = launch_chrome(options)
+    block_resources(driver, "pmc")
+    return driver
+
+# Se recicla si crece su memoria o su tasa de errores (driver_pool.py)
+driver_pool = DriverPool(launch_browser)
+driver_pool.fill()
 
 # === Carpeta de salida ===
 output_dir = "downloads_pmc"
@@ -45,84 +50,75 @@ os.makedirs(output_dir, exist_ok=True)
 # === Bucle por condición ===
 for condition in conditions:
     print(f"\n🔍 Buscando en PMC: {condition}")
+    task = manifest.start(condition)
+    driver = driver_pool.checkout()
+    wait = WebDriverWait(driver, 15)
     try:
-        driver.get("https://pmc.ncbi.nlm.nih.gov/")
-        time.sleep(2)
-
-        # Buscar usando ID real
-        search_box = wait.until(EC.element_to_be_clickable((By.ID, "pmc-search")))
-        search_box.clear()
-        search_box.send_keys(condition)
-        search_box.send_keys(Keys.ENTER)
-        time.sleep(3)
+        results_url = search_url("pmc", condition)
+        if results_url:
+            # Página de resultados directa, sin pasar por la home
+            with stage("search_submit"):
+                driver.get(results_url)
+        else:
+            with stage("home_load"):
+                driver.get("https://pmc.ncbi.nlm.nih.gov/")
+            wait_ready(driver, "pmc", "home", replaces=2)
+
+            # Buscar usando ID real
+            with stage("search_submit"):
+                search_box = wait.until(EC.element_to_be_clickable((By.ID, "pmc-search")))
+                search_box.clear()
+                search_box.send_keys(condition)
+                search_box.send_keys(Keys.ENTER)
+            wait_ready(driver, "pmc", "results", replaces=3)
 
         wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "a.view[href*='/articles/PMC']")))
-        links = driver.find_elements(By.CSS_SELECTOR, "a.view[href*='/articles/PMC']")
-
-        best_link = None
-        best_score = -1
+        links = collect_links(driver, "a.view[href*='/articles/PMC']")
+        cache.put(condition, "results", driver.current_url, driver.page_source)
+        searches.put(condition, links)
 
-        for link in links:
-            title = link.text.lower()
-            score = 0
-
-            if condition.lower() in title:
-                score += 3
-            score += sum(1 for k in content_keywords if k in title)
-
-            if score > best_score:
-                best_score = score
-                best_link = link
+        # Título con la condición y más keywords relevantes
+        best_link = best_pmc_link([(link["text"], link) for link in links], condition)
 
         if not best_link:
             print(f"⚠️ No se encontró artículo adecuado para: {condition}")
+            task.skip("no suitable article")
+            continue
+        # Misma página ya guardada para otra condición: se enlaza sin volver a descargarla
+        if urls.reuse(task, best_link["href"]):
             continue
 
-        print(f"➡️ Abriendo artículo: {best_link.text[:80]}...")
-        driver.execute_script("arguments[0].click();", best_link)
-        time.sleep(5)
+        print(f"➡️ Abriendo artículo: {best_link['text'][:80]}...")
+        with stage("article_load"):
+            driver.execute_script("arguments[0].click();", best_link["element"])
+        wait_ready(driver, "pmc", "article", replaces=5)
 
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        article = soup.find("div", id="maincontent") or soup.body
-        if not article:
+        # === Extraer secciones relevantes (+ referencias) ===
+        report_blocked(driver, condition)
+        html = driver.page_source
+        cache.put(condition, "article", driver.current_url, html)
+        if cache.fetch_only(task, driver.current_url):
+            continue
+        cleaned_output = extract_pmc(html, condition)
+        if cleaned_output is None:
             print(f"❌ No se pudo extraer contenido del artículo: {condition}")
+            task.skip("no article content")
             continue
 
-        relevant_text = []
-        current_heading = ""
-
-        # === Extraer secciones relevantes ===
-        for tag in article.find_all(["h1", "h2", "h3", "h4", "p", "ul", "ol", "figure"]):
-            text = tag.get_text(separator=" ", strip=True).lower()
-
-            if tag.name.startswith("h"):
-                current_heading = tag.get_text(strip=True)
-
-            # Si es párrafo, lista o figura y contiene una keyword, lo guardamos
-            if tag.name in ["p", "ul", "ol", "figure"]:
-                if any(kw in text for kw in content_keywords):
-                    relevant_text.append(f"{current_heading}\n{text}\n")
-
-        # === Añadir referencias si existen ===
-        references_section = article.find("section", id=re.compile("references?", re.I))
-        if references_section:
-            refs = references_section.get_text(separator="\n", strip=True)
-            relevant_text.append("\nREFERENCIAS\n" + refs)
-
-        # === Guardar solo si hay contenido relevante ===
-        cleaned_output = "\n".join(relevant_text).strip()
-        if not cleaned_output:
-            cleaned_output = "[NO SE ENCONTRARON SECCIONES RELEVANTES]"
-
-        filename = os.path.join(output_dir, f"{clean_filename(condition)}.txt")
-        with open(filename, "w", encoding="utf-8") as f:
+        filename = output_path("pmc", condition)
+        with stage("write"), open(filename, "w", encoding="utf-8") as f:
             f.write(cleaned_output)
 
+        task.done(filename, cleaned_output, url=driver.current_url)
+        urls.record(condition, best_link["href"], driver.current_url, filename)
         print(f"✅ Guardado: {filename}")
 
     except Exception as e:
         print(f"❌ Error con '{condition}': {e}")
+        task.fail(e)
         continue
+    finally:
+        driver_pool.checkin(driver, failed=task.status == "failed")
 
-driver.quit()
+driver_pool.close()
 print("\n🏁 Proceso completado.")
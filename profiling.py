@@ -0,0 +1,196 @@
+"""
+Opt-in profiles of the slowest conditions, to see where their time goes.
+
+With PROFILE set, every condition is profiled from Manifest.start() to its
+done/skip/fail. When it finishes, its profile is kept if it took longer than
+PROFILE_THRESHOLD seconds or is among the PROFILE_SLOWEST slowest conditions
+of the process so far (a profile pushed out of the top N is deleted again).
+Kept profiles go next to the site's output, in <output_dir>_profiles/:
+
+    <condition>.prof / .txt     cProfile stats (snakeviz, or the top functions
+                                by cumulative time as text)
+    <condition>.html / .txt     pyinstrument call tree, with PROFILE=pyinstrument
+    <condition>.tracemalloc     tracemalloc snapshot, with PROFILE_MEMORY=1, plus
+    <condition>.memory.txt      the allocation sites that grew during the condition
+
+    PROFILE=1 PROFILE_SLOWEST=10 python nhs_scraping_updated.py
+    PROFILE=pyinstrument PROFILE_THRESHOLD=60 PROFILE_MEMORY=1 python crawl_orchestrator.py
+
+cProfile follows one thread, so conditions that overlap in the same thread
+(the Playwright contexts, the HTTP engine's coroutines) are profiled one at a
+time; pyinstrument follows each coroutine on its own. tracemalloc is
+process-wide: overlapping conditions share their allocations.
+"""
+import cProfile
+import heapq
+import importlib.util
+import io
+import itertools
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+from sites import get_site
+
+PROFILE_ENV = "PROFILE"
+SLOWEST_ENV = "PROFILE_SLOWEST"
+THRESHOLD_ENV = "PROFILE_THRESHOLD"
+MEMORY_ENV = "PROFILE_MEMORY"
+DEFAULT_SLOWEST = 5
+TOP_FUNCTIONS = 60
+TOP_ALLOCATIONS = 40
+TRACEMALLOC_FRAMES = 10
+
+HAS_PYINSTRUMENT = importlib.util.find_spec("pyinstrument") is not None
+
+_lock = threading.Lock()
+_kept = []                       # min-heap of (seconds, order, paths, over threshold) of the slowest kept profiles
+_order = itertools.count()
+_local = threading.local()       # the cProfile running in this thread, if any
+
+
+def backend():
+    """"cprofile", "pyinstrument" or None (profiling off)."""
+    value = os.environ.get(PROFILE_ENV, "").strip().lower()
+    if value in ("", "0", "off"):
+        return None
+    if value == "pyinstrument":
+        if HAS_PYINSTRUMENT:
+            return "pyinstrument"
+        print("[PROFILE] pyinstrument is not installed, using cProfile")
+    return "cprofile"
+
+
+def _settings() -> tuple:
+    threshold = os.environ.get(THRESHOLD_ENV)
+    return int(os.environ.get(SLOWEST_ENV, DEFAULT_SLOWEST)), float(threshold) if threshold else None
+
+
+def profile_dir(site_name: str) -> str:
+    return get_site(site_name)["output_dir"].rstrip("/\\") + "_profiles"
+
+
+def _file_stem(site_name: str, condition: str) -> str:
+    from extractors import clean_condition_name
+    return os.path.join(profile_dir(site_name), clean_condition_name(condition))
+
+
+class _Profile:
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.profiler = None
+        self.memory = None
+        self.memory_end = None
+        self.started = time.perf_counter()
+
+    def start(self) -> bool:
+        """False if another condition is already being profiled where this one runs."""
+        if self.kind == "cprofile" and getattr(_local, "active", None) is not None:
+            return False
+        # Before the profiler starts, so that the snapshot is not in the profile
+        if os.environ.get(MEMORY_ENV, "0") != "0":
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+            self.memory = _snapshot()
+        if self.kind == "pyinstrument":
+            from pyinstrument import Profiler
+            self.profiler = Profiler(async_mode="enabled")
+            try:
+                self.profiler.start()
+            except RuntimeError:
+                return False
+        else:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+            _local.active = self
+        self.started = time.perf_counter()
+        return True
+
+    def stop(self) -> float:
+        seconds = time.perf_counter() - self.started
+        if self.kind == "pyinstrument":
+            self.profiler.stop()
+        else:
+            self.profiler.disable()
+            _local.active = None
+        if self.memory is not None:
+            self.memory_end = _snapshot()
+        return seconds
+
+    def dump(self, stem: str, label: str) -> list:
+        os.makedirs(os.path.dirname(stem), exist_ok=True)
+        paths = []
+        if self.kind == "pyinstrument":
+            paths.append(_write(stem + ".html", self.profiler.output_html()))
+            paths.append(_write(stem + ".txt", f"{label}\n\n" + self.profiler.output_text(unicode=True)))
+        else:
+            self.profiler.dump_stats(stem + ".prof")
+            paths.append(stem + ".prof")
+            text = io.StringIO()
+            pstats.Stats(self.profiler, stream=text).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+            paths.append(_write(stem + ".txt", f"{label}\n{text.getvalue()}"))
+        if self.memory is not None:
+            self.memory_end.dump(stem + ".tracemalloc")
+            paths.append(stem + ".tracemalloc")
+            grown = self.memory_end.compare_to(self.memory, "lineno")[:TOP_ALLOCATIONS]
+            paths.append(_write(stem + ".memory.txt", label + "\n\n" + "\n".join(str(stat) for stat in grown) + "\n"))
+        return paths
+
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+
+
+def _write(path: str, text: str) -> str:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+
+def begin(task) -> None:
+    """Starts profiling a task's condition if PROFILE is set (from Manifest.start)."""
+    kind = backend()
+    if kind is None:
+        return
+    profile = _Profile(kind)
+    if profile.start():
+        task.profile = profile
+
+
+def end(task) -> None:
+    """Stops the task's profile and keeps it if the condition was slow enough (from Task._finish)."""
+    profile = getattr(task, "profile", None)
+    if profile is None:
+        return
+    task.profile = None
+    seconds = profile.stop()
+    slowest, threshold = _settings()
+    over = threshold is not None and seconds >= threshold
+    with _lock:
+        top = slowest > 0 and (len(_kept) < slowest or seconds > _kept[0][0])
+        if not (over or top):
+            return
+        site_name = task.manifest.site
+        label = (f"{site_name} · {task.condition} · attempt {task.attempt} · {task.status} · "
+                 f"{seconds:.1f}s")
+        paths = profile.dump(_file_stem(site_name, task.condition), label)
+        if top:
+            heapq.heappush(_kept, (seconds, next(_order), paths, over))
+            if len(_kept) > slowest:
+                _, _, evicted, evicted_over = heapq.heappop(_kept)
+                # Still kept for being over the threshold
+                if not evicted_over:
+                    for path in evicted:
+                        if path not in paths and os.path.exists(path):
+                            os.remove(path)
+    print(f"[PROFILE] {site_name}: '{task.condition}' took {seconds:.1f}s, profile in {os.path.dirname(paths[0])}")
+
+
+def cancel(task) -> None:
+    """Drops a task's profile without keeping it (its result was recorded in another process)."""
+    profile = getattr(task, "profile", None)
+    if profile is not None:
+        task.profile = None
+        profile.stop()
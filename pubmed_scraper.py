@@ -1,7 +1,5 @@
 import re
-import time
 import os
-import pandas as pd
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
@@ -10,25 +8,33 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
+from condition_catalog import load_conditions
+from crawl_manifest import Manifest
+from sites import search_url
+from resource_blocking import block_resources, enable_request_log, report_blocked
+from readiness import wait_ready
+from page_cache import PageCache, replay_if_requested
 
 def clean_condition_name(name: str) -> str:
     return re.sub(r'[\\/*?:"<>|]', '_', name)
 
 # Read conditions from CSV
-df = pd.read_csv("exercises.csv", encoding="utf-8")
-all_conditions = []
-for row in df["Related Conditions"].dropna():
-    splitted = re.split(r"[/\n]+", row)
-    splitted = [c.strip() for c in splitted if c.strip()]
-    all_conditions.extend(splitted)
-all_conditions = list(set(all_conditions))
+all_conditions = load_conditions()
+# No browser needed to re-extract from page_cache: CRAWL_REPLAY=1
+replay_if_requested("pubmed", all_conditions)
+# Skip what earlier runs already finished (CRAWL_MODE, see crawl_manifest.py)
+manifest = Manifest("pubmed")
+all_conditions = manifest.select(all_conditions)
+cache = PageCache("pubmed")
 
 # Setup Selenium
 options = Options()
 # options.add_argument("--headless")
 options.add_argument("--disable-gpu")
 options.add_argument("--no-sandbox")
+enable_request_log(options)
 driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+block_resources(driver, "pubmed")
 wait = WebDriverWait(driver, 15)
 
 # Output folder
@@ -38,24 +44,31 @@ base_url = "https://pubmed.ncbi.nlm.nih.gov/"
 
 for condition in all_conditions:
     print(f"\n[INFO] Searching for condition: '{condition}'")
+    task = manifest.start(condition)
     try:
-        driver.get(base_url)
-        
-        # Fill the search box
-        search_box = wait.until(EC.presence_of_element_located((By.ID, "id_term")))
-        search_box.clear()
-        search_box.send_keys(condition)
-        
-        # Submit the search
-        search_button = driver.find_element(By.CSS_SELECTOR, "button.search-btn")
-        search_button.click()
+        results_url = search_url("pubmed", condition)
+        if results_url:
+            # Open the results page directly
+            driver.get(results_url)
+        else:
+            driver.get(base_url)
+            
+            # Fill the search box
+            search_box = wait.until(EC.presence_of_element_located((By.ID, "id_term")))
+            search_box.clear()
+            search_box.send_keys(condition)
+            
+            # Submit the search
+            search_button = driver.find_element(By.CSS_SELECTOR, "button.search-btn")
+            search_button.click()
 
         # Click the first result
         first_result = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "a.docsum-title")))
+        cache.put(condition, "results", driver.current_url, driver.page_source)
         first_result.click()
         print("[INFO] Opened first result.")
 
-        time.sleep(2)
+        wait_ready(driver, "pubmed", "article", replaces=2)
 
         # Check for 'free full text' or 'free pdf'
         try:
@@ -68,16 +81,22 @@ for condition in all_conditions:
             print("[INFO] No free full text link found, saving main article page.")
 
         # Save page as HTML
-        time.sleep(2)
+        wait_ready(driver, "pubmed", "fulltext", replaces=2)
+        report_blocked(driver, condition)
         page_html = driver.page_source
+        cache.put(condition, "article", driver.current_url, page_html)
+        if cache.fetch_only(task, driver.current_url):
+            continue
         safe_name = clean_condition_name(condition)
         file_path = os.path.join("pubmed_html_pages", f"{safe_name}.html")
         with open(file_path, "w", encoding="utf-8") as f:
             f.write(page_html)
+        task.done(file_path, page_html, url=driver.current_url)
         print(f"[INFO] Saved HTML to '{file_path}'")
 
     except Exception as e:
         print(f"[ERROR] Failed to process '{condition}': {e}")
+        task.fail(e)
 
 driver.quit()
 print("\n✅ All done! Check the 'pubmed_html_pages' folder for saved pages.")
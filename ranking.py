@@ -0,0 +1,172 @@
+"""
+Shared BM25 ranking of search results, used by every scraper that picks a link.
+
+The scrapers used to count keywords in each title with their own lists and
+weights (3 or 5 points for the condition in the title). rank() scores all the
+candidate titles (and snippets, when there are any) of one results page in a
+single vectorized pass:
+
+    score = BM25(condition words) + KEYWORD_WEIGHT * BM25(rehab keywords)
+            + PHRASE_BOOST if the whole condition appears in the title
+
+IDF is computed over the candidates of the page itself, so a word that every
+result shares (the condition's own name, usually) weighs little and the
+keywords and the exact phrase decide. Keywords are matched as whole words or
+phrases ("physical therapy"), not substrings.
+
+    ranking = rank(condition, [r["text"] for r in results])   # [(index, score)], best first
+    best = results[ranking[0][0]]
+
+Stored search results can be re-ranked offline, without searching again:
+the candidate lists of search_cache.py, or else the results pages kept in
+page_cache.py, read with the site's "result_links" selector (sites.py).
+--position N compares the ranked choice with always taking the Nth result.
+
+    python ranking.py mnt "Rotator Cuff Tear" "Tendinitis"
+    python ranking.py spinehealth --top 3
+    python ranking.py verywellhealth --position 2
+"""
+import argparse
+import re
+from urllib.parse import urljoin
+
+import numpy as np
+
+from stage_timing import timed
+
+# The rehabilitation vocabulary the scrapers shared
+REHAB_KEYWORDS = [
+    "exercise", "exercises", "routine", "routines", "warm up", "stretch", "stretches",
+    "rehabilitation", "recovery", "treatment", "treatments", "therapy", "physical therapy",
+    "management", "mobility", "relief", "improve", "motion", "strengthen", "strength", "home care"
+]
+
+K1 = 1.2
+B = 0.75
+KEYWORD_WEIGHT = 0.5
+PHRASE_BOOST = 3.0
+SNIPPET_WEIGHT = 0.5
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokens(text: str) -> list:
+    return _WORD.findall((text or "").lower())
+
+
+def _counts(docs: list, terms: list) -> np.ndarray:
+    """(documents x terms) occurrences of each word or phrase, on token boundaries."""
+    padded = [f" {' '.join(doc)} " for doc in docs]
+    needles = [f" {' '.join(term)} " for term in terms]
+    return np.array([[_count(text, needle) for needle in needles] for text in padded], dtype=float).reshape(
+        len(docs), len(terms)
+    )
+
+
+def _count(text: str, needle: str) -> int:
+    # Phrases overlap on their boundary spaces, so count by hand instead of str.count
+    n = 0
+    start = text.find(needle)
+    while start != -1:
+        n += 1
+        start = text.find(needle, start + len(needle) - 1)
+    return n
+
+
+def bm25(tf: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """(documents x terms) BM25 contributions for a term-frequency matrix."""
+    n_docs = tf.shape[0]
+    df = (tf > 0).sum(axis=0)
+    idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+    norm = K1 * (1 - B + B * lengths / max(lengths.mean(), 1.0))
+    return idf * tf * (K1 + 1) / (tf + norm[:, None])
+
+
+def scores(condition: str, titles: list, snippets: list = None, keywords=REHAB_KEYWORDS) -> np.ndarray:
+    """Score of every candidate title (plus its snippet) for the condition."""
+    if not titles:
+        return np.zeros(0)
+    query = sorted(set(tokens(condition)))
+    vocabulary = [tokens(k) for k in keywords if tokens(k)]
+    terms = [[word] for word in query] + vocabulary
+    weights = np.array([1.0] * len(query) + [KEYWORD_WEIGHT] * len(vocabulary))
+
+    title_tokens = [tokens(t) for t in titles]
+    tf = _counts(title_tokens, terms)
+    lengths = np.array([len(t) for t in title_tokens], dtype=float)
+    if snippets:
+        snippet_tokens = [tokens(s) for s in snippets]
+        tf = tf + SNIPPET_WEIGHT * _counts(snippet_tokens, terms)
+        lengths = lengths + SNIPPET_WEIGHT * np.array([len(s) for s in snippet_tokens], dtype=float)
+
+    total = bm25(tf, lengths) @ weights
+    phrase = f" {' '.join(tokens(condition))} "
+    if phrase.strip():
+        total += PHRASE_BOOST * np.array([phrase in f" {' '.join(t)} " for t in title_tokens])
+    return total
+
+
+@timed("rank")
+def rank(condition: str, titles: list, snippets: list = None, keywords=REHAB_KEYWORDS) -> list:
+    """[(index, score)] of the candidates, best first; ties keep the page order."""
+    total = scores(condition, titles, snippets, keywords)
+    order = np.argsort(-total, kind="stable")
+    return [(int(i), float(total[i])) for i in order]
+
+
+# ------------------------------------------------------------ offline re-ranking
+
+def cached_candidates(site_name: str, condition: str) -> list:
+    """[{"text", "href", "snippet"}] of the latest stored search results of a condition."""
+    from html_parsing import make_soup
+    from page_cache import PageCache
+    from search_cache import SearchCache
+    from sites import get_site
+
+    candidates = SearchCache(site_name).get(condition)
+    if candidates is not None:
+        return candidates
+    selector = get_site(site_name).get("result_links")
+    cached = PageCache(site_name).get(condition, "results") if selector else None
+    if cached is None:
+        return []
+    url, html = cached
+    return [
+        {"text": a.get_text(" ", strip=True), "href": urljoin(url or "", a["href"]), "snippet": ""}
+        for a in make_soup(html).select(selector)
+        if a.get("href")
+    ]
+
+
+def main():
+    from page_cache import PageCache
+    from search_cache import SearchCache
+
+    parser = argparse.ArgumentParser(description="Re-rank stored search results without searching again.")
+    parser.add_argument("site")
+    parser.add_argument("conditions", nargs="*", help="Default: every condition with stored results")
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--position", type=int, help="Compare with always taking the result at this position")
+    args = parser.parse_args()
+
+    conditions = args.conditions or sorted(
+        set(SearchCache(args.site).queries()) | set(PageCache(args.site).conditions("results"))
+    )
+    ranked = differ = 0
+    for condition in conditions:
+        candidates = cached_candidates(args.site, condition)
+        print(f"\n{condition}: {len(candidates)} results")
+        if not candidates:
+            continue
+        ranking = rank(condition, [c["text"] for c in candidates], [c["snippet"] for c in candidates])
+        for i, score in ranking[:args.top]:
+            print(f"  {score:6.2f}  #{i + 1:<3} {candidates[i]['text'][:70]}  {candidates[i]['href']}")
+        if args.position:
+            ranked += 1
+            differ += ranking[0][0] != min(args.position, len(candidates)) - 1
+    if args.position:
+        print(f"\nRanked choice differs from result #{args.position} in {differ} of {ranked} conditions")
+
+
+if __name__ == "__main__":
+    main()
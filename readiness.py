@@ -0,0 +1,177 @@
+"""
+Event-driven readiness checks that replace the scrapers' fixed time.sleep pauses.
+
+Each site declares in sites.py, under "ready", what "loaded" means for every
+step of its flow (results page, article, search box...). A step is a list of
+predicates, all of which must hold:
+
+    "css selector"           an element matching the selector is present
+    "visible:css selector"   ... and displayed
+    "dom-complete"           document.readyState is "complete"
+    "network-idle"           no new network requests for QUIET_SECONDS
+    "mutation-quiet"         no DOM mutations for QUIET_SECONDS
+
+    wait_ready(driver, "pmc", "article", replaces=5)          # Selenium
+    await wait_ready_async(page, "hopkins", "article", replaces=1.5)   # Playwright
+
+`replaces` is the fixed sleep the call stands in for. Selectors may take up to
+READY_TIMEOUT, but the settle predicates (network-idle, mutation-quiet) never
+wait longer than the old sleep did, so a page that never goes quiet is no
+slower than before. Sleeps shorter than MIN_SETTLE_SECONDS are the exception:
+no page can be seen quiet for QUIET_SECONDS in less, so those wait that long.
+Waited vs. replaced time is summed per site and printed when the script exits.
+
+Politeness delays between conditions are not readiness: see pacing.py.
+"""
+import atexit
+import time
+from collections import defaultdict
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+import stage_timing
+from sites import get_site
+
+READY_TIMEOUT = 10
+QUIET_SECONDS = 0.5
+POLL_SECONDS = 0.1
+# Quiet for QUIET_SECONDS, plus the polls before and after the quiet period
+MIN_SETTLE_SECONDS = QUIET_SECONDS + 2 * POLL_SECONDS
+
+SETTLE_PREDICATES = ("network-idle", "mutation-quiet")
+
+# Installed once per document: remembers when the DOM last changed
+_MUTATION_OBSERVER_JS = """
+if (!window.__readyObserver) {
+    window.__lastMutation = performance.now();
+    window.__readyObserver = new MutationObserver(() => { window.__lastMutation = performance.now(); });
+    window.__readyObserver.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+return performance.now() - window.__lastMutation;
+"""
+
+# Time since the last resource entry started or finished loading
+_NETWORK_QUIET_JS = """
+const entries = performance.getEntriesByType('resource');
+let last = 0;
+for (const e of entries) { last = Math.max(last, e.responseEnd || e.startTime); }
+return performance.now() - last;
+"""
+
+_stats = defaultdict(lambda: {"steps": 0, "waited": 0.0, "replaced": 0.0, "timeouts": 0})
+
+
+def steps_for(site_name: str, step: str) -> list:
+    try:
+        return get_site(site_name)["ready"][step]
+    except KeyError:
+        raise KeyError(f"Site '{site_name}' has no readiness step '{step}' in sites.py") from None
+
+
+def _record(site_name: str, step: str, waited: float, replaces: float, timed_out: bool) -> None:
+    stage_timing.record(f"wait_{step}", waited, site_name, ok=not timed_out)
+    if not _stats:
+        atexit.register(print_report)
+    stats = _stats[site_name]
+    stats["steps"] += 1
+    stats["waited"] += waited
+    stats["replaced"] += replaces
+    stats["timeouts"] += timed_out
+
+
+def _split(predicate: str):
+    if predicate.startswith("visible:"):
+        return "visible", predicate[len("visible:"):]
+    if predicate in SETTLE_PREDICATES or predicate == "dom-complete":
+        return predicate, None
+    return "present", predicate
+
+
+# ---------------------------------------------------------------- Selenium
+
+def _selenium_condition(kind: str, selector: str):
+    if kind == "present":
+        return EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+    if kind == "visible":
+        return EC.visibility_of_element_located((By.CSS_SELECTOR, selector))
+    if kind == "dom-complete":
+        return lambda d: d.execute_script("return document.readyState") == "complete"
+    if kind == "mutation-quiet":
+        return lambda d: d.execute_script(_MUTATION_OBSERVER_JS) >= QUIET_SECONDS * 1000
+    return lambda d: d.execute_script(_NETWORK_QUIET_JS) >= QUIET_SECONDS * 1000
+
+
+def wait_ready(driver, site_name: str, step: str, replaces: float = 0, timeout: float = READY_TIMEOUT) -> bool:
+    """Waits until the step's predicates hold; returns False (without raising) on timeout."""
+    start = time.monotonic()
+    timed_out = False
+    for predicate in steps_for(site_name, step):
+        kind, selector = _split(predicate)
+        limit = max(replaces, MIN_SETTLE_SECONDS) if kind in SETTLE_PREDICATES else timeout
+        remaining = limit - (time.monotonic() - start)
+        try:
+            if remaining <= 0:
+                raise TimeoutException()
+            WebDriverWait(driver, remaining, poll_frequency=POLL_SECONDS).until(_selenium_condition(kind, selector))
+        except TimeoutException:
+            timed_out = True
+            if kind not in SETTLE_PREDICATES:
+                break
+    _record(site_name, step, time.monotonic() - start, replaces, timed_out)
+    return not timed_out
+
+
+# -------------------------------------------------------------- Playwright
+
+async def _playwright_wait(page, kind: str, selector: str, timeout_ms: float) -> None:
+    if kind in ("present", "visible"):
+        await page.wait_for_selector(selector, state="attached" if kind == "present" else "visible",
+                                     timeout=timeout_ms)
+    elif kind == "dom-complete":
+        await page.wait_for_load_state("load", timeout=timeout_ms)
+    elif kind == "network-idle":
+        await page.wait_for_load_state("networkidle", timeout=timeout_ms)
+    else:
+        await page.evaluate(f"() => {{ {_MUTATION_OBSERVER_JS} }}")
+        await page.wait_for_function(
+            f"() => performance.now() - window.__lastMutation >= {QUIET_SECONDS * 1000}",
+            polling=POLL_SECONDS * 1000, timeout=timeout_ms,
+        )
+
+
+async def wait_ready_async(page, site_name: str, step: str, replaces: float = 0,
+                           timeout: float = READY_TIMEOUT) -> bool:
+    """Playwright version of wait_ready()."""
+    from playwright.async_api import TimeoutError as PlaywrightTimeout
+
+    start = time.monotonic()
+    timed_out = False
+    for predicate in steps_for(site_name, step):
+        kind, selector = _split(predicate)
+        limit = max(replaces, MIN_SETTLE_SECONDS) if kind in SETTLE_PREDICATES else timeout
+        remaining = limit - (time.monotonic() - start)
+        try:
+            if remaining <= 0:
+                raise PlaywrightTimeout("no time left")
+            await _playwright_wait(page, kind, selector, remaining * 1000)
+        except PlaywrightTimeout:
+            timed_out = True
+            if kind not in SETTLE_PREDICATES:
+                break
+    _record(site_name, step, time.monotonic() - start, replaces, timed_out)
+    return not timed_out
+
+
+# ------------------------------------------------------------------ report
+
+def print_report() -> None:
+    if not _stats:
+        return
+    print("\n[⏱] Readiness waits vs. the fixed sleeps they replaced:")
+    for site_name, s in sorted(_stats.items()):
+        saved = s["replaced"] - s["waited"]
+        print(f"    {site_name:<16} {s['steps']:>5} waits  {s['waited']:>8.1f}s waited  "
+              f"{s['replaced']:>8.1f}s of sleeps  {saved:>8.1f}s saved  ({s['timeouts']} timeouts)")
@@ -0,0 +1,214 @@
+"""
+Network-level resource blocking shared by the Selenium and Playwright scrapers.
+
+None of the scrapers need images, video, web fonts, ads or analytics: they only
+read the HTML. Blocking those requests at the network layer makes page loads
+finish sooner and cuts the bandwidth spent per condition.
+
+    Selenium:    enable_request_log(options)            # before launching Chrome
+                 block_resources(driver, "nhs")         # CDP Network.setBlockedURLs
+                 report_blocked(driver, condition)      # after the condition's pages
+
+    Playwright:  blocker = PlaywrightBlocker("hopkins")
+                 run_in_contexts(..., setup_context=blocker.install)
+                 blocker.report(page, condition)
+
+What is blocked is DEFAULT_BLOCK, adjusted per site in sites.py:
+    "block": {"allow": [categories to keep loading],
+              "deny":  [extra categories or URL patterns to block]}
+
+URL patterns use the CDP wildcard syntax ("*" matches anything). Bytes saved are
+an estimate: a blocked request never reaches the network, so its size is taken
+from AVERAGE_BYTES for its category.
+"""
+import functools
+import json
+import re
+from collections import Counter
+
+import crawl_metrics
+from sites import get_site
+
+
+def _extensions(*exts) -> list:
+    # File extension at the end of the path, with or without a query string
+    # ("*.webm*" alone would also match www.webmd.com)
+    return [pattern for ext in exts for pattern in (f"*.{ext}", f"*.{ext}?*")]
+
+
+BLOCK_CATEGORIES = {
+    "images": _extensions("jpg", "jpeg", "png", "gif", "webp", "avif", "svg", "ico"),
+    "media": _extensions("mp4", "webm", "m3u8", "mp3") + ["*jwplayer*", "*jwpcdn.com*", "*brightcove*"],
+    "fonts": _extensions("woff", "woff2", "ttf", "otf", "eot") + ["*fonts.googleapis.com*", "*fonts.gstatic.com*",
+                                                                  "*use.typekit.net*"],
+    "stylesheets": _extensions("css"),
+    "ads": ["*doubleclick.net*", "*googlesyndication.com*", "*adservice.google.*", "*amazon-adsystem.com*",
+            "*taboola.com*", "*outbrain.com*", "*criteo.*", "*pubmatic.com*", "*rubiconproject.com*",
+            "*adnxs.com*", "*moatads.com*", "*casalemedia.com*", "*openx.net*", "*teads.tv*"],
+    "analytics": ["*google-analytics.com*", "*googletagmanager.com*", "*hotjar.com*", "*segment.io*",
+                  "*segment.com/analytics*", "*scorecardresearch.com*", "*chartbeat.*", "*quantserve.com*",
+                  "*nr-data.net*", "*connect.facebook.net*", "*clarity.ms*", "*optimizely.com*",
+                  "*mouseflow.com*"],
+}
+
+# Stylesheets stay on by default: some clicks wait for elements to be visible
+DEFAULT_BLOCK = ["images", "media", "fonts", "ads", "analytics"]
+
+# Playwright knows the resource type, which catches e.g. images served without extension
+RESOURCE_TYPES = {
+    "image": "images",
+    "media": "media",
+    "font": "fonts",
+    "stylesheet": "stylesheets",
+}
+
+# Rough median transfer size of one request per category, for the savings estimate
+AVERAGE_BYTES = {
+    "images": 40_000,
+    "media": 400_000,
+    "fonts": 30_000,
+    "stylesheets": 20_000,
+    "ads": 25_000,
+    "analytics": 20_000,
+    "custom": 20_000,
+}
+
+
+def block_profile(site_name: str) -> dict:
+    """{category: [url patterns]} to block for a site; extra deny patterns go under "custom"."""
+    block = get_site(site_name).get("block", {})
+    allow = set(block.get("allow", []))
+    profile = {name: BLOCK_CATEGORIES[name] for name in DEFAULT_BLOCK if name not in allow}
+
+    custom = []
+    for entry in block.get("deny", []):
+        if entry in BLOCK_CATEGORIES:
+            profile[entry] = BLOCK_CATEGORIES[entry]
+        else:
+            custom.append(entry)
+    if custom:
+        profile["custom"] = custom
+    return profile
+
+
+def blocked_patterns(site_name: str) -> list:
+    return [pattern for patterns in block_profile(site_name).values() for pattern in patterns]
+
+
+@functools.lru_cache(maxsize=None)
+def _compile(pattern: str):
+    # Same semantics as CDP: "*" is the only wildcard, "?" is a literal
+    return re.compile(".*".join(re.escape(part) for part in pattern.split("*")), re.DOTALL)
+
+
+def categorize(url: str, profile: dict):
+    """Category of the profile that blocks `url`, or None if it may load."""
+    for category, patterns in profile.items():
+        if any(_compile(pattern).fullmatch(url) for pattern in patterns):
+            return category
+    return None
+
+
+def estimate_bytes(blocked: Counter) -> int:
+    return sum(AVERAGE_BYTES.get(category, AVERAGE_BYTES["custom"]) * n for category, n in blocked.items())
+
+
+def _print_report(label: str, blocked: Counter) -> None:
+    if not blocked:
+        return
+    detail = ", ".join(f"{category} {n}" for category, n in blocked.most_common())
+    kb = estimate_bytes(blocked) / 1024
+    print(f"[🚫] {label}: {sum(blocked.values())} requests blocked ({detail}), ~{kb:.0f} KB saved")
+
+
+# ---------------------------------------------------------------- Selenium
+
+def enable_request_log(options) -> None:
+    """Turns on Chrome's performance log, which report_blocked() reads."""
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+def block_resources(driver, site_name: str) -> None:
+    """Blocks the site's profile for every later request of this Chrome session."""
+    driver._blocking_profile = block_profile(site_name)
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_patterns(site_name)})
+
+
+def blocked_requests(driver) -> Counter:
+    """
+    Requests blocked since the last call, per category. Reading the log drains
+    it, so each call covers only the pages loaded after the previous one; the
+    bytes received meanwhile go to crawl_metrics.
+    """
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        # Session launched without enable_request_log()
+        return Counter()
+
+    urls = {}
+    blocked_ids = []
+    received = 0
+    for entry in entries:
+        message = json.loads(entry["message"])["message"]
+        params = message.get("params", {})
+        if message["method"] == "Network.requestWillBeSent":
+            urls[params["requestId"]] = params["request"]["url"]
+        elif message["method"] == "Network.loadingFailed" and params.get("blockedReason") == "inspector":
+            blocked_ids.append(params["requestId"])
+        elif message["method"] == "Network.loadingFinished":
+            received += params.get("encodedDataLength", 0)
+    crawl_metrics.count("bytes_fetched", received)
+
+    profile = getattr(driver, "_blocking_profile", {})
+    return Counter(categorize(urls.get(rid, ""), profile) or "custom" for rid in blocked_ids)
+
+
+def report_blocked(driver, label: str) -> Counter:
+    blocked = blocked_requests(driver)
+    _print_report(label, blocked)
+    return blocked
+
+
+# -------------------------------------------------------------- Playwright
+
+class PlaywrightBlocker:
+    """Aborts blocked requests through context.route and counts them per context."""
+
+    def __init__(self, site_name: str):
+        self.profile = block_profile(site_name)
+        self._blocked = {}
+        self._received = Counter()
+
+    async def install(self, context) -> None:
+        counts = self._blocked.setdefault(id(context), Counter())
+
+        async def finished(request):
+            try:
+                sizes = await request.sizes()
+            except Exception:
+                return  # page closed meanwhile
+            self._received[id(context)] += sizes["responseBodySize"] + sizes["responseHeadersSize"]
+
+        async def handle(route, request):
+            category = RESOURCE_TYPES.get(request.resource_type)
+            if category not in self.profile:
+                category = categorize(request.url, self.profile)
+            if category:
+                counts[category] += 1
+                await route.abort("blockedbyclient")
+            else:
+                await route.continue_()
+
+        await context.route("**/*", handle)
+        context.on("requestfinished", finished)
+
+    def report(self, page, label: str) -> Counter:
+        """Requests blocked in the page's context since the last report."""
+        blocked = self._blocked.setdefault(id(page.context), Counter())
+        snapshot = Counter(blocked)
+        blocked.clear()
+        crawl_metrics.count("bytes_fetched", self._received.pop(id(page.context), 0))
+        _print_report(label, snapshot)
+        return snapshot
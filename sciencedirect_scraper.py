@@ -1,7 +1,5 @@
 import re
-import time
 import os
-import pandas as pd
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
@@ -10,18 +8,23 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
+from condition_catalog import load_conditions
+from crawl_manifest import Manifest
+from resource_blocking import block_resources, enable_request_log, report_blocked
+from readiness import wait_ready
+from page_cache import PageCache, replay_if_requested
 
 def clean_condition_name(name: str) -> str:
     return re.sub(r'[\\/*?:"<>|]', '_', name)
 
 # Load your CSV
-df = pd.read_csv("exercises.csv", encoding="utf-8")  
-all_conditions = []
-for row in df["Related Conditions"].dropna():
-    splitted = re.split(r"[/\n]+", row)
-    splitted = [c.strip() for c in splitted if c.strip()]
-    all_conditions.extend(splitted)
-all_conditions = list(set(all_conditions))
+all_conditions = load_conditions()
+# No browser needed to re-extract from page_cache: CRAWL_REPLAY=1
+replay_if_requested("sciencedirect", all_conditions)
+# Skip what earlier runs already finished (CRAWL_MODE, see crawl_manifest.py)
+manifest = Manifest("sciencedirect")
+all_conditions = manifest.select(all_conditions)
+cache = PageCache("sciencedirect")
 
 # Setup Selenium
 options = Options()
@@ -29,10 +32,12 @@ options = Options()
 options.add_argument("--disable-gpu")
 options.add_argument("--no-sandbox")
 
+enable_request_log(options)
 driver = webdriver.Chrome(
     service=Service(ChromeDriverManager().install()),
     options=options
 )
+block_resources(driver, "sciencedirect")
 wait = WebDriverWait(driver, 15)
 
 base_url = "https://www.sciencedirect.com/#open-access"
@@ -40,10 +45,11 @@ os.makedirs("sciencedirect_html_pages", exist_ok=True)
 
 for condition in all_conditions:
     print(f"\n[INFO] Searching: '{condition}'")
+    task = manifest.start(condition)
 
     try:
         driver.get(base_url)
-        time.sleep(2)
+        wait_ready(driver, "sciencedirect", "home", replaces=2)
 
         # Accept cookie banner (first one)
         try:
@@ -52,7 +58,7 @@ for condition in all_conditions:
             )
             cookie_btn.click()
             print("[INFO] Accepted first cookie banner.")
-            time.sleep(1)
+            wait_ready(driver, "sciencedirect", "consent", replaces=1)
         except:
             print("[INFO] First cookie banner not found.")
 
@@ -71,7 +77,7 @@ for condition in all_conditions:
             )
             cookie_btn.click()
             print("[INFO] Accepted second cookie banner.")
-            time.sleep(1)
+            wait_ready(driver, "sciencedirect", "consent", replaces=1)
         except:
             print("[INFO] Second cookie banner not found.")
 
@@ -84,7 +90,7 @@ for condition in all_conditions:
             org_input_box.clear()
             org_input_box.send_keys("Medtronic")
             org_input_box.send_keys(Keys.ENTER)
-            time.sleep(4)  # Adjust if needed
+            wait_ready(driver, "sciencedirect", "results", replaces=4)
         except:
             try:
                 close_btn = driver.find_element(By.ID, "bdd-els-close")
@@ -96,25 +102,33 @@ for condition in all_conditions:
         # Get first search result
         try:
             result_link = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "a.anchor.result-list-title-link")))
+            cache.put(condition, "results", driver.current_url, driver.page_source)
             href = result_link.get_attribute("href")
             print(f"[INFO] Clicking result: {href}")
             result_link.click()
         except:
             print(f"[WARNING] No results found for '{condition}'. Skipping.")
+            task.skip("no results")
             continue
 
         # Save page content
         wait.until(EC.visibility_of_element_located((By.TAG_NAME, "h1")))
-        time.sleep(2)
+        wait_ready(driver, "sciencedirect", "article", replaces=2)
+        report_blocked(driver, condition)
         page_html = driver.page_source
+        cache.put(condition, "article", driver.current_url, page_html)
+        if cache.fetch_only(task, driver.current_url):
+            continue
         safe_name = clean_condition_name(condition)
         file_path = os.path.join("sciencedirect_html_pages", f"{safe_name}.html")
         with open(file_path, "w", encoding="utf-8") as f:
             f.write(page_html)
+        task.done(file_path, page_html, url=driver.current_url)
         print(f"[INFO] Saved HTML to '{file_path}'")
 
     except Exception as e:
         print(f"[ERROR] Issue processing '{condition}': {e}")
+        task.fail(e)
 
 driver.quit()
 print("\n[INFO] All done! Check the 'sciencedirect_html_pages' folder.")
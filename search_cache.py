@@ -0,0 +1,150 @@
+"""
+Search-result candidate lists, kept per (site, query) with a TTL.
+
+Besides the raw results page (page_cache.py), every scraper that ranks or
+picks a search result stores the candidates it saw as structured records:
+position on the page, title, resolved href and snippet (when the site has
+one). Re-ranking, top-k selection and link-choice experiments then run over
+these records in seconds instead of searching every condition again:
+
+    searches = SearchCache("mnt")
+    searches.put(condition, collect_links(driver, "a.gs-title"))
+    searches.get(condition)     # latest list younger than the TTL, or None
+
+Lists older than SEARCH_TTL_DAYS (default 30) are ignored by get() and
+removed by purge(). They live in page_cache/index.sqlite next to the pages.
+
+    python search_cache.py stats
+    python search_cache.py show mnt "Rotator Cuff Tear"
+    python search_cache.py purge
+    python ranking.py mnt --position 2     # link-choice experiment
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from page_cache import CACHE_DIR
+
+TTL_ENV = "SEARCH_TTL_DAYS"
+DEFAULT_TTL_DAYS = 30
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_results (
+    site TEXT NOT NULL,
+    query TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    rank INTEGER NOT NULL,
+    title TEXT,
+    href TEXT,
+    snippet TEXT,
+    PRIMARY KEY (site, query, fetched_at, rank)
+);
+"""
+
+
+def ttl_seconds() -> float:
+    return float(os.environ.get(TTL_ENV) or DEFAULT_TTL_DAYS) * 86400
+
+
+def _connect(cache_dir: str) -> sqlite3.Connection:
+    os.makedirs(cache_dir, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), timeout=60, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+class SearchCache:
+    def __init__(self, site_name: str, cache_dir: str = CACHE_DIR, ttl: float = None):
+        self.site = site_name
+        self.ttl = ttl if ttl is not None else ttl_seconds()
+        self._lock = threading.Lock()
+        self._conn = _connect(cache_dir)
+
+    def put(self, query: str, candidates: list, fetched_at: float = None) -> None:
+        """Stores a results page's candidates ({"text", "href", "snippet"} dicts, in page order)."""
+        fetched_at = fetched_at or time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO search_results (site, query, fetched_at, rank, title, href, snippet) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (self.site, query, fetched_at, rank, c.get("text"), c.get("href"), c.get("snippet") or None)
+                    for rank, c in enumerate(candidates, 1)
+                ],
+            )
+
+    def _latest(self, query: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(fetched_at) FROM search_results WHERE site = ? AND query = ?", (self.site, query)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get(self, query: str):
+        """[{"rank", "text", "href", "snippet"}] of the latest list within the TTL, or None."""
+        fetched_at = self._latest(query)
+        if fetched_at is None or time.time() - fetched_at > self.ttl:
+            return None
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT rank, title, href, snippet FROM search_results "
+                "WHERE site = ? AND query = ? AND fetched_at = ? ORDER BY rank",
+                (self.site, query, fetched_at),
+            ).fetchall()
+        return [{"rank": rank, "text": title or "", "href": href, "snippet": snippet or ""}
+                for rank, title, href, snippet in rows]
+
+    def queries(self) -> list:
+        """Queries with a list within the TTL."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT query FROM search_results WHERE site = ? AND fetched_at >= ?",
+                (self.site, time.time() - self.ttl),
+            ).fetchall()
+        return sorted(query for (query,) in rows)
+
+
+def purge(cache_dir: str = CACHE_DIR, ttl: float = None) -> int:
+    """Deletes the lists older than the TTL; returns the number of records removed."""
+    cutoff = time.time() - (ttl if ttl is not None else ttl_seconds())
+    conn = _connect(cache_dir)
+    try:
+        with conn:
+            return conn.execute("DELETE FROM search_results WHERE fetched_at < ?", (cutoff,)).rowcount
+    finally:
+        conn.close()
+
+
+def stats(cache_dir: str = CACHE_DIR) -> list:
+    """[(site, queries, lists, records, fresh queries)]."""
+    cutoff = time.time() - ttl_seconds()
+    conn = _connect(cache_dir)
+    try:
+        return conn.execute(
+            "SELECT site, COUNT(DISTINCT query), COUNT(DISTINCT query || ' ' || fetched_at), COUNT(*), "
+            "COUNT(DISTINCT CASE WHEN fetched_at >= ? THEN query END) "
+            "FROM search_results GROUP BY site ORDER BY site",
+            (cutoff,),
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    command, names = (sys.argv[1], sys.argv[2:]) if len(sys.argv) > 1 else ("stats", [])
+    if command == "stats":
+        for site, queries, lists, records, fresh in stats():
+            print(f"{site:<16} {queries:>6} queries {lists:>6} lists {records:>7} results {fresh:>6} fresh")
+    elif command == "show" and names:
+        searches = SearchCache(names[0])
+        for query in names[1:] or searches.queries():
+            print(f"\n{query}")
+            for c in searches.get(query) or []:
+                print(f"  #{c['rank']:<3} {c['text'][:70]}  {c['href']}")
+    elif command == "purge":
+        print(f"Removed {purge()} expired search results")
+    else:
+        sys.exit("usage: python search_cache.py [stats | show site [query ...] | purge]")
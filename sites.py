@@ -0,0 +1,332 @@
+"""
+Registry of the site adapters.
+
+Each entry describes one site: the standalone script that scrapes it, the host
+it talks to, the folder it writes to, the browser engine it drives and how many
+copies of it may hit the host at the same time.
+
+"search_url" is the results-page URL template for the site ({query} is the
+URL-encoded condition). Scrapers open it directly instead of loading the
+homepage and typing into the search box; sites without one keep the UI flow.
+
+"http" marks sites whose pages are rendered server-side, so http_engine.py can
+fetch them without a browser: the CSS selector of the result links, the
+selector that proves the article content is in the HTML, and optionally a
+separate search URL and a link to follow from the article page.
+
+"block" adjusts the network blocking profile of resource_blocking.py: "allow"
+lists categories the site needs to load, "deny" extra categories or URL
+patterns to block on top of the defaults.
+
+"ready" lists, per step of the scraper's flow, the predicates readiness.py
+waits for instead of a fixed sleep; "min_interval" is the starting pause
+between conditions for sites that rate-limit, which pacing.py then adapts to
+what the host tolerates.
+
+"content_root" is the one container the site's extractor reads; only that
+subtree of the page is parsed (html_parsing.make_soup), as a simple "tag#id",
+"tag.class" or "tag[attr='value']" selector.
+
+"result_links" selects the search results the scraper ranks (ranking.py), so
+cached results pages can be re-ranked offline.
+"""
+from urllib.parse import quote_plus
+
+SITES = {
+    "clevelandclinic": {
+        "script": "clevelandclinic_scraper_updated.py",
+        "host": "my.clevelandclinic.org",
+        "output_dir": "clevelandclinic_html_pages",
+        "content_root": "div[data-identity='main-article-content']",
+        "engine": "selenium",
+        "ready": {
+            "home": ["#search-input"],
+            "article": ["div[data-identity='main-article-content']", "mutation-quiet"],
+        },
+        "max_concurrency": 2,
+    },
+    "healthline": {
+        "script": "healthline_scraping_updated.py",
+        "host": "www.healthline.com",
+        "output_dir": "healthline_html_pages",
+        "search_url": "https://www.healthline.com/search?q1={query}",
+        "engine": "selenium",
+        "max_concurrency": 2,
+    },
+    "hopkins": {
+        "script": "hopkins_scraper.py",
+        "host": "www.hopkinsmedicine.org",
+        "output_dir": "hopkins_html_pages",
+        "engine": "playwright",
+        "ready": {
+            "home": ["button.toggle-ent-search.search-icon", "mutation-quiet"],
+            "results": ["a.search-results-title"],
+            "article": ["h1", "mutation-quiet"],
+        },
+        "max_concurrency": 2,
+    },
+    "hss": {
+        "script": "hss_scraper_updated.py",
+        "host": "www.hss.edu",
+        "output_dir": "hss_text_pages",
+        "engine": "selenium",
+        "ready": {
+            "home": ["input.st-default-search-input"],
+            "typed": ["mutation-quiet"],
+            "results": ["div.st-search-results a", "mutation-quiet"],
+            "scrolled": ["mutation-quiet"],
+            "article": ["visible:h1", "mutation-quiet"],
+        },
+        "min_interval": 4,
+        "max_concurrency": 2,
+    },
+    "mayoclinic": {
+        "script": "mayoclinic_scraper_updated.py",
+        "host": "www.mayoclinic.org",
+        "output_dir": "mayo_clean_pages",
+        "result_links": "a.azsearchlink",
+        "content_root": "article#main-content",
+        "search_url": "https://www.mayoclinic.org/search/search-results?q={query}",
+        "engine": "selenium",
+        "ready": {
+            "article": ["article#main-content", "mutation-quiet"],
+        },
+        "max_concurrency": 2,
+    },
+    "medscape": {
+        "script": "medscape_scraper_updated.py",
+        "host": "www.medscape.com",
+        "output_dir": "medscape_text_pages",
+        "engine": "selenium",
+        "ready": {
+            "home": ["#search-input"],
+            "article": ["dom-complete", "mutation-quiet"],
+        },
+        "min_interval": 1,
+        "max_concurrency": 1,
+        # Needs a manual login, so it only runs when asked for by name
+        "interactive": True,
+    },
+    "mnt": {
+        "script": "mnt_scraper_updated.py",
+        "host": "www.medicalnewstoday.com",
+        "output_dir": "mnt_txt_debug",
+        "result_links": "a.gs-title",
+        "search_url": "https://www.medicalnewstoday.com/search?q={query}",
+        "engine": "selenium",
+        "ready": {
+            "home": ["dom-complete"],
+            "consent": ["mutation-quiet"],
+            "search-open": ["input[name='q']"],
+            "results": ["a.gs-title, div.gs-no-results-result, iframe[src*='recaptcha']", "mutation-quiet"],
+            "article": ["visible:h1", "mutation-quiet"],
+        },
+        # Serves reCAPTCHA quickly when hit in parallel
+        "max_concurrency": 1,
+    },
+    "nhs": {
+        "script": "nhs_scraping_updated.py",
+        "host": "www.nhs.uk",
+        "output_dir": "nhs_text_pages",
+        "search_url": "https://www.nhs.uk/search/results?q={query}",
+        "engine": "selenium",
+        "ready": {
+            "page": ["dom-complete"],
+            "consent": ["mutation-quiet"],
+            "article": ["visible:h1", "mutation-quiet"],
+        },
+        "http": {
+            "results": "ul.nhsuk-list li.nhsuk-list-item--border h2.nhsuk-heading-xs a",
+            "content": "main",
+        },
+        "max_concurrency": 3,
+    },
+    "orthobullets": {
+        "script": "orthobullets_scraper_updated.py",
+        "host": "www.orthobullets.com",
+        "output_dir": "orthobullets_txt",
+        "engine": "selenium",
+        "ready": {
+            "scrolled": ["mutation-quiet"],
+            "article": ["h1", "mutation-quiet"],
+        },
+        "max_concurrency": 2,
+    },
+    "orthoinfo": {
+        "script": "orthoinfo_scraper_updated.py",
+        "host": "orthoinfo.aaos.org",
+        "output_dir": "orthoinfo_clean_texts",
+        "content_root": "div.article-col",
+        "engine": "selenium",
+        "ready": {
+            "home": ["input[type='search']"],
+            "article": ["div.article-col", "mutation-quiet"],
+        },
+        "http": {
+            # Falls back to the browser if the results turn out to be rendered client-side
+            "search_url": "https://orthoinfo.aaos.org/search?q={query}",
+            "results": "a.article-list-item.search-listing-item",
+            "content": "div.article-col",
+        },
+        "max_concurrency": 2,
+    },
+    "physiopedia": {
+        "script": "physiopedia_scraping_updated.py",
+        "host": "www.physio-pedia.com",
+        "output_dir": "physiopedia_html_pages",
+        "content_root": "div.mw-parser-output",
+        "engine": "selenium",
+        "ready": {
+            "results": ["a.st-ui-result, .st-ui-no-results"],
+            "article": ["div.mw-parser-output"],
+        },
+        "min_interval": (1.5, 2.5),
+        "http": {
+            # MediaWiki search: server-rendered, and jumps straight to the article on an exact title match
+            "search_url": "https://www.physio-pedia.com/index.php?search={query}",
+            "results": "div.mw-search-result-heading a",
+            "content": "div.mw-parser-output",
+        },
+        "max_concurrency": 2,
+    },
+    "physiotutors": {
+        "script": "physiotutors_playwright_scraper.py",
+        "host": "www.physiotutors.com",
+        "output_dir": "physiotutors_txt_playwright",
+        "search_url": "https://www.physiotutors.com/?s={query}",
+        "engine": "playwright",
+        "ready": {
+            "page": ["dom-complete"],
+            "results": ["a.s-site-search__post-link"],
+            "article": ["main, div.post-content", "mutation-quiet"],
+        },
+        "max_concurrency": 2,
+    },
+    "pmc": {
+        "script": "pmc_scraper_updated.py",
+        "host": "pmc.ncbi.nlm.nih.gov",
+        "output_dir": "downloads_pmc",
+        "result_links": "a.view[href*='/articles/PMC']",
+        "content_root": "div#maincontent",
+        "search_url": "https://pmc.ncbi.nlm.nih.gov/search/?term={query}",
+        "engine": "selenium",
+        "ready": {
+            "home": ["#pmc-search"],
+            "results": ["a.view[href*='/articles/PMC']"],
+            "article": ["h1", "dom-complete"],
+        },
+        "http": {
+            "results": "a.view[href*='/articles/PMC']",
+            "content": "h1",
+        },
+        "max_concurrency": 3,
+    },
+    "pubmed": {
+        "script": "pubmed_scraper.py",
+        "host": "pubmed.ncbi.nlm.nih.gov",
+        "output_dir": "pubmed_html_pages",
+        "search_url": "https://pubmed.ncbi.nlm.nih.gov/?term={query}",
+        "engine": "selenium",
+        "ready": {
+            "article": ["h1", "dom-complete"],
+            "fulltext": ["dom-complete", "mutation-quiet"],
+        },
+        "http": {
+            "results": "a.docsum-title",
+            # Free full text (PMC) replaces the abstract page when there is one
+            "follow": "a.link-item[href*='fulltext'], a.link-item[href*='pmc']",
+            "content": "h1",
+        },
+        "max_concurrency": 3,
+    },
+    "sciencedirect": {
+        "script": "sciencedirect_scraper.py",
+        "host": "www.sciencedirect.com",
+        "output_dir": "sciencedirect_html_pages",
+        "engine": "selenium",
+        "ready": {
+            "home": ["#qs"],
+            "consent": ["mutation-quiet"],
+            "results": ["a.anchor.result-list-title-link"],
+            "article": ["visible:h1", "mutation-quiet"],
+        },
+        "max_concurrency": 1,
+    },
+    "spinehealth": {
+        "script": "spine_health_scraper_updated.py",
+        "host": "www.spine-health.com",
+        "output_dir": "spinehealth_txt",
+        "result_links": "div.gs-title a",
+        "search_url": "https://www.spine-health.com/search?keys={query}",
+        "engine": "selenium",
+        "ready": {
+            "results": ["div.gs-title a, div.gs-no-results-result, iframe[src*='recaptcha']", "mutation-quiet"],
+            "article": ["div.main-content", "mutation-quiet"],
+        },
+        "min_interval": (3.5, 6),
+        # Shows a CAPTCHA when hit in parallel
+        "max_concurrency": 1,
+    },
+    "sportdoctor": {
+        "script": "sportdoctor_scraper_updated.py",
+        "host": "sportdoctorlondon.com",
+        "output_dir": "sportdoctor_txt_fast",
+        "search_url": "https://sportdoctorlondon.com/?s={query}",
+        "engine": "selenium",
+        "max_concurrency": 2,
+    },
+    "sportsinjury": {
+        "script": "sportsinjury_scraper_updated.py",
+        "host": "www.sportsinjuryclinic.net",
+        "output_dir": "sportsinjury_txt",
+        "result_links": "p.ast-blog-single-element.ast-read-more-container.read-more > a",
+        "search_url": "https://www.sportsinjuryclinic.net/?s={query}",
+        "engine": "selenium",
+        "ready": {
+            "page": ["dom-complete"],
+            "results": ["p.read-more > a, section.no-results"],
+            "article": ["article", "mutation-quiet"],
+        },
+        "max_concurrency": 2,
+    },
+    "verywellhealth": {
+        "script": "verywellhealth_scraper_updated.py",
+        "host": "www.verywellhealth.com",
+        "output_dir": "verywellhealth_txt",
+        "search_url": "https://www.verywellhealth.com/search?q={query}",
+        "engine": "selenium",
+        "ready": {
+            "results": ["li.search-result-list-item a", "mutation-quiet"],
+            "article": ["main", "mutation-quiet"],
+        },
+        "min_interval": 2,
+        "max_concurrency": 2,
+    },
+    "webmd": {
+        "script": "webmd_scraper_updated.py",
+        "host": "www.webmd.com",
+        "output_dir": "webmd_pages_clean",
+        "search_url": "https://www.webmd.com/search/search_results/default.aspx?query={query}",
+        "engine": "selenium",
+        # Parsed straight from the DOM, so the stylesheets are not needed either
+        "block": {"deny": ["stylesheets"]},
+        # The script already fans out over its own Pool
+        "max_concurrency": 1,
+    },
+}
+
+
+def get_site(name: str) -> dict:
+    """Returns the registry entry for a site, with a clear error for typos."""
+    try:
+        return SITES[name]
+    except KeyError:
+        raise KeyError(f"Unknown site '{name}'. Known sites: {', '.join(sorted(SITES))}") from None
+
+
+def search_url(name: str, condition: str):
+    """Results-page URL for a condition, or None if the site only has a search box."""
+    template = get_site(name).get("search_url")
+    if not template:
+        return None
+    return template.format(query=quote_plus(condition))
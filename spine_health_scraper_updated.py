@@ -1,104 +1,128 @@
 import os
-import re
-import time
-import random
-import pandas as pd
-from bs4 import BeautifulSoup
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-
-KEYWORDS = [
-    "exercise", "exercises", "routine", "routines", "warm up", "stretch", "stretches",
-    "rehabilitation", "recovery", "treatment", "treatments", "therapy", "physical therapy",
-    "management", "mobility", "relief", "improve", "motion", "strengthen", "strength",
-    "home care", "treating", "healing", "recovering", "plan", "reduce", "back pain", "rehab"
-]
-
-def clean_condition_name(name: str) -> str:
-    return re.sub(r'[\\/*?:"<>|]', '_', name)
+from condition_catalog import load_conditions
+from crawl_manifest import Manifest
+from sites import search_url
+from resource_blocking import block_resources, enable_request_log, report_blocked
+from readiness import wait_ready
+from pacing import Pacer
+from extractors import extract_spinehealth, output_path
+from page_cache import PageCache, replay_if_requested
+from search_cache import SearchCache
+from url_index import UrlIndex
+from dom_batch import collect_links
+from ranking import REHAB_KEYWORDS, rank
+from driver_pool import DriverPool, launch_chrome
+from stage_timing import stage
+
+KEYWORDS = REHAB_KEYWORDS + ["treating", "healing", "recovering", "plan", "reduce", "back pain", "rehab"]
 
 # Load conditions
-df = pd.read_csv("exercises.csv", encoding="utf-8")
-all_conditions = set()
-for row in df["Related Conditions"].dropna():
-    all_conditions.update([x.strip() for x in re.split(r"[/\n]+", row) if x.strip()])
-all_conditions = list(all_conditions)
+all_conditions = load_conditions()
+# No browser needed to re-extract from page_cache: CRAWL_REPLAY=1
+replay_if_requested("spinehealth", all_conditions)
+# Skip what earlier runs already finished (CRAWL_MODE, see crawl_manifest.py)
+manifest = Manifest("spinehealth")
+all_conditions = manifest.select(all_conditions)
+cache = PageCache("spinehealth")
+searches = SearchCache("spinehealth")
+urls = UrlIndex("spinehealth")
 
 # Setup Selenium
-options = Options()
-options.add_argument("--disable-gpu")
-options.add_argument("--no-sandbox")
-# options.add_argument("--headless")  # Optional
-driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-wait = WebDriverWait(driver, 12)
+def launch_browser():
+    options = Options()
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    # options.add_argument("--headless")  # Optional
+    enable_request_log(options)
+    driver = launch_chrome(options)
+    block_resources(driver, "spinehealth")
+    return driver
+
+BASE_URL = "https://www.spine-health.com"
+
+# Accept the cookie banner once per browser session, recycled ones included
+def accept_consent(driver):
+    driver.get(BASE_URL)
+    try:
+        consent_btn = WebDriverWait(driver, 5).until(
+            EC.element_to_be_clickable((By.CSS_SELECTOR, "button.fc-button.fc-cta-consent.fc-primary-button"))
+        )
+        consent_btn.click()
+        print("✅ Cookie banner accepted.")
+    except:
+        print("ℹ️ No cookie banner found or already accepted.")
+
+# Recycled when its memory use or failure rate grows (driver_pool.py)
+driver_pool = DriverPool(launch_browser, warmup=accept_consent)
+driver_pool.fill()
 
 output_dir = "spinehealth_txt"
 os.makedirs(output_dir, exist_ok=True)
 
+# Pausa mínima entre condiciones: el sitio saca CAPTCHA si se va rápido (min_interval en sites.py)
+pacer = Pacer("spinehealth")
+
 for idx, condition in enumerate(all_conditions, 1):
+    pacer.wait()
     print(f"\n🔍 Searching: {condition} ({idx}/{len(all_conditions)})")
+    task = manifest.start(condition)
+    driver = driver_pool.checkout()
+    wait = WebDriverWait(driver, 12)
     try:
-        driver.get("https://www.spine-health.com")
-
-        # Accept cookie banner if it's the first load
-        if idx == 1:
-            try:
-                consent_btn = WebDriverWait(driver, 5).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, "button.fc-button.fc-cta-consent.fc-primary-button"))
-                )
-                consent_btn.click()
-                print("✅ Cookie banner accepted.")
-            except:
-                print("ℹ️ No cookie banner found or already accepted.")
-
-        # Open search
-        search_icon = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button#edit-submit")))
-        search_icon.click()
-
-        # Input search term
-        search_input = wait.until(EC.presence_of_element_located((By.ID, "edit-keys")))
-        search_input.clear()
-        search_input.send_keys(condition)
-        search_input.send_keys(Keys.ENTER)
-
-        time.sleep(5)
+        # Go straight to the results page when possible
+        results_url = search_url("spinehealth", condition)
+        with stage("search_submit" if results_url else "home_load"):
+            driver.get(results_url or BASE_URL)
+
+        if not results_url:
+            # Open search
+            with stage("search_submit"):
+                search_icon = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button#edit-submit")))
+                search_icon.click()
+
+                # Input search term
+                search_input = wait.until(EC.presence_of_element_located((By.ID, "edit-keys")))
+                search_input.clear()
+                search_input.send_keys(condition)
+                search_input.send_keys(Keys.ENTER)
+
+        wait_ready(driver, "spinehealth", "results", replaces=5)
 
         # Check for CAPTCHA
         try:
             captcha = driver.find_element(By.CSS_SELECTOR, "iframe[src*='recaptcha']")
             if captcha.is_displayed():
                 print("🛑 CAPTCHA detected. Solve manually.")
+                pacer.throttled("CAPTCHA")
                 input("Press ENTER once CAPTCHA is solved...")
         except:
             pass
 
         # Rank search results
-        results = driver.find_elements(By.CSS_SELECTOR, "div.gs-title a")
-        best_match = None
-        best_score = -1
-        for r in results:
-            title = r.text.lower()
-            score = sum(1 for kw in KEYWORDS if kw in title)
-            if condition.lower() in title:
-                score += 5
-            if score > best_score:
-                best_match = r
-                best_score = score
+        results = collect_links(driver, "div.gs-title a", container="div.gsc-webResult")
+        cache.put(condition, "results", driver.current_url, driver.page_source)
+        searches.put(condition, results)
+        ranking = rank(condition, [r["text"] for r in results], [r["snippet"] for r in results], keywords=KEYWORDS)
+        best_match = results[ranking[0][0]] if ranking else None
 
         if not best_match:
             print("❌ No relevant result found.")
+            task.skip("no relevant result")
             continue
 
-        href = best_match.get_attribute("href")
-        driver.get(href)
+        href = best_match["href"]
+        # Same page already saved for another condition: link it instead of fetching again
+        if urls.reuse(task, href):
+            continue
+        with stage("article_load"):
+            driver.get(href)
         print(f"🔗 Opening: {href}")
-        time.sleep(4)
+        wait_ready(driver, "spinehealth", "article", replaces=4)
 
         # Close ad popup
         try:
@@ -110,23 +134,29 @@ for idx, condition in enumerate(all_conditions, 1):
             pass
 
         # Parse and extract clean text
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        for tag in soup(["script", "style", "img", "video", "iframe", "header", "footer", "nav"]):
-            tag.decompose()
-
-        main = soup.find("div", class_="main-content")
-        text = main.get_text(separator="\n", strip=True) if main else soup.get_text()
+        report_blocked(driver, condition)
+        html = driver.page_source
+        cache.put(condition, "article", driver.current_url, html)
+        if cache.fetch_only(task, driver.current_url):
+            continue
+        text = extract_spinehealth(html, condition)
 
         # Save as .txt
-        filename = clean_condition_name(condition) + ".txt"
-        with open(os.path.join(output_dir, filename), "w", encoding="utf-8") as f:
+        file_path = output_path("spinehealth", condition)
+        with stage("write"), open(file_path, "w", encoding="utf-8") as f:
             f.write(text)
 
-        print(f"✅ Saved: {filename}")
-        time.sleep(random.uniform(3.5, 6))
+        task.done(file_path, text, url=driver.current_url)
+        urls.record(condition, href, driver.current_url, file_path)
+        pacer.success()
+        print(f"✅ Saved: {os.path.basename(file_path)}")
 
     except Exception as e:
         print(f"❌ Error with '{condition}': {e}")
+        task.fail(e)
+        pacer.failed(e)
+    finally:
+        driver_pool.checkin(driver, failed=task.status == "failed")
 
-driver.quit()
+driver_pool.close()
 print("\n🏁 All done! Files saved in 'spinehealth_txt'")
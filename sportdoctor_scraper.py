@@ -1,7 +1,6 @@
 import os
 import re
 import time
-import pandas as pd
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
@@ -10,16 +9,13 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
+from condition_catalog import load_conditions
 
 def clean_condition_name(name: str) -> str:
     return re.sub(r'[\\/*?:"<>|]', '_', name)
 
 # Load conditions from CSV
-df = pd.read_csv("exercises.csv", encoding="utf-8")
-all_conditions = []
-for row in df["Related Conditions"].dropna():
-    all_conditions.extend([c.strip() for c in re.split(r"[/\n]+", row) if c.strip()])
-all_conditions = list(set(all_conditions))  # remove duplicates
+all_conditions = load_conditions()
 
 # Output folder
 output_folder = "sportdoctor_html_pages"
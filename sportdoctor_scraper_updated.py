@@ -1,19 +1,18 @@
 import os
-import re
 import time
 import random
-import pandas as pd
-from bs4 import BeautifulSoup
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-
-def clean_filename(name):
-    return re.sub(r'[\\/*?:"<>|]', "_", name.strip())
+from condition_catalog import load_conditions
+from crawl_manifest import Manifest
+from driver_pool import DriverPool, launch_chrome
+from sites import search_url
+from resource_blocking import block_resources, enable_request_log, report_blocked
+from extractors import extract_sportdoctor, output_path
+from page_cache import PageCache, replay_if_requested
+from stage_timing import stage
 
 def start_browser():
     options = Options()
@@ -21,95 +20,106 @@ def start_browser():
     options.add_argument("--no-sandbox")
     options.add_argument("--headless=new")  # Más rápido que el viejo headless
     options.add_argument("--window-size=1920,1080")
-    options.add_experimental_option("prefs", {
-        "profile.managed_default_content_settings.images": 2,
-        "profile.managed_default_content_settings.stylesheets": 1,
-        "profile.managed_default_content_settings.fonts": 2,
-    })
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    wait = WebDriverWait(driver, 8)
-    return driver, wait
+    # Imágenes, fuentes, anuncios y analítica se bloquean por red (resource_blocking)
+    enable_request_log(options)
+    driver = launch_chrome(options)
+    block_resources(driver, "sportdoctor")
+    return driver
 
 # Leer CSV
-df = pd.read_csv("exercises.csv", encoding="utf-8")
-conditions = []
-for row in df["Related Conditions"].dropna():
-    parts = re.split(r"[/\n]+", row)
-    conditions.extend([p.strip() for p in parts if p.strip()])
-conditions = list(set(conditions))
+conditions = load_conditions()
+# Sin navegador: re-extraer desde page_cache con CRAWL_REPLAY=1
+replay_if_requested("sportdoctor", conditions)
+# Saltar lo que ya terminaron ejecuciones anteriores (CRAWL_MODE, ver crawl_manifest.py)
+manifest = Manifest("sportdoctor")
+conditions = manifest.select(conditions)
+cache = PageCache("sportdoctor")
 
 # Configuración
 output_dir = "sportdoctor_txt_fast"
 os.makedirs(output_dir, exist_ok=True)
 BASE_URL = "https://sportdoctorlondon.com/"
-RESTART_BROWSER_EVERY = 25
 
-# Iniciar navegador
-driver, wait = start_browser()
+def accept_cookies(driver):
+    driver.get(BASE_URL)
+    try:
+        cookie_btn = WebDriverWait(driver, 3).until(
+            EC.element_to_be_clickable((By.CSS_SELECTOR, "div.sc-knesRu.ePGZca.amc-focus-first"))
+        )
+        cookie_btn.click()
+    except:
+        pass
+
+# Iniciar navegador (se recicla si crece su memoria o su tasa de errores, ver driver_pool.py)
+driver_pool = DriverPool(start_browser, size=1, warmup=accept_cookies)
+driver_pool.fill()
 
 for i, condition in enumerate(conditions):
     print(f"\n🔍 Searching: {condition} ({i+1}/{len(conditions)})")
+    task = manifest.start(condition)
 
-    # Reiniciar navegador cada X condiciones
-    if i > 0 and i % RESTART_BROWSER_EVERY == 0:
-        print("🔁 Restarting browser to stay fresh...")
-        try: driver.quit()
-        except: pass
-        driver, wait = start_browser()
+    driver = driver_pool.checkout()
+    wait = WebDriverWait(driver, 8)
 
     try:
-        driver.get(BASE_URL)
-
-        # Cerrar cookies si aparecen
-        try:
-            cookie_btn = WebDriverWait(driver, 3).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, "div.sc-knesRu.ePGZca.amc-focus-first"))
-            )
-            cookie_btn.click()
-        except:
-            pass
-
-        # Abrir buscador
-        search_icon = wait.until(
-            EC.element_to_be_clickable((By.CSS_SELECTOR, "a.fusion-main-menu-icon.fusion-bar-highlight"))
-        )
-        search_icon.click()
-
-        # Buscar condición
-        search_input = wait.until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "input[type='search']"))
-        )
-        search_input.clear()
-        search_input.send_keys(condition)
-        driver.find_element(By.CSS_SELECTOR, "input.fusion-search-submit.searchsubmit").click()
+        results_url = search_url("sportdoctor", condition)
+        if results_url:
+            # Resultados directos (?s=), sin abrir el buscador
+            with stage("search_submit"):
+                driver.get(results_url)
+        else:
+            with stage("home_load"):
+                driver.get(BASE_URL)
+
+            # Abrir buscador
+            with stage("search_submit"):
+                search_icon = wait.until(
+                    EC.element_to_be_clickable((By.CSS_SELECTOR, "a.fusion-main-menu-icon.fusion-bar-highlight"))
+                )
+                search_icon.click()
+
+                # Buscar condición
+                search_input = wait.until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "input[type='search']"))
+                )
+                search_input.clear()
+                search_input.send_keys(condition)
+                driver.find_element(By.CSS_SELECTOR, "input.fusion-search-submit.searchsubmit").click()
 
         # Clic en primer resultado
         first_result = WebDriverWait(driver, 5).until(
             EC.element_to_be_clickable((By.CSS_SELECTOR, "h2.blog-shortcode-post-title.entry-title a"))
         )
+        cache.put(condition, "results", driver.current_url, driver.page_source)
         article_url = first_result.get_attribute("href")
-        driver.get(article_url)
+        with stage("article_load"):
+            driver.get(article_url)
 
         # Esperar y parsear contenido
         WebDriverWait(driver, 6).until(EC.presence_of_element_located((By.TAG_NAME, "main")))
-        soup = BeautifulSoup(driver.page_source, "html.parser")
+        report_blocked(driver, condition)
+        html = driver.page_source
+        cache.put(condition, "article", driver.current_url, html)
+        if cache.fetch_only(task, driver.current_url):
+            continue
 
         # Limpiar elementos no deseados
-        for tag in soup(["script", "style", "img", "video", "iframe", "svg", "header", "footer", "nav", "aside"]):
-            tag.decompose()
-        main = soup.find("main") or soup.body
-        clean_text = main.get_text(separator="\n", strip=True)
+        clean_text = extract_sportdoctor(html, condition)
 
         # Guardar
-        filename = os.path.join(output_dir, f"{clean_filename(condition)}.txt")
-        with open(filename, "w", encoding="utf-8") as f:
+        filename = output_path("sportdoctor", condition)
+        with stage("write"), open(filename, "w", encoding="utf-8") as f:
             f.write(clean_text)
+        task.done(filename, clean_text, url=driver.current_url)
         print(f"💾 Saved: {filename}")
 
     except Exception as e:
         print(f"❌ Error with '{condition}': {e}")
+        task.fail(e)
         time.sleep(random.uniform(1, 2))  # Sleep corto tras error
+    finally:
+        driver_pool.checkin(driver, failed=task.status == "failed")
 
 # Cerrar navegador al final
-driver.quit()
+driver_pool.close()
 print("\n✅ Finished scraping sportdoctorlondon.com!")
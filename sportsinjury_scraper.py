@@ -1,7 +1,6 @@
 import os
 import re
 import time
-import pandas as pd
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
@@ -10,6 +9,7 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
+from condition_catalog import load_conditions
 
 # ---------- Utility ----------
 def clean_filename(name):
@@ -21,12 +21,7 @@ OUTPUT_DIR = "sportsinjury_html_pages"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 # ---------- Load conditions ----------
-df = pd.read_csv("exercises.csv", encoding="utf-8")
-conditions = []
-for row in df["Related Conditions"].dropna():
-    parts = re.split(r"[/\n]+", row)
-    conditions.extend([p.strip() for p in parts if p.strip()])
-conditions = list(set(conditions))  # Remove duplicates
+conditions = load_conditions()
 
 # ---------- Set up Selenium ----------
 options = Options()
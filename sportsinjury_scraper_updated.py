@@ -1,16 +1,22 @@
 import os
-import re
-import time
-import pandas as pd
-from bs4 import BeautifulSoup
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+from condition_catalog import load_conditions
+from crawl_manifest import Manifest
+from sites import search_url
+from resource_blocking import block_resources, enable_request_log, report_blocked
+from readiness import wait_ready
+from extractors import extract_sportsinjury, output_path
+from page_cache import PageCache, replay_if_requested
+from search_cache import SearchCache
+from url_index import UrlIndex
+from dom_batch import collect_links
+from ranking import rank
+from driver_pool import DriverPool, launch_chrome
+from stage_timing import stage
 
 # ---------------------------------------
 # 🔧 CONFIGURACIÓN
@@ -19,106 +25,114 @@ BASE_URL = "https://www.sportsinjuryclinic.net"
 OUTPUT_DIR = "sportsinjury_txt"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-KEYWORDS = [
-    "exercise", "exercises", "routine", "routines", "warm up", "stretch", "stretches",
-    "rehabilitation", "recovery", "treatment", "treatments", "therapy", "physical therapy",
-    "management", "mobility", "relief", "improve", "motion", "strengthen", "strength", "home care"
-]
-
-def clean_filename(name):
-    return re.sub(r'[\\/*?:"<>|]', "_", name)
-
 # ---------------------------------------
 # 📄 Cargar condiciones del CSV
 # ---------------------------------------
-df = pd.read_csv("exercises.csv", encoding="utf-8")
-conditions = set()
-for row in df["Related Conditions"].dropna():
-    for c in re.split(r"[/\n]+", row):
-        if c.strip():
-            conditions.add(c.strip())
+conditions = load_conditions()
+# Sin navegador: re-extraer desde page_cache con CRAWL_REPLAY=1
+replay_if_requested("sportsinjury", conditions)
+# Saltar lo que ya terminaron ejecuciones anteriores (CRAWL_MODE, ver crawl_manifest.py)
+manifest = Manifest("sportsinjury")
+conditions = manifest.select(conditions)
+cache = PageCache("sportsinjury")
+searches = SearchCache("sportsinjury")
+urls = UrlIndex("sportsinjury")
 
 # ---------------------------------------
 # 🚀 Configurar navegador
 # ---------------------------------------
-options = Options()
-options.add_argument("--start-maximized")
-# options.add_argument("--headless")  # Puedes descomentar para hacerlo sin abrir ventana
-driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-wait = WebDriverWait(driver, 15)
+def launch_browser():
+    options = Options()
+    options.add_argument("--start-maximized")
+    # options.add_argument("--headless")  # Puedes descomentar para hacerlo sin abrir ventana
+    enable_request_log(options)
+    driver = launch_chrome(options)
+    block_resources(driver, "sportsinjury")
+    return driver
+
+# Se recicla si crece su memoria o su tasa de errores (driver_pool.py)
+driver_pool = DriverPool(launch_browser)
+driver_pool.fill()
 
 # ---------------------------------------
 # 🔁 Bucle principal
 # ---------------------------------------
 for condition in conditions:
     print(f"\n🔍 Buscando: {condition}")
+    task = manifest.start(condition)
+    driver = driver_pool.checkout()
+    wait = WebDriverWait(driver, 15)
     try:
-        driver.get(BASE_URL)
-        time.sleep(1)
+        # Ir directo a los resultados si hay URL de búsqueda
+        results_url = search_url("sportsinjury", condition)
+        with stage("search_submit" if results_url else "home_load"):
+            driver.get(results_url or BASE_URL)
+        wait_ready(driver, "sportsinjury", "page", replaces=1)
 
         # Aceptar cookies si aparece
-        try:
-            cookie_btn = WebDriverWait(driver, 3).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, "button.fc-cta-consent"))
-            )
-            cookie_btn.click()
-            print("✅ Cookies aceptadas")
-        except:
-            print("ℹ️ No cookies visibles")
-
-        # Abrir búsqueda
-        search_btn = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "a.slide-search.astra-search-icon")))
-        search_btn.click()
-
-        search_input = wait.until(EC.visibility_of_element_located((By.ID, "search-field")))
-        search_input.clear()
-        search_input.send_keys(condition)
-        search_input.send_keys(Keys.ENTER)
-        time.sleep(2)
+        with stage("consent"):
+            try:
+                cookie_btn = WebDriverWait(driver, 3).until(
+                    EC.element_to_be_clickable((By.CSS_SELECTOR, "button.fc-cta-consent"))
+                )
+                cookie_btn.click()
+                print("✅ Cookies aceptadas")
+            except:
+                print("ℹ️ No cookies visibles")
+
+        if not results_url:
+            # Abrir búsqueda
+            with stage("search_submit"):
+                search_btn = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "a.slide-search.astra-search-icon")))
+                search_btn.click()
+
+                search_input = wait.until(EC.visibility_of_element_located((By.ID, "search-field")))
+                search_input.clear()
+                search_input.send_keys(condition)
+                search_input.send_keys(Keys.ENTER)
+            wait_ready(driver, "sportsinjury", "results", replaces=2)
 
         # Buscar resultados
-        results = driver.find_elements(By.CSS_SELECTOR, "p.ast-blog-single-element.ast-read-more-container.read-more > a")
+        results = collect_links(driver, "p.ast-blog-single-element.ast-read-more-container.read-more > a")
+        cache.put(condition, "results", driver.current_url, driver.page_source)
+        searches.put(condition, results)
         if not results:
             print("❌ No se encontraron resultados")
+            task.skip("no results")
             continue
 
-        best_link = None
-        best_score = 0
-
-        for link in results:
-            href = link.get_attribute("href")
-            title = link.text.lower()
-            score = sum(1 for k in KEYWORDS if k in title)
-            if condition.lower() in title:
-                score += 5
-            if score > best_score:
-                best_score = score
-                best_link = href
-
-        if not best_link:
-            best_link = results[0].get_attribute("href")
+        best_link = results[rank(condition, [link["text"] for link in results])[0][0]]["href"]
+        # Misma página ya guardada para otra condición: se enlaza sin volver a descargarla
+        if urls.reuse(task, best_link):
+            continue
 
         print(f"➡️ Visitando: {best_link}")
-        driver.get(best_link)
-        time.sleep(3)
+        with stage("article_load"):
+            driver.get(best_link)
+        wait_ready(driver, "sportsinjury", "article", replaces=3)
 
         # Extraer solo texto
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        for tag in soup(["script", "style", "nav", "header", "footer", "aside", "svg", "noscript"]):
-            tag.decompose()
-
-        article = soup.find("article") or soup.body
-        text = article.get_text(separator="\n", strip=True)
+        report_blocked(driver, condition)
+        html = driver.page_source
+        cache.put(condition, "article", driver.current_url, html)
+        if cache.fetch_only(task, driver.current_url):
+            continue
+        text = extract_sportsinjury(html, condition)
 
         # Guardar como .txt
-        file_path = os.path.join(OUTPUT_DIR, f"{clean_filename(condition)}.txt")
-        with open(file_path, "w", encoding="utf-8") as f:
+        file_path = output_path("sportsinjury", condition)
+        with stage("write"), open(file_path, "w", encoding="utf-8") as f:
             f.write(text)
 
+        task.done(file_path, text, url=driver.current_url)
+        urls.record(condition, best_link, driver.current_url, file_path)
         print(f"✅ Guardado: {file_path}")
 
     except Exception as e:
         print(f"❌ Error para '{condition}': {e}")
+        task.fail(e)
+    finally:
+        driver_pool.checkin(driver, failed=task.status == "failed")
 
-driver.quit()
+driver_pool.close()
 print("\n🏁 Finalizado. Archivos guardados en carpeta 'sportsinjury_txt'")
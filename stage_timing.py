@@ -0,0 +1,187 @@
+"""
+Per-stage timings of the scrapers, written as JSONL, and their percentiles.
+
+Every step of a condition is timed with stage(): page loads, consent, search
+submit, readiness waits, ranking, parsing, extraction, writing, and the pacing
+sleeps between conditions. Each timing is tagged with the site, condition and
+attempt of the task running it.
+
+    with stage("article_load"):
+        driver.get(href)
+
+    @timed("extract")
+    def extract_mnt(html, condition): ...
+
+Manifest.start() sets the site, condition and attempt for the code that runs
+the task. This is a contextvar, so threads and the HTTP engine's coroutines
+each keep their own. The shared helpers time themselves:
+
+    wait_ready() as wait_<step>, Pacer.wait() as pace, rank(), make_soup() as
+    parse, the extractors as extract, PageCache.put() as cache and
+    collect_links() as collect
+
+Stages nest (parse runs inside extract), so their times are not meant to add up.
+Timings outside any task and without an explicit site (offline re-extraction)
+are not recorded. Each process appends to TIMINGS_DIR/<site>-<pid>.jsonl:
+
+    {"ts": 1760000000.1, "site": "mnt", "condition": "Tendinitis", "attempt": 2,
+     "stage": "article_load", "seconds": 2.314, "ok": true}
+
+TIMINGS=0 turns recording off. The summary gives p50/p95/p99 per stage and
+site, largest total first:
+
+    python stage_timing.py [site ...] [--stage article_load] [--days 7]
+"""
+import argparse
+import atexit
+import contextvars
+import functools
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+TIMINGS_DIR = "stage_timings"
+TIMINGS_ENV = "TIMINGS"
+FLUSH_EVERY = 100
+
+_context = contextvars.ContextVar("stage_timing_context", default=None)
+_buffers = {}
+_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return os.environ.get(TIMINGS_ENV, "1") != "0"
+
+
+def begin(site_name: str, condition: str, attempt: int = None) -> None:
+    """Tags the stages timed from here on (in this thread or coroutine) with a task."""
+    _context.set((site_name, condition, attempt))
+
+
+def current() -> tuple:
+    """(site, condition, attempt) of the task running here, or three Nones."""
+    return _context.get() or (None, None, None)
+
+
+def record(stage_name: str, seconds: float, site_name: str = None, ok: bool = True, tagged: bool = True) -> None:
+    """`tagged=False` for time spent between conditions (pacing), which belongs to no task."""
+    if not enabled():
+        return
+    task_site, condition, attempt = current()
+    site_name = site_name or task_site
+    if site_name is None:
+        return
+    tagged = tagged and site_name == task_site
+    event = {
+        "ts": round(time.time(), 3), "site": site_name,
+        "condition": condition if tagged else None,
+        "attempt": attempt if tagged else None,
+        "stage": stage_name, "seconds": round(seconds, 4), "ok": ok,
+    }
+    path = os.path.join(TIMINGS_DIR, f"{site_name}-{os.getpid()}.jsonl")
+    with _lock:
+        if not _buffers:
+            atexit.register(flush)
+        lines = _buffers.setdefault(path, [])
+        lines.append(json.dumps(event, ensure_ascii=False))
+        if len(lines) >= FLUSH_EVERY:
+            _write(path, lines)
+
+
+def _write(path: str, lines: list) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    lines.clear()
+
+
+def flush() -> None:
+    """Writes the buffered timings (after every task, and at exit)."""
+    with _lock:
+        for path, lines in _buffers.items():
+            if lines:
+                _write(path, lines)
+
+
+@contextmanager
+def stage(stage_name: str, site_name: str = None):
+    """Times the block; `site_name` only for code that runs outside a task (warm-ups)."""
+    started = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        record(stage_name, time.perf_counter() - started, site_name, ok)
+
+
+def timed(stage_name: str):
+    """Decorator form of stage()."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# ---------------------------------------------------------------- summary
+
+def load_events(site_names: list = None, days: float = None, timings_dir: str = TIMINGS_DIR):
+    cutoff = time.time() - days * 86400 if days else 0
+    for path in sorted(glob.glob(os.path.join(timings_dir, "*.jsonl"))):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue  # line cut short by a killed process
+                if event["ts"] >= cutoff and (not site_names or event["site"] in site_names):
+                    yield event
+
+
+def summarize(events) -> list:
+    """[(site, stage, n, p50, p95, p99, total, failed)], each site's largest total first."""
+    import numpy as np
+    samples = {}
+    failures = {}
+    for event in events:
+        key = (event["site"], event["stage"])
+        samples.setdefault(key, []).append(event["seconds"])
+        failures[key] = failures.get(key, 0) + (not event["ok"])
+    rows = []
+    for (site_name, stage_name), seconds in samples.items():
+        values = np.array(seconds)
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        rows.append((site_name, stage_name, len(values), p50, p95, p99, values.sum(),
+                     failures[(site_name, stage_name)]))
+    return sorted(rows, key=lambda row: (row[0], -row[6]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="p50/p95/p99 of every scraper stage, per site.")
+    parser.add_argument("sites", nargs="*", help="Default: every site with timings")
+    parser.add_argument("--stage", action="append", help="Only these stages (repeatable)")
+    parser.add_argument("--days", type=float, help="Only timings from the last N days")
+    parser.add_argument("--dir", default=TIMINGS_DIR)
+    args = parser.parse_args()
+
+    events = load_events(args.sites or None, args.days, args.dir)
+    if args.stage:
+        events = (e for e in events if e["stage"] in args.stage)
+    rows = summarize(events)
+    if not rows:
+        print(f"No timings in {args.dir}/")
+        return
+    print(f"{'site':<16} {'stage':<20} {'n':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'total':>9} {'failed':>6}")
+    for site_name, stage_name, n, p50, p95, p99, total, failed in rows:
+        print(f"{site_name:<16} {stage_name:<20} {n:>6} {p50:>7.2f}s {p95:>7.2f}s {p99:>7.2f}s "
+              f"{total:>8.1f}s {failed:>6}")
+
+
+if __name__ == "__main__":
+    main()
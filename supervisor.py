@@ -0,0 +1,249 @@
+"""
+Runs each condition in a killable worker process with a hard deadline.
+
+A thread that times out cannot be stopped: it keeps driving the same Chrome
+session, so hung conditions used to pile up threads and Chrome processes and
+long runs slowed down. Here the browser lives in a worker process instead.
+When a condition overruns its deadline, the worker and its whole process tree
+(chromedriver and every Chrome process) are killed, and the next condition goes
+to a spare worker that has already launched and warmed up its own sessions.
+
+    supervisor = Supervisor(init_worker, scrape_condition, deadline=15, idle=DriverPool.fill)
+    for condition in conditions:
+        try:
+            outcome = supervisor.run(condition)
+        except JobTimeout as e:
+            ...
+    supervisor.close()
+
+init() runs once in every new worker and returns its state (a DriverPool, say);
+handler(state, job) runs one job and returns a picklable result; idle(state),
+if given, runs after the result is sent, outside the deadline (refilling the
+pool after a recycle). All three must be module-level functions, importable by
+the worker: scripts using a Supervisor keep their loop under
+`if __name__ == "__main__":`. Workers are started with "spawn", the only
+method on Windows, so behaviour is the same everywhere.
+
+The process tree is killed with psutil when it is installed, else with
+`taskkill /T` on Windows or by killing the worker's process group elsewhere.
+A job that is legitimately waiting (for a human to solve a CAPTCHA) calls
+extend_deadline() from the worker to keep it alive.
+"""
+import importlib.util
+import multiprocessing
+import os
+import queue
+import signal
+import subprocess
+import time
+
+import crawl_metrics
+
+STARTUP_TIMEOUT = 180     # launching and warming up a worker's browser
+STARTUP_ATTEMPTS = 3      # workers that may fail to start in a row before giving up
+STARTUP_BACKOFF = 5       # seconds, times the attempt number
+SHUTDOWN_TIMEOUT = 15
+POLL_INTERVAL = 1.0
+
+HAS_PSUTIL = importlib.util.find_spec("psutil") is not None
+
+# Result queue of the worker this process is, if it is one
+_results = None
+
+
+class JobTimeout(TimeoutError):
+    pass
+
+
+class WorkerError(RuntimeError):
+    """The job raised in the worker, or the worker died."""
+
+
+def _tree(pid: int) -> list:
+    """psutil processes of `pid` and its descendants (empty if it is gone)."""
+    import psutil
+    try:
+        root = psutil.Process(pid)
+        return root.children(recursive=True) + [root]
+    except psutil.NoSuchProcess:
+        return []
+
+
+def kill_tree(pid: int, procs: list = None) -> None:
+    """
+    Kills a process and every descendant of it, e.g. a worker with its
+    chromedriver and Chrome. `procs` is an earlier _tree(pid) snapshot, for a
+    root that may have exited meanwhile (its children are then out of reach).
+    """
+    if HAS_PSUTIL:
+        import psutil
+        procs = list({p.pid: p for p in (procs or []) + _tree(pid)}.values())
+        for proc in procs:
+            try:
+                proc.kill()
+            except psutil.NoSuchProcess:
+                pass
+        psutil.wait_procs(procs, timeout=SHUTDOWN_TIMEOUT)
+    elif os.name == "nt":
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(pid)], capture_output=True)
+    else:
+        try:
+            # Workers lead their own session (see _worker_main), so the group is the whole tree
+            os.killpg(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
+def extend_deadline(seconds: float) -> None:
+    """From inside a job: give it at least `seconds` more before the supervisor kills it."""
+    if _results is not None:
+        _results.put(("extend", seconds))
+
+
+def _worker_main(init, handler, idle, jobs, results) -> None:
+    global _results
+    _results = results
+    if hasattr(os, "setsid"):
+        os.setsid()
+    state = init() if init else None
+    results.put(("ready", os.getpid()))
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        try:
+            results.put(("ok", handler(state, job)))
+        except Exception as e:
+            results.put(("error", f"{type(e).__name__}: {e}"))
+        if idle:
+            try:
+                idle(state)
+            except Exception as e:
+                # Not the next job's fault (a browser that would not relaunch, say): it
+                # gets its own chance, e.g. DriverPool.checkout() launches what fill() could not
+                print(f"[SUPERVISOR] idle() failed in worker {os.getpid()}: {type(e).__name__}: {e}")
+    if hasattr(state, "close"):
+        state.close()
+
+
+class _Worker:
+    def __init__(self, ctx, init, handler, idle):
+        # Queues of their own: a worker killed mid-write may leave them corrupt
+        self.jobs = ctx.Queue()
+        self.results = ctx.Queue()
+        self.process = ctx.Process(target=_worker_main, args=(init, handler, idle, self.jobs, self.results))
+        self.process.start()
+        self.ready = False
+
+    def wait_ready(self, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        while not self.ready:
+            try:
+                self.results.get(timeout=POLL_INTERVAL)
+                self.ready = True
+            except queue.Empty:
+                if not self.process.is_alive():
+                    raise WorkerError(f"worker exited during start-up (exit code {self.process.exitcode})")
+                if time.monotonic() > deadline:
+                    raise JobTimeout(f"worker not ready after {timeout:.0f}s")
+
+    def kill(self, procs: list = None) -> None:
+        if self.process.pid is not None:
+            kill_tree(self.process.pid, procs)
+        self.process.join(SHUTDOWN_TIMEOUT)
+        for q in (self.jobs, self.results):
+            q.cancel_join_thread()
+            q.close()
+
+    def stop(self) -> None:
+        # A clean exit still leaves Chrome behind if a session could not quit
+        procs = _tree(self.process.pid) if HAS_PSUTIL else None
+        try:
+            self.jobs.put(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(SHUTDOWN_TIMEOUT)
+        self.kill(procs)
+
+
+class Supervisor:
+    def __init__(self, init, handler, deadline: float, idle=None, spares: int = 1,
+                 startup_timeout: float = STARTUP_TIMEOUT):
+        """
+        deadline: seconds a job may run before its worker is killed.
+        spares:   workers kept started and warmed up in the background, ready to
+                  take over from a killed one without waiting for a new browser.
+        """
+        self.init = init
+        self.handler = handler
+        self.idle = idle
+        self.deadline = deadline
+        self.spares = spares
+        self.startup_timeout = startup_timeout
+        self._ctx = multiprocessing.get_context("spawn")
+        self._active = None
+        self._standby = []
+        self.started = 0
+        self.kills = 0
+
+    def _spawn(self) -> _Worker:
+        self.started += 1
+        return _Worker(self._ctx, self.init, self.handler, self.idle)
+
+    def _worker(self) -> _Worker:
+        attempt = 0
+        while self._active is None:
+            worker = self._standby.pop(0) if self._standby else self._spawn()
+            try:
+                worker.wait_ready(self.startup_timeout)
+                self._active = worker
+            except (JobTimeout, WorkerError) as e:
+                self.kills += 1
+                worker.kill()
+                attempt += 1
+                # init() failing every time (no chromedriver, say) must not respawn forever
+                if attempt >= STARTUP_ATTEMPTS:
+                    raise WorkerError(f"no worker could start after {attempt} attempts: {e}") from e
+                print(f"[SUPERVISOR] {e}, starting another worker in {STARTUP_BACKOFF * attempt}s")
+                time.sleep(STARTUP_BACKOFF * attempt)
+        while len(self._standby) < self.spares:
+            self._standby.append(self._spawn())
+        return self._active
+
+    def _discard_active(self) -> None:
+        self.kills += 1
+        # Its browser goes with it
+        crawl_metrics.count("browser_restarts")
+        self._active.kill()
+        self._active = None
+
+    def run(self, job, deadline: float = None):
+        """Result of handler(state, job) in a worker; JobTimeout if it overran and was killed."""
+        worker = self._worker()
+        deadline = deadline or self.deadline
+        worker.jobs.put(job)
+        expires = time.monotonic() + deadline
+        while True:
+            try:
+                kind, value = worker.results.get(timeout=max(0.0, min(POLL_INTERVAL, expires - time.monotonic())))
+                if kind != "extend":
+                    break
+                expires = max(expires, time.monotonic() + value)
+            except queue.Empty:
+                if not worker.process.is_alive():
+                    code = worker.process.exitcode
+                    self._discard_active()
+                    raise WorkerError(f"worker died (exit code {code})")
+                if time.monotonic() >= expires:
+                    self._discard_active()
+                    raise JobTimeout(f"no result after {deadline:g}s, worker and its browser killed")
+        if kind == "error":
+            raise WorkerError(value)
+        return value
+
+    def close(self) -> None:
+        for worker in ([self._active] if self._active else []) + self._standby:
+            worker.stop()
+        self._active = None
+        self._standby = []
+        print(f"[SUPERVISOR] {self.started} workers started, {self.kills} killed")
@@ -0,0 +1,175 @@
+"""
+Persistent index of the article URLs already fetched, so many conditions that
+resolve to the same page cost one fetch and one extraction.
+
+"Rotator Cuff Tear", "Tendinopathy" and "Tendinitis" often land on the same
+article. URLs are canonicalized (scheme and host lowercased, fragment, default
+port, trailing slash and tracking parameters dropped, remaining parameters
+sorted), and the URL a result link redirects to is remembered as an alias of
+the link, so the next condition pointing at either is recognized before the
+browser or the HTTP engine goes there:
+
+    urls = UrlIndex("spinehealth")
+    if urls.reuse(task, href):          # seen: linked to the saved output, task done
+        continue
+    driver.get(href)
+    ...
+    task.done(file_path, text, url=driver.current_url)
+    urls.record(condition, href, driver.current_url, file_path)
+
+Every (condition -> URL -> output file) link is kept, so downstream steps can
+map each condition to its document without storing or embedding it twice.
+With CRAWL_MODE=all or older:N (a refresh), only pages recorded during the
+current run are reused.
+
+    python url_index.py [site ...]      # URLs, conditions and fetches saved
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from crawl_manifest import parse_mode
+
+DB_PATH = "url_index.sqlite"
+
+# Query parameters that only track the click, never select the content
+TRACKING_PARAMS = {
+    "gclid", "gclsrc", "dclid", "fbclid", "msclkid", "igshid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "ref", "ref_src", "cmpid", "s_cid", "icid", "src", "sc_cid",
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    site TEXT NOT NULL,
+    url TEXT NOT NULL,
+    output_path TEXT,
+    first_condition TEXT,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (site, url)
+);
+CREATE TABLE IF NOT EXISTS aliases (
+    site TEXT NOT NULL,
+    alias TEXT NOT NULL,
+    url TEXT NOT NULL,
+    PRIMARY KEY (site, alias)
+);
+CREATE TABLE IF NOT EXISTS links (
+    site TEXT NOT NULL,
+    condition TEXT NOT NULL,
+    url TEXT NOT NULL,
+    reused INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (site, condition)
+);
+"""
+
+
+def canonical_url(url: str) -> str:
+    """The form two URLs of the same page share."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+class UrlIndex:
+    def __init__(self, site_name: str, db_path: str = DB_PATH):
+        self.site = site_name
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=60, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        # A refresh run must fetch again whatever earlier runs saved
+        mode, _ = parse_mode()
+        self.since = time.time() if mode in ("all", "older") else 0
+
+    def resolve(self, url: str) -> str:
+        """Canonical URL of the page `url` leads to, following known redirects."""
+        url = canonical_url(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url FROM aliases WHERE site = ? AND alias = ?", (self.site, url)
+            ).fetchone()
+        return row[0] if row else url
+
+    def lookup(self, url: str):
+        """(canonical URL, output path) of an already saved page, or None."""
+        url = self.resolve(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT output_path, fetched_at FROM pages WHERE site = ? AND url = ?", (self.site, url)
+            ).fetchone()
+        if row is None or row[1] < self.since or not row[0] or not os.path.exists(row[0]):
+            return None
+        return url, row[0]
+
+    def link(self, condition: str, url: str, reused: bool = False) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO links (site, condition, url, reused) VALUES (?, ?, ?, ?)",
+                (self.site, condition, url, int(reused)),
+            )
+
+    def reuse(self, task, url: str) -> bool:
+        """
+        True if the page `url` leads to is already saved: the condition is linked
+        to it, `task` is recorded as done with that output and nothing is fetched.
+        """
+        seen = self.lookup(url)
+        if seen is None:
+            return False
+        page_url, file_path = seen
+        self.link(task.condition, page_url, reused=True)
+        task.done(file_path, url=page_url)
+        print(f"[URL] {self.site}: '{task.condition}' is the page already saved as {os.path.basename(file_path)}")
+        return True
+
+    def record(self, condition: str, requested_url: str, final_url: str, output_path: str) -> str:
+        """Remembers a saved page (and the redirect that led to it); returns its canonical URL."""
+        url = canonical_url(final_url or requested_url)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (site, url, output_path, first_condition, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self.site, url, output_path, condition, time.time()),
+            )
+            if requested_url and canonical_url(requested_url) != url:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO aliases (site, alias, url) VALUES (?, ?, ?)",
+                    (self.site, canonical_url(requested_url), url),
+                )
+        self.link(condition, url)
+        return url
+
+
+def summary(site_names: list = None, db_path: str = DB_PATH) -> list:
+    """[(site, pages, conditions, reused)] for the given sites (all when None)."""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript(_SCHEMA)
+        query = "SELECT site, COUNT(DISTINCT url), COUNT(*), SUM(reused) FROM links"
+        params = ()
+        if site_names:
+            query += f" WHERE site IN ({', '.join('?' * len(site_names))})"
+            params = tuple(site_names)
+        return conn.execute(query + " GROUP BY site ORDER BY site", params).fetchall()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    for site, pages, conditions, reused in summary(sys.argv[1:] or None):
+        print(f"{site:<16} {pages:>6} pages {conditions:>6} conditions {reused:>6} fetches saved")
@@ -1,7 +1,6 @@
 import os
 import re
 import time
-import pandas as pd
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
@@ -10,17 +9,13 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
+from condition_catalog import load_conditions
 
 def clean_name(name: str) -> str:
     return re.sub(r'[\\/*?:"<>|]', "_", name)
 
 # Load conditions from CSV
-df = pd.read_csv("exercises.csv", encoding="utf-8")
-all_conditions = []
-for row in df["Related Conditions"].dropna():
-    items = re.split(r"[/\n]+", row)
-    all_conditions.extend([i.strip() for i in items if i.strip()])
-all_conditions = list(set(all_conditions))
+all_conditions = load_conditions()
 
 # Selenium setup
 options = Options()
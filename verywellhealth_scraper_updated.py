@@ -1,107 +1,153 @@
 import os
-import re
-import time
-import pandas as pd
-from bs4 import BeautifulSoup
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-
-def clean_name(name: str) -> str:
-    return re.sub(r'[\\/*?:"<>|]', "_", name)
+from condition_catalog import load_conditions
+from crawl_manifest import Manifest
+from sites import search_url
+from resource_blocking import block_resources, enable_request_log, report_blocked
+from readiness import wait_ready
+from pacing import Pacer
+from extractors import extract_verywellhealth, output_path
+from page_cache import PageCache, replay_if_requested
+from dom_batch import collect_links
+from search_cache import SearchCache
+from url_index import UrlIndex
+from driver_pool import DriverPool, launch_chrome
+from stage_timing import stage
 
 # Cargar condiciones
-df = pd.read_csv("exercises.csv", encoding="utf-8")
-all_conditions = []
-for row in df["Related Conditions"].dropna():
-    items = re.split(r"[/\n]+", row)
-    all_conditions.extend([i.strip() for i in items if i.strip()])
-all_conditions = list(set(all_conditions))
+all_conditions = load_conditions()
+# Sin navegador: re-extraer desde page_cache con CRAWL_REPLAY=1
+replay_if_requested("verywellhealth", all_conditions)
+# Saltar lo que ya terminaron ejecuciones anteriores (CRAWL_MODE, ver crawl_manifest.py)
+manifest = Manifest("verywellhealth")
+all_conditions = manifest.select(all_conditions)
+cache = PageCache("verywellhealth")
+searches = SearchCache("verywellhealth")
+urls = UrlIndex("verywellhealth")
 
 # Configuración Selenium
-options = Options()
-options.add_argument("--disable-gpu")
-options.add_argument("--no-sandbox")
-options.add_argument("--start-maximized")
-driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-wait = WebDriverWait(driver, 12)
+def launch_browser():
+    options = Options()
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--start-maximized")
+    enable_request_log(options)
+    driver = launch_chrome(options)
+    block_resources(driver, "verywellhealth")
+    return driver
+
+# Se recicla si crece su memoria o su tasa de errores (driver_pool.py)
+driver_pool = DriverPool(launch_browser)
+driver_pool.fill()
 
 BASE_URL = "https://www.verywellhealth.com/"
 SAVE_DIR = "verywellhealth_txt"
 os.makedirs(SAVE_DIR, exist_ok=True)
 
+# Pausa mínima entre condiciones (min_interval en sites.py)
+pacer = Pacer("verywellhealth")
+
 for i, condition in enumerate(all_conditions):
+    pacer.wait()
     print(f"\n🔍 Searching: {condition} ({i + 1}/{len(all_conditions)})")
+    task = manifest.start(condition)
+    driver = driver_pool.checkout()
+    wait = WebDriverWait(driver, 12)
     try:
-        driver.get(BASE_URL)
+        # Ir directo a los resultados si hay URL de búsqueda
+        results_url = search_url("verywellhealth", condition)
+        with stage("search_submit" if results_url else "home_load"):
+            driver.get(results_url or BASE_URL)
 
         # Aceptar cookies si aparece
-        try:
-            cookie_btn = WebDriverWait(driver, 4).until(
-                EC.element_to_be_clickable((By.ID, "onetrust-accept-btn-handler"))
-            )
-            cookie_btn.click()
-            print("✅ Cookie accepted")
-        except:
-            print("ℹ️ No cookie popup appeared")
+        with stage("consent"):
+            try:
+                cookie_btn = WebDriverWait(driver, 4).until(
+                    EC.element_to_be_clickable((By.ID, "onetrust-accept-btn-handler"))
+                )
+                cookie_btn.click()
+                print("✅ Cookie accepted")
+            except:
+                print("ℹ️ No cookie popup appeared")
 
-        # Hacer clic en la lupa de búsqueda
-        try:
-            search_icon = wait.until(EC.element_to_be_clickable((By.ID, "header-search-button_1-0")))
-            search_icon.click()
-        except:
-            print("❌ Failed to click search icon.")
-            continue
+        if not results_url:
+            # Hacer clic en la lupa de búsqueda
+            with stage("search_submit"):
+                try:
+                    search_icon = wait.until(EC.element_to_be_clickable((By.ID, "header-search-button_1-0")))
+                    search_icon.click()
+                except:
+                    print("❌ Failed to click search icon.")
+                    task.fail("failed to click search icon")
+                    continue
 
-        # Buscar condición
-        try:
-            search_input = wait.until(EC.presence_of_element_located((By.ID, "search-input")))
-            search_input.clear()
-            search_input.send_keys(condition)
-            wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button.btn.btn-bright.btn-go"))).click()
-        except:
-            print("❌ Failed to search.")
-            continue
+                # Buscar condición
+                try:
+                    search_input = wait.until(EC.presence_of_element_located((By.ID, "search-input")))
+                    search_input.clear()
+                    search_input.send_keys(condition)
+                    wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button.btn.btn-bright.btn-go"))).click()
+                except:
+                    print("❌ Failed to search.")
+                    task.fail("failed to search")
+                    continue
 
         # Esperar resultados y hacer clic en el segundo resultado
-        time.sleep(3)
-        results = driver.find_elements(By.CSS_SELECTOR, "li.comp.search-result-list-item.mntl-block a.comp.block.block-horizontal")
+        wait_ready(driver, "verywellhealth", "results", replaces=3)
+        results = collect_links(driver, "li.comp.search-result-list-item.mntl-block a.comp.block.block-horizontal")
+        cache.put(condition, "results", driver.current_url, driver.page_source)
+        searches.put(condition, results)
         if len(results) >= 2:
-            link = results[1].get_attribute("href")
+            link = results[1]["href"]
         elif results:
-            link = results[0].get_attribute("href")
+            link = results[0]["href"]
         else:
             print("❌ No results found.")
+            task.skip("no results")
             continue
 
-        driver.get(link)
+        # Same page already saved for another condition: link it instead of fetching again
+        if urls.reuse(task, link):
+            continue
+        with stage("article_load"):
+            driver.get(link)
         print(f"🔗 Navigated to: {link}")
-        time.sleep(3)
+        wait_ready(driver, "verywellhealth", "article", replaces=3)
 
         # Parsear y guardar solo texto
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        for tag in soup(["script", "style", "nav", "footer", "header", "img", "video", "aside", "svg", "iframe"]):
-            tag.decompose()
+        report_blocked(driver, condition)
+        html = driver.page_source
+        if pacer.check(html):
+            # CAPTCHA o página de bloqueo en vez del artículo: queda para otra ejecución
+            task.fail("blocked page", url=driver.current_url, error_class="Blocked")
+            continue
+        cache.put(condition, "article", driver.current_url, html)
+        if cache.fetch_only(task, driver.current_url):
+            continue
 
-        main = soup.find("main") or soup.body
-        if main:
-            clean_text = main.get_text(separator="\n", strip=True)
-            filename = os.path.join(SAVE_DIR, f"{clean_name(condition)}.txt")
-            with open(filename, "w", encoding="utf-8") as f:
+        clean_text = extract_verywellhealth(html, condition)
+        if clean_text is not None:
+            filename = output_path("verywellhealth", condition)
+            with stage("write"), open(filename, "w", encoding="utf-8") as f:
                 f.write(clean_text)
+            task.done(filename, clean_text, url=driver.current_url)
+            pacer.success()
+            urls.record(condition, link, driver.current_url, filename)
             print(f"💾 Saved: {filename}")
         else:
             print("⚠️ No main content found")
-
-        time.sleep(2)
+            task.skip("no main content")
 
     except Exception as e:
         print(f"❌ Unexpected error: {e}")
+        task.fail(e)
+        pacer.failed(e)
+    finally:
+        driver_pool.checkin(driver, failed=task.status == "failed")
 
-driver.quit()
+driver_pool.close()
 print("\n✅ Finished scraping Verywell Health.")
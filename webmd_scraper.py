@@ -1,7 +1,6 @@
 import re
 import os
 import time
-import pandas as pd
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
@@ -10,6 +9,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 from multiprocessing import Pool, cpu_count
+from condition_catalog import load_conditions
 
 def clean_filename(name: str) -> str:
     return re.sub(r'[\\/*?:"<>|]', '_', name)
@@ -73,12 +73,7 @@ def scrape_condition(condition):
 
 if __name__ == "__main__":
     os.makedirs("webmd_pages", exist_ok=True)
-    df = pd.read_csv("exercises.csv", encoding="utf-8")
-    conditions = []
-    for row in df["Related Conditions"].dropna():
-        splitted = re.split(r"[/\n]+", row)
-        conditions.extend([c.strip() for c in splitted if c.strip()])
-    conditions = list(set(conditions))
+    conditions = load_conditions()
 
     with Pool(min(cpu_count(), 6)) as pool:  # Use up to 6 processes
         pool.map(scrape_condition, conditions)
@@ -1,18 +1,21 @@
-import re
 import os
 import time
-import pandas as pd
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from multiprocessing import Pool, cpu_count
-
-def clean_filename(name: str) -> str:
-    return re.sub(r'[\\/*?:"<>|]', '_', name)
+from multiprocessing import Pool, cpu_count, util
+from condition_catalog import load_conditions
+from crawl_manifest import Manifest
+from driver_pool import DriverPool, launch_chrome
+from sites import search_url
+from resource_blocking import block_resources, enable_request_log, report_blocked
+from extractors import extract_webmd, output_path
+from page_cache import PageCache, replay_if_requested
+from search_cache import SearchCache
+from url_index import UrlIndex
+from dom_batch import collect_links
+from stage_timing import stage
 
 def setup_driver():
     chrome_options = Options()
@@ -21,80 +24,106 @@ def setup_driver():
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.page_load_strategy = 'eager'
-    chrome_prefs = {
-        "profile.managed_default_content_settings.images": 2,
-        "profile.managed_default_content_settings.stylesheets": 2,
-        "profile.managed_default_content_settings.fonts": 2
-    }
-    chrome_options.add_experimental_option("prefs", chrome_prefs)
-    return webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+    # Imágenes, CSS, fuentes, anuncios y analítica se bloquean por red (ver "block" en sites.py)
+    enable_request_log(chrome_options)
+    driver = launch_chrome(chrome_options)
+    block_resources(driver, "webmd")
+    return driver
+
+BASE_URL = "https://www.webmd.com/"
+driver_pool = None
+manifest = None
+cache = None
+searches = None
+urls = None
+
+def accept_cookies(driver):
+    driver.get(BASE_URL)
+    try:
+        cookie_btn = WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.ID, "onetrust-accept-btn-handler")))
+        cookie_btn.click()
+    except:
+        pass
+
+def init_worker():
+    # Un navegador por proceso, lanzado y con cookies aceptadas una sola vez
+    global driver_pool, manifest, cache, searches, urls
+    manifest = Manifest("webmd")
+    cache = PageCache("webmd")
+    searches = SearchCache("webmd")
+    urls = UrlIndex("webmd")
+    # Recycled when its memory use or failure rate grows (driver_pool.py)
+    driver_pool = DriverPool(setup_driver, size=1, warmup=accept_cookies)
+    driver_pool.fill()
+    util.Finalize(driver_pool, driver_pool.close, exitpriority=10)
+    util.Finalize(manifest, manifest.close, exitpriority=10)
 
 def scrape_condition(condition):
-    driver = setup_driver()
+    task = manifest.start(condition)
+    driver = driver_pool.checkout()
     wait = WebDriverWait(driver, 5)
-    base_url = "https://www.webmd.com/"
-    driver.get(base_url)
+    results_url = search_url("webmd", condition)
 
     try:
-        try:
-            cookie_btn = wait.until(EC.element_to_be_clickable((By.ID, "onetrust-accept-btn-handler")))
-            cookie_btn.click()
-        except:
-            pass
+        with stage("search_submit" if results_url else "home_load"):
+            driver.get(results_url or BASE_URL)
 
-        try:
-            search_btn = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button[aria-label='Search']")))
-            search_btn.click()
-        except:
-            pass
+        if not results_url:
+            with stage("search_submit"):
+                try:
+                    search_btn = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button[aria-label='Search']")))
+                    search_btn.click()
+                except:
+                    pass
 
-        search_input = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "input.webmd-input__inner")))
-        search_input.send_keys(condition)
+                search_input = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "input.webmd-input__inner")))
+                search_input.send_keys(condition)
 
-        submit_btn = driver.find_element(By.CSS_SELECTOR, "button[type='submit']")
-        submit_btn.click()
+                submit_btn = driver.find_element(By.CSS_SELECTOR, "button[type='submit']")
+                submit_btn.click()
 
         wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "a.search-results-title-link")))
-        first_result = driver.find_element(By.CSS_SELECTOR, "a.search-results-title-link")
-        driver.get(first_result.get_attribute("href"))
+        results = collect_links(driver, "a.search-results-title-link")
+        cache.put(condition, "results", driver.current_url, driver.page_source)
+        searches.put(condition, results)
+        first_result = results[0]
+        # Same page already saved for another condition: link it instead of fetching again
+        if urls.reuse(task, first_result["href"]):
+            return
+        with stage("article_load"):
+            driver.get(first_result["href"])
 
         wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "div.article__body")))
 
-        paragraphs = driver.find_elements(By.CSS_SELECTOR, "div.article__body section p")
-        cleaned_paragraphs = [f"<p>{p.text.strip()}</p>" for p in paragraphs if p.text.strip()]
-        content_html = "\n".join(cleaned_paragraphs)
-
-        html_output = f"""
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <title>{condition}</title>
-</head>
-<body>
-    {content_html}
-</body>
-</html>
-        """
-
-        file_name = clean_filename(condition) + ".html"
-        with open(os.path.join("webmd_pages_clean", file_name), "w", encoding="utf-8") as f:
-            f.write(html_output.strip())
+        report_blocked(driver, condition)
+        html = driver.page_source
+        cache.put(condition, "article", driver.current_url, html)
+        if cache.fetch_only(task, driver.current_url):
+            return
+        html_output = extract_webmd(html, condition)
+
+        file_path = output_path("webmd", condition)
+        with stage("write"), open(file_path, "w", encoding="utf-8") as f:
+            f.write(html_output)
+        task.done(file_path, html_output, url=driver.current_url)
+        urls.record(condition, first_result["href"], driver.current_url, file_path)
         print(f"[DONE] Saved: {condition}")
 
     except Exception as e:
         print(f"[ERROR] {condition}: {e}")
+        task.fail(e)
     finally:
-        driver.quit()
+        driver_pool.checkin(driver, failed=task.status == "failed")
 
 if __name__ == "__main__":
     os.makedirs("webmd_pages_clean", exist_ok=True)
-    df = pd.read_csv("exercises.csv", encoding="utf-8")
-    conditions = []
-    for row in df["Related Conditions"].dropna():
-        splitted = re.split(r"[/\n]+", row)
-        conditions.extend([c.strip() for c in splitted if c.strip()])
-    conditions = list(set(conditions))
-
-    with Pool(min(cpu_count(), 6)) as pool:
+    all_conditions = load_conditions()
+    # Sin navegador: re-extraer desde page_cache con CRAWL_REPLAY=1
+    replay_if_requested("webmd", all_conditions)
+    # Saltar lo que ya terminaron ejecuciones anteriores (CRAWL_MODE, ver crawl_manifest.py)
+    conditions = Manifest("webmd").select(all_conditions)
+
+    with Pool(min(cpu_count(), 6), initializer=init_worker) as pool:
         pool.map(scrape_condition, conditions)
+        pool.close()
+        pool.join()  # deja que cada worker cierre su navegador